@@ -0,0 +1,219 @@
+# python3 benchmarks/e2e.py [--count 24] [--seed 0] [--skip-ocr] [--imap-backend async] [--latency-ms 20]
+#                           [--output results.json]
+#
+# End-to-end benchmark: synthetic timesheets (images and PDFs at several resolutions
+# and skews) are mailed through an in-process IMAP server, fetched with
+# get_finance_emails_in_period, saved with extract_attachments and verified with
+# TimesheetProcessor. Throughput, latency percentiles and extraction accuracy are
+# written as JSON so results can be compared between versions.
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+from email.mime.application import MIMEApplication
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from email.utils import format_datetime, formataddr
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from benchmarks import synthetic
+from benchmarks.imap_server import BenchmarkIMAPServer
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+RESULTS_DIR = os.path.join(REPO_ROOT, 'benchmarks', 'results')
+FINANCE_SENDER = 'lonn@example.no'
+MAIL_DATE = datetime(2025, 3, 15, 12, 0, tzinfo=timezone.utc)
+VALIDATION_REPEAT = 200  # validate() is too fast to time once per sheet
+
+
+def latency_stats(seconds: list, total: float = None) -> dict:
+    """Count, throughput and latency percentiles (ms) of a list of per-item durations."""
+    if not seconds:
+        return {"count": 0}
+    ordered = sorted(seconds)
+
+    def pct(p):
+        return round(1000 * ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))], 3)
+
+    total = sum(seconds) if total is None else total
+    return {"count": len(seconds), "total_seconds": round(total, 4),
+            "per_second": round(len(seconds) / total, 3) if total else None,
+            "p50_ms": pct(50), "p90_ms": pct(90), "p99_ms": pct(99), "max_ms": round(1000 * ordered[-1], 3)}
+
+
+def build_email(sheet: synthetic.SyntheticTimesheet, idx: int) -> bytes:
+    msg = MIMEMultipart()
+    msg['From'] = formataddr(('Lønn', FINANCE_SENDER))
+    msg['To'] = 'prove@example.no'
+    msg['Subject'] = f'Timeliste {idx}'
+    msg['Date'] = format_datetime(MAIL_DATE)
+    msg.attach(MIMEText('Vedlagt timeliste.', 'plain', 'utf-8'))
+    subtype = {'jpg': 'jpeg', 'png': 'png'}.get(sheet.kind, 'pdf')
+    maintype = 'application' if subtype == 'pdf' else 'image'
+    part = MIMEApplication(sheet.data, _subtype=subtype)
+    part.replace_header('Content-Type', f'{maintype}/{subtype}')
+    part.add_header('Content-Disposition', 'attachment', filename=sheet.filename)
+    msg.attach(part)
+    return msg.as_bytes()
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                              capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ''
+
+
+def run_ingestion(sheets: list, workdir: str, backend: str = 'imaplib', latency: float = 0.0) -> tuple:
+    """Fetch + save through the benchmark IMAP server. Returns (report, {filename: saved path})."""
+    with BenchmarkIMAPServer([build_email(s, i) for i, s in enumerate(sheets)], latency=latency) as server:
+        from ingestion import download_attachments, fetch_emails, sync_state
+        # Point ingestion at the local server and keep its state/output out of the repository
+        fetch_emails.IMAP_HOST, fetch_emails.IMAP_PORT, fetch_emails.IMAP_SSL = '127.0.0.1', server.port, False
+        fetch_emails.IMAP_USER = fetch_emails.IMAP_PASSWORD = 'bench'
+        fetch_emails.FINANCE_SENDER = FINANCE_SENDER
+        sync_state.SYNC_STATE_PATH = os.path.join(workdir, 'imap_sync.json')
+        download_attachments.PICTURE_FOLDER = os.path.join(workdir, 'raw_pictures')
+
+        saved = {}
+
+        def on_saved(path):
+            saved[os.path.basename(path)] = path
+
+        fetch_times, save_times = [], []
+        start = time.perf_counter()
+        if backend == 'async':
+            from ingestion import async_fetch
+            async_fetch.FINANCE_SENDERS, async_fetch.IMAP_FOLDERS = [], ['INBOX']
+            messages = async_fetch.get_finance_emails_concurrently('2025-03-01', '2025-04-01', incremental=False)
+        else:
+            messages = fetch_emails.get_finance_emails_in_period('2025-03-01', '2025-04-01', incremental=False)
+        while True:
+            t0 = time.perf_counter()
+            msg = next(messages, None)
+            t1 = time.perf_counter()
+            if msg is None:
+                break
+            fetch_times.append(t1 - t0)
+            download_attachments.extract_attachments(msg, on_saved=on_saved)
+            save_times.append(time.perf_counter() - t1)
+        total = time.perf_counter() - start
+
+    attachment_bytes = sum(len(s.data) for s in sheets)
+    report = {
+        "fetch": latency_stats(fetch_times, sum(fetch_times)),
+        "extract_attachments": latency_stats(save_times),
+        "ingestion_total_seconds": round(total, 4),
+        "imap_backend": backend,
+        "simulated_latency_ms": round(latency * 1000, 1),
+        "attachment_megabytes": round(attachment_bytes / 1e6, 3),
+        "messages": len(sheets),
+        "saved": len(saved),
+    }
+    return report, saved
+
+
+def run_verification(sheets: list, saved: dict, workdir: str, use_server: bool) -> tuple:
+    """TimesheetProcessor over every saved sheet. Returns (report, per-case rows)."""
+    from processing.payroll_verification import TimesheetProcessor, TOLERANCE
+
+    roster = os.path.join(workdir, 'roster.csv')
+    synthetic.write_roster(sheets, roster)
+    t0 = time.perf_counter()
+    processor = TimesheetProcessor(csv_path=roster, gpu=False, cache=None, use_server=use_server)
+    init_seconds = time.perf_counter() - t0
+
+    ocr_times, cases = [], []
+    for sheet in sheets:
+        path = saved.get(sheet.filename)
+        if path is None:
+            cases.append({"file": sheet.filename, "kind": sheet.kind, "error": "not saved"})
+            continue
+        t0 = time.perf_counter()
+        result = processor.process_image(path, report=False)
+        ocr_times.append(time.perf_counter() - t0)
+
+        hours = result["reported_hours"]
+        approved = abs(sheet.hours - sheet.agreed_hours) <= TOLERANCE
+        cases.append({
+            "file": sheet.filename, "kind": sheet.kind, "dpi": sheet.dpi, "skew": sheet.skew,
+            "seconds": round(ocr_times[-1], 4), "engine": result.get("engine"),
+            "name_ok": result["matched_name"] == sheet.name.lower(),
+            "hours_ok": isinstance(hours, float) and abs(hours - sheet.hours) < 0.01,
+            "verdict_ok": result["status"].startswith("✅") == approved,
+        })
+
+    # Validation alone (name lookup + comparison), with OCR out of the picture
+    validation_times = []
+    for sheet in sheets:
+        t0 = time.perf_counter()
+        for _ in range(VALIDATION_REPEAT):
+            processor.validate(sheet.filename, sheet.name, sheet.hours, report=False)
+        validation_times.append((time.perf_counter() - t0) / VALIDATION_REPEAT)
+
+    scored = [c for c in cases if "error" not in c]
+
+    def rate(key, rows):
+        return round(sum(c[key] for c in rows) / len(rows), 4) if rows else None
+
+    accuracy = {key: rate(key, scored) for key in ("name_ok", "hours_ok", "verdict_ok")}
+    accuracy["by_kind"] = {
+        kind: {key: rate(key, [c for c in scored if c["kind"] == kind]) for key in ("name_ok", "hours_ok", "verdict_ok")}
+        for kind in sorted({c["kind"] for c in scored})
+    }
+    report = {
+        "processor_init_seconds": round(init_seconds, 4),
+        "ocr_and_validation": latency_stats(ocr_times),
+        "validation_only": latency_stats(validation_times),
+        "accuracy": accuracy,
+    }
+    return report, cases
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end PROVE benchmark on synthetic timesheets.")
+    parser.add_argument("--count", type=int, default=24, help="Number of synthetic timesheets (default: 24).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-ocr", action="store_true", help="Only benchmark fetching and saving.")
+    parser.add_argument("--use-server", action="store_true", help="Let TimesheetProcessor use a running OCR server.")
+    parser.add_argument("--imap-backend", choices=("imaplib", "async"), default="imaplib")
+    parser.add_argument("--latency-ms", type=float, default=0.0,
+                        help="Simulated round-trip time added by the IMAP server to every command.")
+    parser.add_argument("--output", help="JSON result path (default: benchmarks/results/<timestamp>.json).")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    sheets = synthetic.generate(args.count, seed=args.seed)
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            "commit": _git_commit(), "host": socket.gethostname(), "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+        },
+        "config": {"count": len(sheets), "seed": args.seed, "kinds": sorted({s.kind for s in sheets}),
+                   "resolutions": list(synthetic.RESOLUTIONS), "skews": list(synthetic.SKEWS)},
+        "generation_seconds": round(time.perf_counter() - t0, 4),
+    }
+
+    with tempfile.TemporaryDirectory(prefix='prove-bench-') as workdir:
+        report["ingestion"], saved = run_ingestion(sheets, workdir, args.imap_backend, args.latency_ms / 1000)
+        if not args.skip_ocr:
+            report["verification"], report["cases"] = run_verification(sheets, saved, workdir, args.use_server)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"e2e-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(json.dumps({k: v for k, v in report.items() if k != "cases"}, indent=2, ensure_ascii=False))
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
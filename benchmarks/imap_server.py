@@ -0,0 +1,282 @@
+import os
+import sys
+import email
+import logging
+import time
+import select
+import threading
+import socketserver
+from datetime import datetime
+from email.header import decode_header, make_header
+from email.message import Message
+from email.utils import parsedate_to_datetime
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from ingestion.imap_structure import _parse_value
+
+# Minimal in-process IMAP4rev1 server for the benchmarks: just the commands that
+# ingestion/fetch_emails.py sends (LOGIN, SELECT, UID SEARCH, UID FETCH of
+# BODYSTRUCTURE / HEADER.FIELDS / BODY.PEEK[n], LOGOUT), plus IDLE for the watch mode,
+# over plain TCP on localhost.
+UIDVALIDITY = 1
+HOST = '127.0.0.1'
+
+logger = logging.getLogger(__name__)
+
+
+def _quote(value) -> str:
+    if value is None:
+        return 'NIL'
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def _params(pairs) -> str:
+    pairs = [(k, v) for k, v in pairs if v is not None]
+    if not pairs:
+        return 'NIL'
+    return '(' + ' '.join(f"{_quote(k.upper())} {_quote(v)}" for k, v in pairs) + ')'
+
+
+def _leaves(msg: Message, prefix: str = ''):
+    """Yields (section, part) for every non-multipart part, numbered like IMAP does."""
+    if msg.is_multipart():
+        for n, child in enumerate(msg.get_payload(), 1):
+            yield from _leaves(child, f"{prefix}.{n}" if prefix else str(n))
+    else:
+        yield prefix or '1', msg
+
+
+def bodystructure(msg: Message) -> str:
+    if msg.is_multipart():
+        children = ''.join(bodystructure(child) for child in msg.get_payload())
+        return f"({children} {_quote(msg.get_content_subtype().upper())})"
+    maintype, subtype = msg.get_content_maintype(), msg.get_content_subtype()
+    body = msg.get_payload()
+    size = len(body.encode('ascii', 'surrogateescape')) if isinstance(body, str) else 0
+    fields = [
+        _quote(maintype.upper()), _quote(subtype.upper()),
+        _params([(k, v) for k, v in msg.get_params(header='content-type')[1:]]),
+        'NIL', 'NIL', _quote(str(msg.get('Content-Transfer-Encoding', '7BIT')).upper()), str(size),
+    ]
+    if maintype == 'text':
+        fields.append(str(body.count('\n') if isinstance(body, str) else 0))
+    fields.append('NIL')  # md5
+    disposition = msg.get_content_disposition()
+    if disposition:
+        fields.append(f"({_quote(disposition.upper())} {_params(msg.get_params(header='content-disposition')[1:])})")
+    else:
+        fields.append('NIL')
+    return '(' + ' '.join(fields) + ')'
+
+
+class StoredMessage:
+    def __init__(self, uid: int, raw: bytes):
+        self.uid = uid
+        self.raw = raw
+        self.msg = email.message_from_bytes(raw)
+        self.date = parsedate_to_datetime(self.msg['Date']).replace(tzinfo=None)
+        sender = str(make_header(decode_header(self.msg.get('From', ''))))
+        self.sender = email.utils.parseaddr(sender)[1].lower()
+        self.sections = {section: part for section, part in _leaves(self.msg)}
+        self.structure = bodystructure(self.msg)
+
+    def header_fields(self, names: list) -> bytes:
+        wanted = {name.lower() for name in names}
+        lines = [f"{k}: {v}" for k, v in self.msg.items() if k.lower() in wanted]
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('utf-8')
+
+    def section(self, section: str) -> bytes:
+        part = self.sections.get(section)
+        if part is None:
+            return b''
+        body = part.get_payload()
+        return body.encode('ascii', 'surrogateescape') if isinstance(body, str) else b''
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    known = 0  # Messages this client was told about (SELECT / EXISTS), like a real server tracks per session
+
+    def send(self, line):
+        self.wfile.write(line if isinstance(line, bytes) else line.encode('utf-8'))
+
+    def announce(self):
+        """Sends "* n EXISTS" if messages arrived since the client last heard the count."""
+        count = len(self.server.messages)
+        if count != self.known:
+            self.known = count
+            self.send(f"* {count} EXISTS\r\n")
+
+    def handle(self):
+        self.send(f"* OK [CAPABILITY {self.server.capabilities}] PROVE benchmark IMAP ready\r\n")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            tag, _, rest = line.decode('utf-8').rstrip('\r\n').partition(' ')
+            command, _, args = rest.partition(' ')
+            command = command.upper()
+            if command == 'UID':
+                command, _, args = args.partition(' ')
+                command = 'UID ' + command.upper()
+            if self.server.latency:
+                time.sleep(self.server.latency)  # Simulated network round trip
+            try:
+                if not self.dispatch(tag, command, args):
+                    return
+            except Exception as e:
+                logger.error(f"Benchmark IMAP server: {command} failed: {e}")
+                self.send(f"{tag} BAD {e}\r\n")
+            self.wfile.flush()
+
+    def dispatch(self, tag: str, command: str, args: str) -> bool:
+        mailbox = self.server.messages
+        if command == 'CAPABILITY':
+            self.send(f"* CAPABILITY {self.server.capabilities}\r\n{tag} OK CAPABILITY completed\r\n")
+        elif command == 'LOGIN':
+            self.send(f"{tag} OK LOGIN completed\r\n")
+        elif command in ('SELECT', 'EXAMINE'):
+            uidnext = (mailbox[-1].uid + 1) if mailbox else 1
+            self.known = len(mailbox)
+            self.send(f"* {len(mailbox)} EXISTS\r\n* 0 RECENT\r\n"
+                      f"* OK [UIDVALIDITY {UIDVALIDITY}] UIDs valid\r\n* OK [UIDNEXT {uidnext}] Predicted next UID\r\n"
+                      f"{tag} OK [READ-WRITE] {command} completed\r\n")
+        elif command == 'UID SEARCH':
+            uids = [m.uid for m in self.search(args)]
+            self.announce()
+            self.send(f"* SEARCH {' '.join(map(str, uids))}\r\n{tag} OK SEARCH completed\r\n")
+        elif command == 'UID FETCH':
+            uid_spec, _, items = args.partition(' ')
+            self.fetch(uid_spec, items)
+            self.announce()
+            self.send(f"{tag} OK FETCH completed\r\n")
+        elif command == 'IDLE' and self.server.idle:
+            return self.idle(tag)
+        elif command == 'NOOP':
+            self.announce()
+            self.send(f"{tag} OK NOOP completed\r\n")
+        elif command == 'LOGOUT':
+            self.send(f"* BYE logging out\r\n{tag} OK LOGOUT completed\r\n")
+            return False
+        else:
+            self.send(f"{tag} BAD unsupported command {command}\r\n")
+        return True
+
+    def idle(self, tag: str) -> bool:
+        """
+        Announces every message the client has not heard of yet with "* n EXISTS" (including
+        ones that arrived before IDLE) until the client sends DONE.
+        """
+        self.send("+ idling\r\n")
+        self.wfile.flush()
+        while True:
+            with self.server.arrived:
+                if len(self.server.messages) == self.known:
+                    self.server.arrived.wait(0.05)
+            if len(self.server.messages) != self.known:
+                self.announce()
+                self.wfile.flush()
+            readable, _, _ = select.select([self.connection], [], [], 0)
+            if readable:
+                line = self.rfile.readline()
+                if not line:
+                    return False
+                self.send(f"{tag} OK IDLE terminated\r\n")
+                return True
+
+    @staticmethod
+    def _in_set(uid: int, spec: str, highest: int) -> bool:
+        for item in spec.split(','):
+            low, _, high = item.partition(':')
+            low = highest if low == '*' else int(low)
+            high = low if not high else (highest if high == '*' else int(high))
+            if min(low, high) <= uid <= max(low, high):
+                return True
+        return False
+
+    def search(self, args: str) -> list:
+        criteria, _ = _parse_value(args.encode('utf-8'), 0)
+        if not isinstance(criteria, list):
+            criteria, _ = _parse_value(b'(' + args.encode('utf-8') + b')', 0)
+        mailbox = self.server.messages
+        highest = mailbox[-1].uid if mailbox else 0
+        matches = list(mailbox)
+        i = 0
+        while i < len(criteria):
+            key = str(criteria[i]).upper()
+            value = criteria[i + 1] if i + 1 < len(criteria) else None
+            if key == 'FROM':
+                matches = [m for m in matches if str(value).lower() in m.sender]
+            elif key == 'SINCE':
+                since = datetime.strptime(value, '%d-%b-%Y')
+                matches = [m for m in matches if m.date.date() >= since.date()]
+            elif key == 'BEFORE':
+                before = datetime.strptime(value, '%d-%b-%Y')
+                matches = [m for m in matches if m.date.date() < before.date()]
+            elif key == 'UID':
+                matches = [m for m in matches if self._in_set(m.uid, value, highest)]
+            else:
+                i += 1
+                continue
+            i += 2
+        return matches
+
+    def fetch(self, uid_spec: str, items: str):
+        items, _ = _parse_value(items.encode('utf-8'), 0)
+        items = items if isinstance(items, list) else [items]
+        mailbox = self.server.messages
+        highest = mailbox[-1].uid if mailbox else 0
+        for seq, message in enumerate(mailbox, 1):
+            if not self._in_set(message.uid, uid_spec, highest):
+                continue
+            out = [f"* {seq} FETCH (UID {message.uid}".encode('utf-8')]
+            for item in items:
+                name = str(item).upper()
+                if name == 'UID':
+                    continue
+                if name == 'BODYSTRUCTURE':
+                    out.append(f" BODYSTRUCTURE {message.structure}".encode('utf-8'))
+                elif name.startswith('BODY.PEEK[') or name.startswith('BODY['):
+                    section = name[name.index('[') + 1:name.rindex(']')]
+                    if section.startswith('HEADER.FIELDS'):
+                        fields = section[section.index('(') + 1:section.rindex(')')].split()
+                        data = message.header_fields(fields)
+                    else:
+                        data = message.section(section)
+                    out.append(f" BODY[{section}] {{{len(data)}}}\r\n".encode('utf-8') + data)
+            out.append(b")\r\n")
+            self.send(b''.join(out))
+
+
+class BenchmarkIMAPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    """
+    Serves a fixed list of raw RFC 822 messages (UIDs 1..n in list order) on an
+    ephemeral localhost port. Use as a context manager; .port tells clients where to connect.
+    :param latency: Seconds added before answering every command, to simulate a remote server.
+    :param idle: Advertise and support IDLE; False makes clients fall back to polling.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, raw_messages: list, latency: float = 0.0, idle: bool = True):
+        self.messages = [StoredMessage(uid, raw) for uid, raw in enumerate(raw_messages, 1)]
+        self.latency = latency
+        self.idle = idle
+        self.capabilities = "IMAP4rev1 IDLE" if idle else "IMAP4rev1"
+        self.arrived = threading.Condition()
+        super().__init__((HOST, 0), _Handler)
+        self.port = self.server_address[1]
+
+    def deliver(self, raw: bytes) -> int:
+        """Adds a message while the server runs (next UID); idling clients are notified."""
+        with self.arrived:
+            uid = (self.messages[-1].uid + 1) if self.messages else 1
+            self.messages.append(StoredMessage(uid, raw))
+            self.arrived.notify_all()
+        return uid
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, name="benchmark-imap", daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,93 @@
+# python3 benchmarks/startup.py [--repeat N] [--max-seconds S]
+#
+# Startup-time regression check: the CLI entry points must come up without
+# loading the OCR stack. Every scenario runs in a fresh interpreter; the script
+# prints JSON and exits 1 if a scenario imports a heavy module or is too slow.
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+HEAVY_MODULES = ("torch", "easyocr", "pandas", "cv2", "pymupdf", "tesserocr", "pytesseract")
+DEFAULT_REPEAT = 5
+DEFAULT_MAX_SECONDS = 1.0  # Median wall time per scenario
+
+# name -> argv for run_prove.py (executed as __main__), or None for a plain import
+SCENARIOS = {
+    "help": ["--help"],
+    "run-argument-error": ["--start-date"],
+    "ingest-help": ["ingest", "--help"],
+}
+IMPORT_SCENARIOS = {
+    "import-ingestion": "ingestion.download_attachments",
+}
+
+_PROBE = """
+import sys, json, runpy
+sys.path.insert(0, {root!r})
+try:
+    if {module!r}:
+        __import__({module!r})
+    else:
+        sys.argv = ['run_prove.py'] + {argv!r}
+        runpy.run_path({script!r}, run_name='__main__')
+except SystemExit:
+    pass
+heavy = sorted({{m.split('.')[0] for m in sys.modules}} & set({heavy!r}))
+sys.__stdout__.write('\\n' + json.dumps(heavy) + '\\n')
+"""
+
+
+def _probe(argv=None, module=None) -> tuple:
+    """Runs one scenario in a fresh interpreter: (wall seconds, heavy modules it loaded)."""
+    code = _PROBE.format(root=REPO_ROOT, module=module or "", argv=argv or [],
+                         script=os.path.join(REPO_ROOT, "run_prove.py"), heavy=HEAVY_MODULES)
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    lines = proc.stdout.strip().splitlines()
+    try:
+        heavy = json.loads(lines[-1])
+    except (IndexError, ValueError):
+        heavy = [f"<probe failed: {proc.stderr.strip().splitlines()[-1:]}>"]
+    return elapsed, heavy
+
+
+def run(repeat: int = DEFAULT_REPEAT, max_seconds: float = DEFAULT_MAX_SECONDS) -> dict:
+    scenarios = [(name, dict(argv=argv)) for name, argv in SCENARIOS.items()]
+    scenarios += [(name, dict(module=module)) for name, module in IMPORT_SCENARIOS.items()]
+    results = {}
+    for name, kwargs in scenarios:
+        timings, heavy = [], []
+        for _ in range(repeat):
+            elapsed, heavy = _probe(**kwargs)
+            timings.append(elapsed)
+        median = statistics.median(timings)
+        results[name] = {
+            "median_seconds": round(median, 4),
+            "min_seconds": round(min(timings), 4),
+            "heavy_modules": heavy,
+            "ok": not heavy and median <= max_seconds,
+        }
+    return {"python": sys.version.split()[0], "repeat": repeat, "max_seconds": max_seconds,
+            "scenarios": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure CLI startup time and heavy imports.")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--max-seconds", type=float, default=DEFAULT_MAX_SECONDS)
+    args = parser.parse_args()
+
+    report = run(repeat=args.repeat, max_seconds=args.max_seconds)
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if all(s["ok"] for s in report["scenarios"].values()) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import io
+import random
+from datetime import date, timedelta
+from typing import NamedTuple
+from PIL import Image, ImageDraw, ImageFont  # Installed with EasyOCR
+
+try:
+    import pymupdf  # PyMuPDF
+except ImportError:  # PDF cases are skipped without it
+    pymupdf = None
+
+# Synthetic Norwegian timesheets with known "Navn" / "Sum timer til utbetaling" values.
+A4_POINTS = (595, 842)
+RESOLUTIONS = (100, 200, 300)  # DPI the page is rendered at
+SKEWS = (0.0, 1.5, -3.0)       # Degrees of rotation, like a photo taken slightly askew
+KINDS = ("jpg", "png", "pdf-text", "pdf-scan")
+
+FIRST_NAMES = ("Ola", "Kari", "Nora", "Emma", "Jakob", "Lukas", "Ingrid", "Sander", "Sofie", "Henrik",
+               "Maja", "Filip", "Ida", "Magnus", "Thea", "Aksel", "Solveig", "Øystein", "Åse", "Bjørn")
+LAST_NAMES = ("Nordmann", "Hansen", "Johansen", "Olsen", "Larsen", "Andersen", "Pedersen", "Nilsen",
+              "Kristiansen", "Jensen", "Karlsen", "Berg", "Haugen", "Hagen", "Johannessen", "Bakken")
+MONTHS = ("januar", "februar", "mars", "april", "mai", "juni", "juli", "august", "september",
+          "oktober", "november", "desember")
+
+
+class SyntheticTimesheet(NamedTuple):
+    filename: str
+    kind: str
+    name: str
+    hours: float
+    agreed_hours: float  # What the roster says; differs from hours for the "mismatch" cases
+    period: str
+    dpi: int
+    skew: float
+    data: bytes
+
+
+def _font(size: int):
+    for path in ("DejaVuSans.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", "Arial.ttf"):
+        try:
+            return ImageFont.truetype(path, size)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:  # Pillow < 10.1
+        return ImageFont.load_default()
+
+
+def _page_lines(name: str, hours: float, period: str, rng: random.Random) -> list:
+    """(x, y, text) in A4 points: header, a table of shifts and the sum row."""
+    lines = [(60, 60, "TIMELISTE"), (60, 110, f"Navn: {name}"), (60, 135, f"Periode: {period}"),
+             (60, 185, "Dato"), (220, 185, "Aktivitet"), (440, 185, "Timer")]
+    shifts = max(1, int(hours // 7.5))
+    remaining = hours
+    for i in range(shifts):
+        shift = remaining if i == shifts - 1 else 7.5
+        remaining -= shift
+        y = 210 + 22 * i
+        lines += [(60, y, f"{i + 1:02d}.{rng.randint(1, 12):02d}"), (220, y, rng.choice(("Mentor", "Leksehjelp", "Aktivitet"))),
+                  (440, y, f"{shift:.2f}".replace(".", ","))]
+    y = 230 + 22 * shifts
+    lines += [(60, y, "Sum timer til utbetaling"), (440, y, f"{hours:.2f}".replace(".", ",")),
+              (60, y + 60, "Signatur: ____________________")]
+    return lines
+
+
+def render_image(lines: list, dpi: int, skew: float, fmt: str) -> bytes:
+    scale = dpi / 72.0
+    size = (int(A4_POINTS[0] * scale), int(A4_POINTS[1] * scale))
+    image = Image.new("L", size, 255)
+    draw = ImageDraw.Draw(image)
+    font = _font(max(8, int(11 * scale)))
+    for x, y, text in lines:
+        draw.text((x * scale, y * scale), text, fill=0, font=font)
+    if skew:
+        image = image.rotate(skew, resample=Image.BICUBIC, fillcolor=255)
+    out = io.BytesIO()
+    if fmt == "jpg":
+        image.convert("RGB").save(out, format="JPEG", quality=85)
+    else:
+        image.save(out, format="PNG")
+    return out.getvalue()
+
+
+def render_pdf(lines: list, dpi: int, skew: float, scanned: bool) -> bytes:
+    """Text-layer PDF, or (scanned) a PDF whose only page content is a rendered image."""
+    doc = pymupdf.open()
+    page = doc.new_page(width=A4_POINTS[0], height=A4_POINTS[1])
+    if scanned:
+        page.insert_image(page.rect, stream=render_image(lines, dpi, skew, "jpg"))
+    else:
+        for x, y, text in lines:
+            page.insert_text((x, y + 11), text, fontsize=11)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def generate(count: int, seed: int = 0, kinds: tuple = KINDS, mismatch_ratio: float = 0.25) -> list:
+    """
+    count timesheets cycling through kinds, RESOLUTIONS and SKEWS (PDF kinds are
+    dropped without PyMuPDF). Deterministic for a given seed.
+    """
+    if count > len(FIRST_NAMES) * len(LAST_NAMES):
+        raise ValueError(f"At most {len(FIRST_NAMES) * len(LAST_NAMES)} distinct synthetic names")
+    rng = random.Random(seed)
+    kinds = tuple(k for k in kinds if pymupdf is not None or not k.startswith("pdf"))
+    sheets = []
+    used = set()
+    for i in range(count):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        while name in used:
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        used.add(name)
+        hours = rng.choice((7.5, 15.0, 22.5, 30.0, 37.5)) + rng.choice((0.0, 0.5, 1.0))
+        agreed = hours + rng.choice((2.0, -3.0)) if rng.random() < mismatch_ratio else hours
+        month = rng.randrange(12)
+        start = date(2025, month + 1, 1)
+        end = (date(2025, month + 2, 1) if month < 11 else date(2026, 1, 1)) - timedelta(days=1)
+        period = f"{start:%d.%m.%Y} - {end:%d.%m.%Y}"
+        kind = kinds[i % len(kinds)]
+        dpi = RESOLUTIONS[(i // len(kinds)) % len(RESOLUTIONS)]
+        skew = SKEWS[(i // (len(kinds) * len(RESOLUTIONS))) % len(SKEWS)] if kind != "pdf-text" else 0.0
+        lines = _page_lines(name, hours, period, rng)
+        if kind.startswith("pdf"):
+            data = render_pdf(lines, dpi, skew, scanned=kind == "pdf-scan")
+            ext = "pdf"
+        else:
+            data = render_image(lines, dpi, skew, kind)
+            ext = kind
+        filename = f"timeliste_{i:04d}_{MONTHS[month]}.{ext}"
+        sheets.append(SyntheticTimesheet(filename, kind, name, hours, agreed, period, dpi, skew, data))
+    return sheets
+
+
+def write_roster(sheets: list, path: str, extra_names: int = 50, seed: int = 0):
+    """Reference CSV in the format TimesheetProcessor reads, plus unrelated names as distractors."""
+    rng = random.Random(seed + 1)
+    rows = [(s.name, s.agreed_hours) for s in sheets]
+    known = {s.name for s in sheets}
+    while len(rows) < len(sheets) + extra_names:
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}-{rng.choice(LAST_NAMES)}"
+        if name not in known:
+            known.add(name)
+            rows.append((name, rng.choice((10.0, 20.0, 30.0))))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("Name,agreed hours,extra hours,hours given away\n")
+        for name, agreed in rows:
+            f.write(f"{name},{agreed},0,0\n")
@@ -0,0 +1,112 @@
+# python3 benchmarks/watch.py [--messages 10] [--interval 0.5] [--poll-interval 5] [--output results.json]
+#
+# Watch-mode latency: messages are delivered one by one to the in-process IMAP server while
+# ingestion/watch.py watches it, and the time from delivery until the attachment is stored
+# is measured, once with IMAP IDLE and once with the polling fallback. No OCR is involved.
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+from datetime import datetime, timezone
+from email.mime.application import MIMEApplication
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from email.utils import format_datetime
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from benchmarks.e2e import FINANCE_SENDER, RESULTS_DIR, latency_stats
+from benchmarks.imap_server import BenchmarkIMAPServer
+
+ATTACHMENT_BYTES = 200 * 1024
+TIMEOUT = 60.0  # Seconds to wait for one message before giving up
+
+
+def build_email(idx: int) -> bytes:
+    msg = MIMEMultipart()
+    msg['From'] = FINANCE_SENDER
+    msg['To'] = 'prove@example.no'
+    msg['Subject'] = f'Timeliste {idx}'
+    msg['Date'] = format_datetime(datetime.now(timezone.utc))
+    msg.attach(MIMEText('Vedlagt timeliste.', 'plain', 'utf-8'))
+    part = MIMEApplication(os.urandom(ATTACHMENT_BYTES), _subtype='pdf')
+    part.add_header('Content-Disposition', 'attachment', filename=f'watch_{idx:04d}.pdf')
+    msg.attach(part)
+    return msg.as_bytes()
+
+
+def run_watch(messages: int, interval: float, idle: bool, poll_interval: float, workdir: str) -> dict:
+    from ingestion import download_attachments, fetch_emails, sync_state
+    from ingestion.watch import watch_mailbox
+
+    stored = {}
+    arrived = threading.Condition()
+
+    def on_saved(path):
+        with arrived:
+            stored[os.path.basename(path)] = time.perf_counter()
+            arrived.notify_all()
+
+    with BenchmarkIMAPServer([], idle=idle) as server:
+        fetch_emails.IMAP_HOST, fetch_emails.IMAP_PORT, fetch_emails.IMAP_SSL = '127.0.0.1', server.port, False
+        fetch_emails.IMAP_USER = fetch_emails.IMAP_PASSWORD = 'bench'
+        fetch_emails.FINANCE_SENDER = FINANCE_SENDER
+        sync_state.SYNC_STATE_PATH = os.path.join(workdir, f'imap_sync_{idle}.json')
+        download_attachments.PICTURE_FOLDER = os.path.join(workdir, f'raw_pictures_{idle}')
+
+        stop = threading.Event()
+        watcher = threading.Thread(
+            target=watch_mailbox, name="benchmark-watch", daemon=True,
+            args=(lambda msg: download_attachments.extract_attachments(msg, on_saved=on_saved), stop),
+            kwargs={"senders": [FINANCE_SENDER], "folders": ["INBOX"], "use_idle": idle,
+                    "poll_interval": poll_interval},
+        )
+        watcher.start()
+        time.sleep(0.5)  # Let the watcher connect and catch up on the empty mailbox
+
+        latencies, missed = [], 0
+        for idx in range(messages):
+            name = f'watch_{idx:04d}.pdf'
+            raw = build_email(idx)
+            delivered = time.perf_counter()
+            server.deliver(raw)
+            with arrived:
+                arrived.wait_for(lambda: name in stored, timeout=TIMEOUT)
+            if name in stored:
+                latencies.append(stored[name] - delivered)
+            else:
+                missed += 1
+            time.sleep(interval)
+        stop.set()
+        watcher.join(timeout=10)
+
+    return dict(latency_stats(latencies), mode="idle" if idle else f"poll every {poll_interval:g}s", missed=missed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch-mode delivery-to-stored latency, IDLE vs polling.")
+    parser.add_argument("--messages", type=int, default=10)
+    parser.add_argument("--interval", type=float, default=0.5, help="Seconds between deliveries.")
+    parser.add_argument("--poll-interval", type=float, default=5.0)
+    parser.add_argument("--output", help="JSON result path (default: benchmarks/results/watch-<timestamp>.json).")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='prove-watch-') as workdir:
+        report = {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            "idle": run_watch(args.messages, args.interval, True, args.poll_interval, workdir),
+            "poll": run_watch(args.messages, args.interval, False, args.poll_interval, workdir),
+        }
+
+    output = args.output or os.path.join(RESULTS_DIR, f"watch-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
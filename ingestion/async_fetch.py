@@ -0,0 +1,564 @@
+import os
+import re
+import ssl
+import sys
+import asyncio
+import logging
+import threading
+from collections import defaultdict, deque
+from contextlib import asynccontextmanager
+from datetime import datetime
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from ingestion import fetch_emails
+from ingestion.imap_structure import (
+    HEADER_FIELDS, attachment_parts, build_message, header_bytes,
+    parse_fetch_response, section_body, uid_set,
+)
+from ingestion.sync_state import load_sync_state, record_sync, sync_key, usable_mark
+from monitoring import metrics
+
+# asyncio ingestion backend: a small pool of authenticated IMAP connections searches every
+# sender in every folder and keeps several FETCH commands in flight per connection, so a
+# month of mail costs a few round trips instead of one per message. Connection settings
+# (host, user, password, port, SSL) are the ones in fetch_emails.py.
+FINANCE_SENDERS = [s.strip() for s in os.getenv('FINANCE_SENDERS', '').split(',') if s.strip()]
+IMAP_FOLDERS = [f.strip() for f in os.getenv('IMAP_FOLDERS', 'INBOX').split(',') if f.strip()]
+POOL_SIZE = int(os.getenv('IMAP_POOL_SIZE', 4))  # Connections; most servers allow ~10 per account
+PIPELINE_DEPTH = 4        # Commands in flight per connection
+CHUNK_SIZE = 10           # UIDs per fetch job (jobs are what gets spread over the pool)
+MAX_RETRIES = 3           # Per job; every retry reconnects first
+RETRY_BACKOFF = 0.5       # Seconds, doubled after every failed reconnect
+COMMAND_TIMEOUT = 120.0   # Seconds for one command (large attachments on a slow link)
+QUEUE_SIZE = 16           # Fetched messages waiting for the consumer before fetching pauses
+LINE_LIMIT = 1 << 20      # Longest response line outside literals (BODYSTRUCTURE of huge messages)
+
+_LITERAL_TAIL = re.compile(rb'\{(\d+)\}\r\n$')
+_UIDVALIDITY = re.compile(rb'\[UIDVALIDITY (\d+)\]', re.IGNORECASE)
+_FETCH = re.compile(rb'^(\d+) FETCH ', re.IGNORECASE)
+_EXISTS = re.compile(rb'^\d+ (EXISTS|RECENT)', re.IGNORECASE)
+_DONE = object()
+
+logger = logging.getLogger(__name__)
+
+
+class IMAPError(Exception):
+    """A command completed with NO or BAD (retrying on the same server will not help)."""
+
+
+def quote_string(value: str) -> str:
+    """IMAP quoted string (RFC 3501) for a folder, search key or login argument."""
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+class _Command:
+    def __init__(self, tag: bytes, future: asyncio.Future):
+        self.tag = tag
+        self.future = future
+        self.untagged = []
+
+
+class AsyncIMAPConnection:
+    """
+    One IMAP connection with pipelining: send() may be called by several tasks at once.
+    A single reader task hands untagged responses to the oldest unfinished command (servers
+    answer pipelined commands in order) and completes commands by their tag.
+    """
+
+    def __init__(self, host: str, port: int, use_ssl: bool, user: str, password: str, name: str = 'imap'):
+        self.host, self.port, self.use_ssl = host, port, use_ssl
+        self.user, self.password = user, password
+        self.name = name
+        self.selected = None
+        self.uidvalidity = {}  # folder -> UIDVALIDITY seen at SELECT
+        self.generation = 0    # Incremented by every (re)connect
+        self._reader = self._writer = self._read_task = None
+        self._pending = deque()
+        self._tags = 0
+        self._users = 0
+        self._state = None     # asyncio.Condition guarding selected / _users
+        self._reconnect_lock = None
+        self._continuation = None  # Future for the next "+ ..." response (IDLE)
+        self._new_mail = None      # asyncio.Event set by EXISTS/RECENT while idling
+        self.mail_announced = False  # Set by every EXISTS/RECENT; cleared by whoever wants to know (watch)
+
+    async def connect(self):
+        if self._state is None:
+            self._state = asyncio.Condition()
+            self._reconnect_lock = asyncio.Lock()
+        context = ssl.create_default_context() if self.use_ssl else None
+        with metrics.span("imap.connect"):
+            self._reader, self._writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port, ssl=context, limit=LINE_LIMIT), COMMAND_TIMEOUT)
+            greeting = await self._read_response()
+            if not greeting.startswith(b'* OK') and not greeting.startswith(b'* PREAUTH'):
+                raise ConnectionError(f"Unexpected IMAP greeting: {greeting[:80]!r}")
+            self.selected = None
+            self.generation += 1
+            self._read_task = asyncio.ensure_future(self._read_loop())
+            if not greeting.startswith(b'* PREAUTH'):
+                await self.send(f"LOGIN {quote_string(self.user)} {quote_string(self.password)}")
+
+    async def reconnect(self, generation: int, delay: float):
+        """Reconnects unless another task already did since generation was observed."""
+        async with self._reconnect_lock:
+            if self.generation != generation:
+                return
+            await self.close()
+            await asyncio.sleep(delay)
+            logger.info(f"🔁 {self.name}: reconnecting to {self.host}:{self.port}")
+            await self.connect()
+
+    async def close(self):
+        if self._read_task is not None:
+            self._read_task.cancel()
+            self._read_task = None
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except (OSError, ssl.SSLError):
+                pass
+            self._writer = None
+        self._fail_pending(ConnectionError("IMAP connection closed"))
+
+    async def logout(self):
+        try:
+            await asyncio.wait_for(self.send("LOGOUT"), 5)
+        except (OSError, asyncio.TimeoutError, IMAPError):
+            pass
+        await self.close()
+
+    async def _read_response(self) -> bytes:
+        """One complete response, literals inlined as {n}\\r\\n<n bytes>, without the final CRLF."""
+        line = await self._reader.readuntil(b'\r\n')
+        buf = bytearray(line)
+        match = _LITERAL_TAIL.search(line)
+        while match:
+            buf += await self._reader.readexactly(int(match.group(1)))
+            line = await self._reader.readuntil(b'\r\n')
+            buf += line
+            match = _LITERAL_TAIL.search(line)
+        metrics.count("imap_bytes_fetched", len(buf))
+        return bytes(buf[:-2])
+
+    async def _read_loop(self):
+        try:
+            while True:
+                raw = await self._read_response()
+                if raw.startswith(b'* '):
+                    if self._pending:
+                        self._pending[0].untagged.append(raw[2:])
+                    if _EXISTS.match(raw[2:]):
+                        self.mail_announced = True
+                        if self._new_mail is not None:
+                            self._new_mail.set()
+                    continue
+                if raw.startswith(b'+'):
+                    if self._continuation is not None and not self._continuation.done():
+                        self._continuation.set_result(raw)
+                    continue
+                tag, _, rest = raw.partition(b' ')
+                for command in self._pending:
+                    if command.tag == tag:
+                        self._pending.remove(command)
+                        if not command.future.done():
+                            command.future.set_result((rest, command.untagged))
+                        break
+        except asyncio.CancelledError:
+            raise
+        except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ssl.SSLError) as e:
+            self._fail_pending(ConnectionError(f"IMAP connection lost: {e}"))
+
+    def _fail_pending(self, error: Exception):
+        while self._pending:
+            command = self._pending.popleft()
+            if not command.future.done():
+                command.future.set_exception(error)
+                command.future.exception()  # Mark retrieved: a cancelled waiter (e.g. IDLE) no longer reads it
+
+    async def _start(self, command: str) -> _Command:
+        if self._writer is None or self._read_task is None or self._read_task.done():
+            raise ConnectionError("IMAP connection is not open")
+        self._tags += 1
+        tag = f"P{self._tags:05d}".encode('ascii')
+        pending = _Command(tag, asyncio.get_running_loop().create_future())
+        self._pending.append(pending)
+        self._writer.write(tag + b' ' + command.encode('utf-8') + b'\r\n')
+        await self._writer.drain()
+        return pending
+
+    @staticmethod
+    async def _finish(pending: _Command, command: str, timeout: float = COMMAND_TIMEOUT) -> list:
+        status, untagged = await asyncio.wait_for(pending.future, timeout)
+        if not status.upper().startswith(b'OK'):
+            raise IMAPError(f"{command.split(' ', 1)[0]} failed: {status.decode('utf-8', 'replace')}")
+        return untagged
+
+    async def send(self, command: str) -> list:
+        """Sends one command and waits for its completion. Returns its untagged responses."""
+        return await self._finish(await self._start(command), command)
+
+    async def capabilities(self) -> set:
+        capabilities = set()
+        for response in await self.send("CAPABILITY"):
+            if response[:10].upper() == b'CAPABILITY':
+                capabilities.update(response.decode('ascii', 'replace').upper().split()[1:])
+        return capabilities
+
+    async def idle(self, timeout: float) -> bool:
+        """
+        IDLE (RFC 2177) on the selected folder until the server reports new mail or timeout
+        seconds pass. Must not run concurrently with other commands on this connection.
+        :returns: True if new mail was announced.
+        """
+        loop = asyncio.get_running_loop()
+        self._continuation = loop.create_future()
+        self._new_mail = asyncio.Event()
+        try:
+            pending = await self._start("IDLE")
+            await asyncio.wait([self._continuation, pending.future], timeout=COMMAND_TIMEOUT,
+                               return_when=asyncio.FIRST_COMPLETED)
+            if pending.future.done():  # Refused (NO/BAD) or connection lost
+                await self._finish(pending, "IDLE")
+                return False
+            if not self._continuation.done():
+                raise asyncio.TimeoutError("No IDLE continuation from server")
+            new_mail = asyncio.ensure_future(self._new_mail.wait())
+            try:
+                await asyncio.wait([new_mail, pending.future], timeout=timeout,
+                                   return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                new_mail.cancel()
+            if not pending.future.done():
+                self._writer.write(b'DONE\r\n')
+                await self._writer.drain()
+            await self._finish(pending, "IDLE")
+            return self._new_mail.is_set()
+        finally:
+            self._continuation = None
+            self._new_mail = None
+
+    @asynccontextmanager
+    async def mailbox(self, folder: str):
+        """
+        Runs the block with folder selected. Blocks for the same folder share the connection;
+        a different folder waits until they are finished, then is selected.
+        """
+        async with self._state:
+            while self.selected != folder and self._users:
+                await self._state.wait()
+            if self.selected != folder:
+                untagged = await self.send(f"SELECT {quote_string(folder)}")
+                self.selected = folder
+                for response in untagged:
+                    match = _UIDVALIDITY.search(response)
+                    if match:
+                        self.uidvalidity[folder] = int(match.group(1))
+            self._users += 1
+        try:
+            yield self
+        finally:
+            async with self._state:
+                self._users -= 1
+                self._state.notify_all()
+
+    async def uid_search(self, query: str) -> list:
+        untagged = await self.send(f"UID SEARCH {query}")
+        uids = []
+        for response in untagged:
+            if response[:6].upper() == b'SEARCH':
+                uids += [int(uid) for uid in response[6:].split()]
+        return uids
+
+    async def uid_fetch(self, uids: list, items: str) -> list:
+        """Parsed FETCH responses (see imap_structure.parse_fetch_response)."""
+        untagged = await self.send(f"UID FETCH {uid_set(uids)} {items}")
+        parsed = []
+        for response in untagged:
+            match = _FETCH.match(response)
+            if not match:
+                continue
+            try:
+                parsed.append(parse_fetch_response(match.group(1) + b' ' + response[match.end():]))
+            except (ValueError, IndexError) as e:
+                logger.warning(f"Could not parse FETCH response: {e}")
+        return parsed
+
+
+class AsyncIMAPPool:
+    """
+    size connections to the same account. run(jobs) spreads coroutine jobs over them,
+    PIPELINE_DEPTH at a time per connection; a job that hits a connection error
+    reconnects its connection and is retried up to MAX_RETRIES times.
+    """
+
+    def __init__(self, size: int = POOL_SIZE):
+        self.size = max(1, size)
+        self.connections = []
+
+    async def __aenter__(self):
+        candidates = [
+            AsyncIMAPConnection(fetch_emails.IMAP_HOST, fetch_emails.IMAP_PORT, fetch_emails.IMAP_SSL,
+                                fetch_emails.IMAP_USER, fetch_emails.IMAP_PASSWORD, name=f"imap-{i}")
+            for i in range(self.size)
+        ]
+        outcomes = await asyncio.gather(*(c.connect() for c in candidates), return_exceptions=True)
+        for connection, outcome in zip(candidates, outcomes):
+            if isinstance(outcome, BaseException):
+                logger.warning(f"{connection.name}: could not connect: {outcome}")
+                await connection.close()
+            else:
+                self.connections.append(connection)
+        if not self.connections:
+            raise ConnectionError(f"No IMAP connection to {fetch_emails.IMAP_HOST} could be opened")
+        logger.info(f"Opened {len(self.connections)} IMAP connection(s) to {fetch_emails.IMAP_HOST}")
+        return self
+
+    async def __aexit__(self, *exc):
+        await asyncio.gather(*(c.logout() for c in self.connections), return_exceptions=True)
+
+    async def _attempt(self, connection: AsyncIMAPConnection, job):
+        delay = RETRY_BACKOFF
+        for attempt in range(MAX_RETRIES + 1):
+            generation = connection.generation
+            try:
+                return await job(connection)
+            except (ConnectionError, OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+                if attempt == MAX_RETRIES:
+                    raise
+                logger.warning(f"{connection.name}: {e}; retry {attempt + 1}/{MAX_RETRIES}")
+                metrics.count("imap_retries")
+                try:
+                    await connection.reconnect(generation, delay)
+                except (ConnectionError, OSError, asyncio.TimeoutError, IMAPError) as reconnect_error:
+                    logger.warning(f"{connection.name}: reconnect failed: {reconnect_error}")
+                delay *= 2
+
+    async def run(self, jobs: list) -> list:
+        """
+        Runs every job (an async callable taking a connection). Returns their results in
+        job order; a job that still fails after its retries yields its exception instead.
+        """
+        results = [None] * len(jobs)
+        queue = deque(enumerate(jobs))
+
+        async def lane(connection):
+            while queue:
+                idx, job = queue.popleft()
+                try:
+                    results[idx] = await self._attempt(connection, job)
+                except (ConnectionError, OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, IMAPError) as e:
+                    results[idx] = e
+
+        # Round-robin, so the first jobs go to different connections rather than all to the first one
+        await asyncio.gather(*(lane(c) for _ in range(PIPELINE_DEPTH) for c in self.connections))
+        return results
+
+
+def _search_query(sender: str, since_date: str, before_date: str, last_uid: int) -> str:
+    query = f'FROM {quote_string(sender)} SINCE {since_date} BEFORE {before_date}'
+    if last_uid:
+        query += f' UID {last_uid + 1}:*'
+    return f'({query})'
+
+
+async def _search_all(pool: AsyncIMAPPool, senders: list, folders: list, since_date: str,
+                      before_date: str, incremental: bool, since: str) -> dict:
+    """
+    One UID SEARCH per (folder, sender), all in flight at once.
+    :param since: Start of the window as YYYY-MM-DD; the stored mark only applies from the window it was recorded for.
+    Returns {sync key: (folder, uidvalidity, mark or None, previous state, [uids])}.
+    """
+    targets = [(folder, sender) for folder in folders for sender in senders]
+
+    def search_job(folder, sender):
+        async def job(connection):
+            async with connection.mailbox(folder):
+                uidvalidity = connection.uidvalidity.get(folder, 0)
+                key = sync_key(fetch_emails.IMAP_HOST, fetch_emails.IMAP_USER, folder, sender)
+                state = load_sync_state(key) if incremental else None
+                mark = usable_mark(state, uidvalidity, since)
+                last_uid = mark or 0
+                if mark is None and state is not None:
+                    if state[0] != uidvalidity:
+                        logger.warning(f"UIDVALIDITY of {folder} changed ({state[0]} -> {uidvalidity}), "
+                                       f"doing a full resync for {sender}.")
+                    else:
+                        logger.warning(f"Period starts before the synced window of {sender} in {folder} "
+                                       f"({state[2] or 'unknown'}), searching all of it.")
+                with metrics.span("imap.search"):
+                    uids = await connection.uid_search(_search_query(sender, since_date, before_date, last_uid))
+                # "UID n:*" always matches the newest message, even when its UID is below n
+                return key, (folder, uidvalidity, mark, state, sorted(u for u in uids if u > last_uid))
+        return job
+
+    plan = {}
+    for (folder, sender), outcome in zip(targets, await pool.run([search_job(f, s) for f, s in targets])):
+        if isinstance(outcome, Exception):
+            logger.error(f"❌ IMAP search failed for {sender} in {folder}: {outcome}")
+            continue
+        key, entry = outcome
+        plan[key] = entry
+    return plan
+
+
+def fetch_job(folder: str, uids: list, out: asyncio.Queue):
+    """
+    Job: BODYSTRUCTURE + headers of uids, then only their png/jpg/jpeg/pdf parts (like fetch_emails.py).
+    Messages are put on out one by one; when the pool retries a job that failed partway, only the
+    UIDs not put yet are fetched again, so the consumer never sees a message twice.
+    Returns the UIDs put on out, over all attempts.
+    """
+    sent = set()
+
+    async def job(connection):
+        pending = [uid for uid in uids if uid not in sent]
+        if not pending:
+            return sorted(sent)
+        async with connection.mailbox(folder):
+            with metrics.span("imap.fetch_structure", messages=len(pending)):
+                responses = await connection.uid_fetch(pending, f'(UID BODYSTRUCTURE {HEADER_FIELDS})')
+            structures = {}
+            for items in responses:
+                if 'UID' not in items or 'BODYSTRUCTURE' not in items:
+                    continue
+                try:
+                    structures[int(items['UID'])] = (header_bytes(items), attachment_parts(items['BODYSTRUCTURE']))
+                except (IndexError, TypeError) as e:
+                    logger.warning(f"Could not read BODYSTRUCTURE of UID {items['UID']} in {folder}: {e}")
+
+            groups = defaultdict(list)
+            for uid in sorted(structures):
+                parts = structures[uid][1]
+                if parts:
+                    groups[tuple(part.section for part in parts)].append(uid)
+                else:
+                    logger.info(f"No image/PDF attachments in UID {uid} ({folder}), skipping download.")
+
+            async def fetch_group(sections, group_uids):
+                items_spec = ' '.join(f'BODY.PEEK[{section}]' for section in sections)
+                with metrics.span("imap.fetch_bodies", messages=len(group_uids)):
+                    responses = await connection.uid_fetch(group_uids, f'(UID {items_spec})')
+                return {int(items['UID']): {s: section_body(items, s) for s in sections}
+                        for items in responses if 'UID' in items}
+
+            # Every layout group is its own pipelined FETCH on this connection
+            bodies = {}
+            for fetched in await asyncio.gather(*(fetch_group(s, u) for s, u in groups.items())):
+                bodies.update(fetched)
+
+            for uid in sorted(structures):
+                headers, parts = structures[uid]
+                fetched = bodies.pop(uid, {})
+                payloads = [(part, fetched[part.section]) for part in parts if fetched.get(part.section) is not None]
+                if parts and not payloads:
+                    logger.warning(f"Failed to fetch email UID {uid} in {folder}")
+                    continue
+                if not parts:
+                    await out.put((folder, uid, None))  # Nothing to download, but the mark may move past it
+                else:
+                    metrics.count("imap_messages_fetched")
+                    await out.put((folder, uid, build_message(headers, payloads)))
+                sent.add(uid)
+            return sorted(sent)
+    return job
+
+
+async def _produce(out: asyncio.Queue, plan_ready: asyncio.Future, senders: list, folders: list,
+                   since_date: str, before_date: str, incremental: bool, pool_size: int, since: str):
+    try:
+        async with AsyncIMAPPool(pool_size) as pool:
+            plan = await _search_all(pool, senders, folders, since_date, before_date, incremental, since)
+            plan_ready.set_result(plan)
+            by_folder = defaultdict(set)
+            for folder, _, _, _, uids in plan.values():
+                by_folder[folder].update(uids)  # A message from two listed senders is fetched once
+            jobs = []
+            for folder, uids in by_folder.items():
+                ordered = sorted(uids)
+                jobs += [fetch_job(folder, ordered[i:i + CHUNK_SIZE], out) for i in range(0, len(ordered), CHUNK_SIZE)]
+            logger.info(f"✅ Found {sum(len(u) for u in by_folder.values())} matching email(s) "
+                        f"in {len(folders)} folder(s) from {len(senders)} sender(s).")
+            for outcome in await pool.run(jobs):
+                if isinstance(outcome, Exception):
+                    logger.error(f"❌ IMAP fetch failed: {outcome}")
+    except Exception as e:
+        logger.error(f"❌ IMAP error: {e}")
+    finally:
+        if not plan_ready.done():
+            plan_ready.set_result({})
+    # Not reached when the consumer cancelled us; then nobody is reading anymore
+    await out.put(_DONE)
+
+
+async def _wait(future: asyncio.Future):
+    return await future
+
+
+def get_finance_emails_concurrently(start_date, end_date, incremental=True, senders=None, folders=None,
+                                    pool_size=POOL_SIZE):
+    """
+    Drop-in for fetch_emails.get_finance_emails_in_period over several senders and folders:
+    yields email.message.Message objects (image/PDF parts only) as they arrive, fetched
+    over an asyncio connection pool running in a background thread. At most QUEUE_SIZE
+    messages are buffered, so a slow consumer pauses fetching.
+    Input dates: YYYY-MM-DD. The high-water mark is kept per folder and sender
+    (state/imap_sync.json) and, as in fetch_emails.py, only advances over messages the
+    caller has finished with. Closing the generator early cancels all outstanding IMAP work.
+    :param senders: Sender addresses; FINANCE_SENDERS, or FINANCE_SENDER, by default.
+    :param folders: Mailbox folders; IMAP_FOLDERS (default INBOX) by default.
+    """
+    senders = senders or FINANCE_SENDERS or [s for s in [fetch_emails.FINANCE_SENDER] if s]
+    folders = folders or IMAP_FOLDERS
+    if not all([fetch_emails.IMAP_HOST, fetch_emails.IMAP_USER, fetch_emails.IMAP_PASSWORD, senders]):
+        logger.error("Missing IMAP configuration or finance sender address.")
+        return
+
+    since_date = datetime.strptime(start_date, '%Y-%m-%d').strftime('%d-%b-%Y')
+    before_date = datetime.strptime(end_date, '%Y-%m-%d').strftime('%d-%b-%Y')
+    logger.info(f"Fetching emails from {', '.join(senders)} in {', '.join(folders)} "
+                f"between {since_date} and {before_date}")
+
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, name="prove-imap", daemon=True)
+    thread.start()
+
+    async def start():
+        out = asyncio.Queue(maxsize=QUEUE_SIZE)
+        plan_ready = loop.create_future()
+        task = asyncio.ensure_future(_produce(out, plan_ready, senders, folders, since_date, before_date,
+                                              incremental, pool_size, start_date))
+        return out, plan_ready, task
+
+    out, plan_ready, task = asyncio.run_coroutine_threadsafe(start(), loop).result()
+    done = defaultdict(set)  # folder -> UIDs the caller has finished with
+    plan = {}
+    try:
+        plan = asyncio.run_coroutine_threadsafe(_wait(plan_ready), loop).result()
+        while True:
+            item = asyncio.run_coroutine_threadsafe(out.get(), loop).result()
+            if item is _DONE:
+                break
+            folder, uid, msg = item
+            if msg is not None:
+                yield msg
+            done[folder].add(uid)
+        logger.info(f"✅ Completed fetching {sum(len(u) for u in done.values())} emails.")
+    finally:
+        loop.call_soon_threadsafe(task.cancel)
+        try:
+            asyncio.run_coroutine_threadsafe(asyncio.wait([task]), loop).result(timeout=10)
+        except Exception:
+            pass
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=10)
+        if not loop.is_running():
+            loop.close()
+        for key, (folder, uidvalidity, mark, state, uids) in plan.items():
+            # Never move the mark past a message that failed or was not consumed
+            high_water = mark or 0
+            for uid in uids:
+                if uid not in done[folder]:
+                    break
+                high_water = uid
+            record_sync(key, state, uidvalidity, mark, high_water, start_date)
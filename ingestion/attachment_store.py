@@ -0,0 +1,127 @@
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+from datetime import datetime
+
+# Content-addressed store for downloaded timesheets. Every unique document is kept once,
+# no matter how many emails carried it (forwarded, re-sent, CC'd):
+#   <root>/ab/<sha256>/<original filename>
+# and <root>/index.jsonl records, per SHA-256, the stored path and every email it came in.
+INDEX_NAME = 'index.jsonl'
+
+logger = logging.getLogger(__name__)
+
+
+def is_store(folder: str) -> bool:
+    return os.path.isfile(os.path.join(folder, INDEX_NAME))
+
+
+class AttachmentStore:
+    """
+    Index lines (append-only): {"sha256", "path" (relative to root), "size", "filename",
+    "subject", "date", "sender", "seen_at"}. The first line of a hash is the stored copy;
+    later lines only add sources. Reading the index replaces listing a growing directory.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self.index_path = os.path.join(self.root, INDEX_NAME)
+        self.documents = {}  # sha256 -> {"path", "size", "sources": [...]}
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        self._apply(json.loads(line))
+                    except (ValueError, KeyError, TypeError):
+                        continue  # Partially written line of a killed run
+        except FileNotFoundError:
+            open(self.index_path, 'a', encoding='utf-8').close()  # Marks root as a store (see is_store)
+
+    def _apply(self, entry: dict):
+        document = self.documents.get(entry["sha256"])
+        if document is None:
+            document = self.documents[entry["sha256"]] = {"path": entry["path"], "size": entry.get("size"),
+                                                          "sources": []}
+        document["sources"].append({k: entry.get(k) for k in ("filename", "subject", "date", "sender", "seen_at")})
+
+    def _append(self, entry: dict):
+        with open(self.index_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self._apply(entry)
+
+    def path_of(self, sha256: str) -> str:
+        return os.path.join(self.root, self.documents[sha256]["path"])
+
+    def add_stream(self, chunks, filename: str, source: dict = None) -> tuple:
+        """
+        Streams chunks into the store, hashing while writing.
+        :param filename: Original attachment name; the stored file keeps it.
+        :param source: Where it came from ({"subject", "date", "sender"}); recorded in the index.
+        :returns: (stored path, bytes, new) - new is False for a document already in the store
+                  (nothing is written then, only the extra source is indexed). bytes 0 = empty, not stored.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+            if not size:
+                return None, 0, False
+            sha256 = digest.hexdigest()
+            entry = dict(source or {}, sha256=sha256, size=size, filename=filename,
+                         seen_at=datetime.now().isoformat(timespec='seconds'))
+            with self._lock:
+                if sha256 in self.documents:
+                    self._append(dict(entry, path=self.documents[sha256]["path"]))
+                    return self.path_of(sha256), size, False
+                relative = os.path.join(sha256[:2], sha256, filename)
+                os.makedirs(os.path.join(self.root, sha256[:2], sha256), exist_ok=True)
+                os.replace(tmp_path, os.path.join(self.root, relative))
+                self._append(dict(entry, path=relative))
+                return self.path_of(sha256), size, True
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def add_file(self, path: str, source: dict = None) -> tuple:
+        """add_stream() for a file on disk (e.g. a timesheet saved before the store existed)."""
+        with open(path, 'rb') as f:
+            return self.add_stream(iter(lambda: f.read(1 << 20), b''), os.path.basename(path), source)
+
+    def paths(self, extensions: tuple = None) -> list:
+        """Stored documents (one per unique content), ordered by original file name."""
+        paths = [self.path_of(sha256) for sha256 in self.documents]
+        if extensions:
+            paths = [p for p in paths if p.lower().endswith(extensions)]
+        return sorted(paths, key=lambda p: (os.path.basename(p).lower(), p))
+
+    def import_loose_files(self, extensions: tuple) -> int:
+        """
+        Moves files lying directly in root (the old flat layout) into the store; duplicates
+        of stored documents are dropped. Returns the number of files imported.
+        """
+        imported = 0
+        for entry in os.scandir(self.root):
+            if not entry.is_file() or not entry.name.lower().endswith(extensions):
+                continue
+            try:
+                self.add_file(entry.path, {"subject": None, "date": None, "sender": None})
+                os.remove(entry.path)
+                imported += 1
+            except OSError as e:
+                logger.warning(f"Could not move {entry.name} into the attachment store: {e}")
+        if imported:
+            logger.info(f"Moved {imported} previously downloaded file(s) into the attachment store")
+        return imported
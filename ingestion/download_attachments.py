@@ -2,15 +2,27 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
 from ingestion.fetch_emails import get_finance_emails_in_period
+from ingestion.attachment_store import AttachmentStore
+from ingestion.imap_structure import ATTACHMENT_EXTENSIONS
+from monitoring import metrics
 
+import base64
+import binascii
 import logging
+import quopri
 from email.header import decode_header
 
-# Destination folder
+# Attachment store root (see attachment_store.py)
 PICTURE_FOLDER = os.path.abspath(
     os.path.join(os.path.dirname(__file__), os.pardir, 'raw_pictures')
 )
 
+DECODE_CHUNK_CHARS = 64 * 1024  # Encoded characters decoded and written per step
+IMAP_BACKENDS = ('imaplib', 'async')
+IMAP_BACKEND = os.getenv('IMAP_BACKEND', 'imaplib')  # 'async': connection pool over FINANCE_SENDERS / IMAP_FOLDERS
+
+_store = None
+
 # Logging setup
 logging.basicConfig(
     format='%(levelname)s | %(asctime)s | %(funcName)s | %(message)s',
@@ -30,11 +42,82 @@ def _decode_header_field(value):
             header += part
     return header
 
-def extract_attachments(email_msg):
-    os.makedirs(PICTURE_FOLDER, exist_ok=True)
-
+def _iter_decoded(part):
+    """
+    Yields the decoded payload of a MIME part in chunks, so a large attachment is
+    never held in memory a second time in decoded form (get_payload(decode=True) would).
+    """
+    raw = part.get_payload()
+    if not isinstance(raw, str):
+        return
+    cte = str(part.get('Content-Transfer-Encoding', '')).strip().lower()
+
+    if cte == 'base64':
+        remainder = ''
+        for start in range(0, len(raw), DECODE_CHUNK_CHARS):
+            chunk = remainder + ''.join(raw[start:start + DECODE_CHUNK_CHARS].split())
+            usable = len(chunk) - len(chunk) % 4
+            remainder = chunk[usable:]
+            if usable:
+                yield binascii.a2b_base64(chunk[:usable])
+        if remainder.strip('='):
+            # Unpadded tail; let base64 repair the padding like get_payload(decode=True) does
+            yield base64.b64decode(remainder + '=' * (-len(remainder) % 4))
+    elif cte == 'quoted-printable':
+        lines = raw.splitlines(keepends=True)
+        batch = []
+        size = 0
+        for line in lines:
+            batch.append(line)
+            size += len(line)
+            if size >= DECODE_CHUNK_CHARS:
+                yield quopri.decodestring(''.join(batch).encode('ascii', 'surrogateescape'))
+                batch, size = [], 0
+        if batch:
+            yield quopri.decodestring(''.join(batch).encode('ascii', 'surrogateescape'))
+    else:
+        encoded = raw.encode('ascii', 'surrogateescape')
+        for start in range(0, len(encoded), DECODE_CHUNK_CHARS):
+            yield encoded[start:start + DECODE_CHUNK_CHARS]
+
+
+def get_store() -> AttachmentStore:
+    """The attachment store at PICTURE_FOLDER (looked up at call time), opened once per folder."""
+    global _store
+    if _store is None or _store.root != os.path.abspath(PICTURE_FOLDER):
+        _store = AttachmentStore(PICTURE_FOLDER)
+        _store.import_loose_files(tuple(f'.{ext}' for ext in ATTACHMENT_EXTENSIONS))
+    return _store
+
+
+def _save_part(part, filename: str, source: dict) -> tuple:
+    """
+    Streams the decoded attachment into the content-addressed store (written to a temp
+    file and renamed into place, so a crash never leaves a truncated timesheet behind).
+    Returns (stored path, bytes, new); new is False when the same document was stored
+    before (from this or another email), bytes 0 = empty attachment, nothing saved.
+    """
+    with metrics.span("attachment.save"):
+        path, written, new = get_store().add_stream(_iter_decoded(part), filename, source)
+    if new:
+        metrics.count("attachments_saved")
+        metrics.count("attachment_bytes_written", written)
+    elif written:
+        metrics.count("attachments_deduplicated")
+    return path, written, new
+
+
+def extract_attachments(email_msg, on_saved=None):
+    """
+    Saves the png/jpg/jpeg/pdf attachments of one email into the attachment store at PICTURE_FOLDER.
+    A document that is already stored (forwarded, re-sent, CC'd) is only recorded as another source.
+    :param on_saved: Optional callback, called with the full path of each newly stored document
+                     (used by the streaming pipeline in run_prove.py to start OCR right away).
+    :returns: Number of new documents stored.
+    """
     subject = _decode_header_field(email_msg.get('Subject', 'no-subject'))
-    date = email_msg.get('Date', '').replace(':', '-').replace(' ', '_')
+    source = {"subject": subject, "date": email_msg.get('Date', ''),
+              "sender": _decode_header_field(email_msg.get('From', ''))}
 
     attachments = []
     for part in email_msg.walk():
@@ -48,52 +131,70 @@ def extract_attachments(email_msg):
         filename = _decode_header_field(filename).replace('/', '_').replace('\\', '_')
         ext = filename.lower().split('.')[-1]
 
-        if ext not in ['png', 'jpg', 'jpeg', 'pdf']:
+        if ext not in ATTACHMENT_EXTENSIONS:
             logger.info(f"Skipping non-image attachment: {filename}")
             continue
 
-        payload = part.get_payload(decode=True)
-        if not payload:
+        payload = part.get_payload()
+        if not isinstance(payload, str) or not payload.strip():
             logger.info(f"Skipping empty attachment: {filename}")
             continue
 
-        attachments.append((filename, payload))
+        # Keep the part itself; it is decoded straight to disk below
+        attachments.append((filename, part))
 
     if len(attachments) > 1:
         logger.info("Skipping last attachment (likely logo/footer).")
         attachments = attachments[:-1]
 
     count = 0
-    for filename, payload in attachments:
-        unique_name = f"{date}__{subject}__{filename}".replace(' ', '_')
-        full_path = os.path.join(PICTURE_FOLDER, unique_name)
-
-        if os.path.exists(full_path):
-            logger.info(f"Already exists, skipping: {unique_name}")
-            continue
-
+    for filename, part in attachments:
         try:
-            with open(full_path, 'wb') as f:
-                f.write(payload)
-            logger.info(f"✅ Downloaded: {unique_name}")
-            count += 1
+            path, written, new = _save_part(part, filename, source)
         except Exception as e:
-            logger.error(f"❌ Failed to save {unique_name}: {e}")
+            logger.error(f"❌ Failed to save {filename}: {e}")
+            continue
+        if not written:
+            logger.info(f"Skipping empty attachment: {filename}")
+            continue
+        if not new:
+            logger.info(f"Already stored, skipping: {filename} (same content as {os.path.basename(path)})")
+            continue
+        logger.info(f"✅ Downloaded: {filename}")
+        count += 1
+        if on_saved is not None:
+            on_saved(path)
 
     logger.info(f"✅ Finished email ({subject}): {count} file(s) downloaded.")
     return count
 
 
-def download_pics_main(start_date: str, end_date: str):
-    emails = get_finance_emails_in_period(start_date, end_date)
-    if not emails:
-        logger.warning("❌ No valid finance emails found in period.")
-        return
+def _email_source(backend: str):
+    if backend == 'async':
+        from ingestion.async_fetch import get_finance_emails_concurrently
+        return get_finance_emails_concurrently
+    if backend != 'imaplib':
+        raise ValueError(f"Unknown IMAP backend {backend!r} (expected one of {IMAP_BACKENDS})")
+    return get_finance_emails_in_period
+
+
+def download_pics_main(start_date: str, end_date: str, full_resync: bool = False, on_saved=None,
+                       backend: str = None):
+    """
+    :param backend: 'imaplib' (one connection, INBOX, FINANCE_SENDER) or 'async' (see async_fetch.py);
+                    IMAP_BACKEND by default.
+    """
+    # Emails arrive one at a time from the generator; each is saved and dropped before the next
+    fetch = _email_source(backend or IMAP_BACKEND)
     total_downloaded = 0
-    for idx, email_msg in enumerate(emails, 1):
-        logger.info(f"📧 Processing email {idx}/{len(emails)}...")
-        count = extract_attachments(email_msg)
+    idx = 0
+    for idx, email_msg in enumerate(fetch(start_date, end_date, incremental=not full_resync), 1):
+        logger.info(f"📧 Processing email {idx}...")
+        count = extract_attachments(email_msg, on_saved=on_saved)
         total_downloaded += count
+    if not idx:
+        logger.warning("❌ No valid finance emails found in period.")
+        return
     logger.info(f"\n✅ All done. Total files downloaded: {total_downloaded}")
 
 if __name__ == "__main__":
@@ -1,10 +1,18 @@
 import imaplib
-import email
 import logging
 import os
+import sys
+from collections import defaultdict
 from email.header import decode_header
 from dotenv import load_dotenv
 from datetime import datetime
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from ingestion.imap_structure import (
+    HEADER_FIELDS, attachment_parts, build_message, header_bytes,
+    parse_fetch_data, section_body, uid_set,
+)
+from ingestion.sync_state import load_sync_state, record_sync, sync_key, usable_mark
+from monitoring import metrics
 
 load_dotenv()
 
@@ -12,6 +20,11 @@ IMAP_HOST = os.getenv('IMAP_HOST')
 IMAP_USER = os.getenv('IMAP_USER')
 IMAP_PASSWORD = os.getenv('IMAP_PASSWORD')
 FINANCE_SENDER = os.getenv('FINANCE_SENDER')
+IMAP_PORT = int(os.getenv('IMAP_PORT', imaplib.IMAP4_SSL_PORT))
+IMAP_SSL = os.getenv('IMAP_SSL', '1') != '0'  # IMAP_SSL=0 for a plain local server (benchmarks)
+
+FETCH_CHUNK_SIZE = 50  # UIDs per multi-UID FETCH command for attachment bodies
+MAILBOX = 'INBOX'
 
 logging.basicConfig(
     format='%(levelname)s | %(asctime)s | %(funcName)s | %(message)s',
@@ -31,61 +44,172 @@ def _decode_header_field(value):
             header += part
     return header
 
-def get_finance_emails_in_period(start_date, end_date):
+def _connect():
+    if IMAP_SSL:
+        return imaplib.IMAP4_SSL(IMAP_HOST, IMAP_PORT)
+    return imaplib.IMAP4(IMAP_HOST, IMAP_PORT)
+
+def _response_bytes(data) -> int:
+    """Size of the literals and lines in an imaplib FETCH response (for the bytes-fetched counter)."""
+    total = 0
+    for item in data or ():
+        for piece in (item if isinstance(item, tuple) else (item,)):
+            if isinstance(piece, bytes):
+                total += len(piece)
+    return total
+
+def get_finance_emails_in_period(start_date, end_date, incremental=True):
     """
-    Returns a list of email.message.Message objects from FINANCE_SENDER within the date range.
+    Yields email.message.Message objects from FINANCE_SENDER within the date range,
+    one at a time, so memory stays bounded by FETCH_CHUNK_SIZE messages no matter
+    how long the period is.
     Input dates: YYYY-MM-DD (ISO format).
+    With incremental=True only messages newer than the stored UID high-water mark
+    (state/imap_sync.json) are fetched, if the period starts no earlier than the window the
+    mark was recorded for; an earlier period or a changed UIDVALIDITY is searched in full.
+    Use incremental=False to re-fetch the whole window regardless.
+    The mark only advances over messages the caller has finished with (the generator
+    was resumed after yielding them), so stopping early never skips messages.
     """
     if not all([IMAP_HOST, IMAP_USER, IMAP_PASSWORD, FINANCE_SENDER]):
         logger.error("Missing IMAP configuration or finance sender address.")
-        return []
+        return
 
     try:
         # Convert input dates to IMAP-compatible format (e.g., 16-Jul-2025)
         since_date = datetime.strptime(start_date, '%Y-%m-%d').strftime('%d-%b-%Y')
         before_date = datetime.strptime(end_date, '%Y-%m-%d').strftime('%d-%b-%Y')
 
-        mail = imaplib.IMAP4_SSL(IMAP_HOST)
-        mail.login(IMAP_USER, IMAP_PASSWORD)
-        mail.select('INBOX')
+        with metrics.span("imap.connect"):
+            mail = _connect()
+            mail.login(IMAP_USER, IMAP_PASSWORD)
+            mail.select(MAILBOX)
+        uidvalidity = int(mail.response('UIDVALIDITY')[1][0])
 
         logger.info(f"Fetching emails from {FINANCE_SENDER} between {since_date} and {before_date}")
 
         search_query = f'(FROM "{FINANCE_SENDER}" SINCE {since_date} BEFORE {before_date})'
-        status, messages = mail.search(None, search_query)
+        key = sync_key(IMAP_HOST, IMAP_USER, MAILBOX, FINANCE_SENDER)
+        state = load_sync_state(key) if incremental else None
+        mark = usable_mark(state, uidvalidity, start_date)
+        last_uid = mark or 0
+        if mark is not None:
+            search_query = f'(FROM "{FINANCE_SENDER}" SINCE {since_date} BEFORE {before_date} UID {last_uid + 1}:*)'
+            logger.info(f"Incremental sync: only messages after UID {last_uid}")
+        elif state is not None and state[0] != uidvalidity:
+            logger.warning(f"UIDVALIDITY changed ({state[0]} -> {uidvalidity}), doing a full resync.")
+        elif state is not None:
+            logger.warning(f"Period starts before the synced window ({state[2] or 'unknown'}), "
+                           f"searching all of it.")
+        with metrics.span("imap.search"):
+            status, messages = mail.uid('SEARCH', None, search_query)
+
+        # "UID n:*" always matches the newest message, even when its UID is below n
+        uids = sorted(int(uid) for uid in messages[0].split() if int(uid) > last_uid)
+        logger.info(f"✅ Found {len(uids)} matching email(s).")
+    except Exception as e:
+        logger.error(f"❌ IMAP error: {e}")
+        return
+
+    done = set()
+    try:
+        for uid, msg in _fetch_attachment_messages(mail, uids):
+            yield msg
+            done.add(uid)
+        mail.logout()
+        logger.info(f"✅ Completed fetching {len(done)} emails.")
+    except Exception as e:
+        logger.error(f"❌ IMAP error: {e}")
+    finally:
+        # Never move the mark past a message that failed or was not consumed, so the next run retries it
+        high_water = last_uid
+        for uid in uids:
+            if uid not in done:
+                break
+            high_water = uid
+        record_sync(key, state, uidvalidity, mark, high_water, start_date)
+
+
+def _fetch_attachment_messages(mail, uids):
+    """
+    Fetches only what extract_attachments needs, in a handful of round trips:
+      1) One UID FETCH of BODYSTRUCTURE + Subject/Date/From headers for the whole UID set
+      2) BODY.PEEK[<part>] of the png/jpg/jpeg/pdf parts only, FETCH_CHUNK_SIZE messages
+         at a time; within a chunk, messages with the same part layout share one multi-UID FETCH
+    Inline logos, HTML bodies etc. are never downloaded.
+    Yields (uid, email.message.Message) carrying just those parts, in UID order.
+    """
+    if not uids:
+        return
+    with metrics.span("imap.fetch_structure", messages=len(uids)):
+        status, data = mail.uid('FETCH', uid_set(uids), f'(UID BODYSTRUCTURE {HEADER_FIELDS})')
+    metrics.count("imap_bytes_fetched", _response_bytes(data))
+    if status != 'OK':
+        logger.warning(f"Failed to fetch BODYSTRUCTURE: {status}")
+        return
+
+    structures = {}  # uid -> (header bytes, [AttachmentPart])
+    for items in parse_fetch_data(data):
+        if 'UID' not in items or 'BODYSTRUCTURE' not in items:
+            continue
+        try:
+            parts = attachment_parts(items['BODYSTRUCTURE'])
+        except (IndexError, TypeError) as e:
+            logger.warning(f"Could not read BODYSTRUCTURE of UID {items['UID']}: {e}")
+            continue
+        structures[int(items['UID'])] = (header_bytes(items), parts)
+    data = None
 
-        email_ids = messages[0].split()
-        logger.info(f"✅ Found {len(email_ids)} matching email(s).")
+    ordered = sorted(structures)
+    for start in range(0, len(ordered), FETCH_CHUNK_SIZE):
+        chunk = ordered[start:start + FETCH_CHUNK_SIZE]
 
-        all_emails = []
-        for eid in email_ids:
-            status, data = mail.fetch(eid, '(RFC822)')
+        # Group messages with identical part layouts so one FETCH covers many UIDs
+        groups = defaultdict(list)
+        for uid in chunk:
+            parts = structures[uid][1]
+            if parts:
+                groups[tuple(part.section for part in parts)].append(uid)
+            else:
+                logger.info(f"No image/PDF attachments in UID {uid}, skipping download.")
+
+        bodies = {}  # uid -> {section: raw (still transfer-encoded) bytes}
+        for sections, group_uids in groups.items():
+            items_spec = ' '.join(f'BODY.PEEK[{section}]' for section in sections)
+            with metrics.span("imap.fetch_bodies", messages=len(group_uids)):
+                status, data = mail.uid('FETCH', uid_set(group_uids), f'(UID {items_spec})')
+            metrics.count("imap_bytes_fetched", _response_bytes(data))
             if status != 'OK':
-                logger.warning(f"Failed to fetch email ID {eid.decode()}")
+                logger.warning(f"Failed to fetch attachments for UIDs {uid_set(group_uids)}")
                 continue
-            msg = email.message_from_bytes(data[0][1])
-            all_emails.append(msg)
+            for items in parse_fetch_data(data):
+                if 'UID' in items:
+                    bodies[int(items['UID'])] = {s: section_body(items, s) for s in sections}
 
-        mail.logout()
-        logger.info(f"✅ Completed fetching {len(all_emails)} emails.")
-        return all_emails
+        for uid in chunk:
+            headers, parts = structures[uid]
+            fetched = bodies.pop(uid, {})
+            payloads = [(part, fetched[part.section]) for part in parts if fetched.get(part.section) is not None]
+            if parts and not payloads:
+                logger.warning(f"Failed to fetch email UID {uid}")
+                continue
+            metrics.count("imap_messages_fetched")
+            yield uid, build_message(headers, payloads)
 
-    except Exception as e:
-        logger.error(f"❌ IMAP error: {e}")
-        return []
 
 if __name__ == "__main__":
     # Example interactive use
     start = input("Start date (YYYY-MM-DD): ").strip()
     end = input("End date (YYYY-MM-DD): ").strip()
 
-    emails = get_finance_emails_in_period(start, end)
-    if emails:
-        for idx, msg in enumerate(emails):
-            subject = _decode_header_field(msg.get('Subject', 'no-subject'))
-            sender = msg.get('From')
-            date = msg.get('Date')
-            print(f"\n📧 Email #{idx+1}:\nSubject: {subject}\nFrom: {sender}\nDate: {date}")
-        print(f"\n✅ Total emails fetched: {len(emails)}")
+    total = 0
+    for idx, msg in enumerate(get_finance_emails_in_period(start, end)):
+        subject = _decode_header_field(msg.get('Subject', 'no-subject'))
+        sender = msg.get('From')
+        date = msg.get('Date')
+        print(f"\n📧 Email #{idx+1}:\nSubject: {subject}\nFrom: {sender}\nDate: {date}")
+        total += 1
+    if total:
+        print(f"\n✅ Total emails fetched: {total}")
     else:
         print("❌ No valid finance emails found in the given period.")
@@ -0,0 +1,277 @@
+import re
+import email
+import logging
+from email.message import Message
+from typing import NamedTuple, Union
+from urllib.parse import unquote
+
+logger = logging.getLogger(__name__)
+
+ATTACHMENT_EXTENSIONS = ('png', 'jpg', 'jpeg', 'pdf')
+HEADER_FIELDS = 'BODY.PEEK[HEADER.FIELDS (SUBJECT DATE FROM)]'
+
+_ATOM_END = b' ()\r\n'
+_LITERAL = re.compile(rb'\{(\d+)\}\r\n')
+
+
+class AttachmentPart(NamedTuple):
+    """One attachment leaf of a message's BODYSTRUCTURE."""
+    section: str      # IMAP part number, e.g. "2" or "2.1" (inside a forwarded message)
+    content_type: str
+    encoding: str     # Content-Transfer-Encoding, e.g. "base64"
+    filename: str
+    size: int
+
+
+def uid_set(uids) -> str:
+    """
+    Compresses UIDs into an IMAP sequence set, e.g. [1, 2, 3, 7] -> "1:3,7".
+    """
+    numbers = sorted({int(uid) for uid in uids})
+    ranges = []
+    for uid in numbers:
+        if ranges and uid == ranges[-1][1] + 1:
+            ranges[-1][1] = uid
+        else:
+            ranges.append([uid, uid])
+    return ','.join(str(a) if a == b else f"{a}:{b}" for a, b in ranges)
+
+
+def _join_fetch_data(data) -> list:
+    """
+    Re-assembles imaplib's FETCH data (a mix of (line, literal) tuples and
+    continuation lines) into one raw byte string per untagged response,
+    with literals inlined in wire format: {n}\\r\\n<n bytes>.
+    """
+    responses = []
+    current = None
+    after_literal = False
+    for item in data:
+        if item is None:
+            continue
+        if isinstance(item, tuple):
+            head, literal = item
+            if current is None or not after_literal:
+                current = bytearray()
+                responses.append(current)
+            current += head + b'\r\n' + literal
+            after_literal = True
+        else:
+            if current is not None and after_literal:
+                current += item
+            else:
+                current = bytearray(item)
+                responses.append(current)
+            after_literal = False
+    return [bytes(r) for r in responses]
+
+
+def _parse_value(buf: bytes, pos: int):
+    """
+    Parses one IMAP value at buf[pos:]: parenthesized list, quoted string,
+    literal, NIL or atom. Returns (value, new_pos).
+    """
+    while pos < len(buf) and buf[pos:pos + 1] == b' ':
+        pos += 1
+    char = buf[pos:pos + 1]
+
+    if char == b'(':
+        items = []
+        pos += 1
+        while True:
+            while buf[pos:pos + 1] == b' ':
+                pos += 1
+            if buf[pos:pos + 1] == b')':
+                return items, pos + 1
+            if pos >= len(buf):
+                raise ValueError("Unterminated list in IMAP response")
+            value, pos = _parse_value(buf, pos)
+            items.append(value)
+
+    if char == b'"':
+        out = bytearray()
+        pos += 1
+        while buf[pos:pos + 1] != b'"':
+            if buf[pos:pos + 1] == b'\\':
+                pos += 1
+            out += buf[pos:pos + 1]
+            pos += 1
+        return out.decode('utf-8', errors='replace'), pos + 1
+
+    if char == b'{':
+        match = _LITERAL.match(buf, pos)
+        if not match:
+            raise ValueError("Malformed literal in IMAP response")
+        start = match.end()
+        end = start + int(match.group(1))
+        return buf[start:end], end
+
+    # Atom; section specs like BODY[HEADER.FIELDS (SUBJECT DATE)] contain spaces and parens
+    start = pos
+    depth = 0
+    while pos < len(buf):
+        c = buf[pos:pos + 1]
+        if c == b'[':
+            depth += 1
+        elif c == b']':
+            depth -= 1
+        elif depth == 0 and c in _ATOM_END:
+            break
+        pos += 1
+    atom = buf[start:pos].decode('ascii', errors='replace')
+    return (None if atom.upper() == 'NIL' else atom), pos
+
+
+def parse_fetch_response(raw: bytes) -> dict:
+    """
+    Parses one untagged FETCH response ("12 (UID 34 BODYSTRUCTURE (...) ...)")
+    into a dict of upper-cased item names -> values.
+    """
+    _, pos = _parse_value(raw, 0)  # message sequence number
+    items, _ = _parse_value(raw, pos)
+    return {str(items[i]).upper(): items[i + 1] for i in range(0, len(items) - 1, 2)}
+
+
+def parse_fetch_data(data) -> list:
+    """Parses every response in imaplib FETCH data; unparsable ones are logged and skipped."""
+    parsed = []
+    for raw in _join_fetch_data(data):
+        try:
+            parsed.append(parse_fetch_response(raw))
+        except (ValueError, IndexError) as e:
+            logger.warning(f"Could not parse FETCH response: {e}")
+    return parsed
+
+
+def _text(value) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, bytes):
+        return value.decode('utf-8', errors='replace')
+    return str(value)
+
+
+def _param(params, name: str) -> str:
+    """Looks up a body parameter, including RFC 2231 encoded/continued forms (name*, name*0*)."""
+    if not isinstance(params, list):
+        return ''
+    pairs = [(_text(params[i]).lower(), _text(params[i + 1])) for i in range(0, len(params) - 1, 2)]
+    for key, value in pairs:
+        if key == name:
+            return value
+    # RFC 2231: name*=utf-8''%C3%A6.pdf, or continuations name*0*=..., name*1*=...
+    rfc2231 = [
+        (key, value) for key, value in pairs
+        if re.fullmatch(re.escape(name) + r'\*(\d+\*?)?', key)
+    ]
+    if not rfc2231:
+        return ''
+    rfc2231.sort(key=lambda kv: int(re.sub(r'\D', '', kv[0]) or 0))
+    charset = 'utf-8'
+    value = ''
+    for idx, (key, piece) in enumerate(rfc2231):
+        if idx == 0 and key.endswith('*'):
+            parts = piece.split("'", 2)
+            if len(parts) == 3:
+                charset, piece = parts[0] or 'utf-8', parts[2]
+        value += unquote(piece, encoding=charset, errors='replace') if key.endswith('*') else piece
+    return value
+
+
+def _leaf_filename(node: list, ext_index: int) -> str:
+    """Filename from Content-Disposition, falling back to the Content-Type "name" parameter."""
+    disposition = node[ext_index + 1] if len(node) > ext_index + 1 else None
+    filename = ''
+    if isinstance(disposition, list) and len(disposition) > 1:
+        filename = _param(disposition[1], 'filename')
+    return filename or _param(node[2], 'name')
+
+
+def _walk(node: list, prefix: str = ''):
+    """Yields (section, leaf node, index of the md5 extension field) for every non-multipart part."""
+    if node and isinstance(node[0], list):
+        # Children come first; the subtype string ends them
+        n = 0
+        for child in node:
+            if not isinstance(child, list):
+                break
+            n += 1
+            yield from _walk(child, f"{prefix}.{n}" if prefix else str(n))
+        return
+
+    section = prefix or '1'
+    maintype, subtype = _text(node[0]).lower(), _text(node[1]).lower()
+    if maintype == 'message' and subtype == 'rfc822' and len(node) > 8 and isinstance(node[8], list):
+        inner = node[8]
+        if inner and isinstance(inner[0], list):
+            yield from _walk(inner, section)
+        else:
+            yield from _walk(inner, f"{section}.1")
+        return
+    ext_index = 8 if maintype == 'text' else 7
+    yield section, node, ext_index
+
+
+def attachment_parts(bodystructure: list) -> list:
+    """
+    Returns the AttachmentPart leaves whose filename has a supported extension
+    (png/jpg/jpeg/pdf), in message order.
+    """
+    parts = []
+    for section, node, ext_index in _walk(bodystructure):
+        filename = _leaf_filename(node, ext_index)
+        if not filename:
+            continue
+        ext = filename.lower().split('.')[-1]
+        if ext not in ATTACHMENT_EXTENSIONS:
+            continue
+        try:
+            size = int(node[6])
+        except (TypeError, ValueError, IndexError):
+            size = 0
+        parts.append(AttachmentPart(
+            section=section,
+            content_type=f"{_text(node[0]).lower()}/{_text(node[1]).lower()}",
+            encoding=_text(node[5]).lower() or '7bit',
+            filename=filename,
+            size=size,
+        ))
+    return parts
+
+
+def header_bytes(items: dict) -> bytes:
+    """The BODY[HEADER.FIELDS ...] literal of a parsed FETCH response (servers vary the echoed spelling)."""
+    for key, value in items.items():
+        if key.startswith('BODY[HEADER'):
+            return value if isinstance(value, bytes) else _text(value).encode('utf-8')
+    return b''
+
+
+def build_message(headers: bytes, parts: list) -> Message:
+    """
+    Builds a multipart email.message.Message that carries the fetched headers
+    and only the attachment parts, so downstream code (extract_attachments)
+    can keep using the standard email API. parts: list of (AttachmentPart, raw bytes).
+    """
+    msg = email.message_from_bytes(headers)
+    del msg['Content-Type']
+    msg['Content-Type'] = 'multipart/mixed'
+    leaves = []
+    for part, raw in parts:
+        leaf = Message()
+        leaf['Content-Type'] = part.content_type
+        leaf['Content-Transfer-Encoding'] = part.encoding
+        leaf.add_header('Content-Disposition', 'attachment')
+        leaf.set_param('filename', part.filename, header='Content-Disposition')
+        # surrogateescape keeps 8bit/binary payloads byte-exact through get_payload(decode=True)
+        leaf.set_payload(raw.decode('ascii', errors='surrogateescape'))
+        leaves.append(leaf)
+    msg.set_payload(leaves)
+    return msg
+
+
+def section_body(items: dict, section: str) -> Union [bytes , None]:
+    value = items.get(f'BODY[{section}]')
+    if value is None:
+        return None
+    return value if isinstance(value, bytes) else _text(value).encode('utf-8')
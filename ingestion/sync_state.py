@@ -0,0 +1,85 @@
+import os
+import json
+import logging
+import tempfile
+
+# Per mailbox/sender high-water mark: {key: {"uidvalidity": int, "last_uid": int, "since": "YYYY-MM-DD"}}
+# A mark says: every message that arrived from `since` on, up to last_uid, has been handled.
+# It is therefore only applied to searches starting at or after `since` (see usable_mark).
+SYNC_STATE_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), os.pardir, 'state', 'imap_sync.json')
+)
+
+logger = logging.getLogger(__name__)
+
+
+def sync_key(host: str, user: str, mailbox: str, sender: str) -> str:
+    return f"{user}@{host}/{mailbox}|{sender}"
+
+
+def _load_all(path: str) -> dict:
+    path = path or SYNC_STATE_PATH
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable sync state {path}: {e}")
+        return {}
+
+
+def load_sync_state(key: str, path: str = None):
+    """
+    Returns (uidvalidity, last_uid, since) stored for key, or None if this mailbox/sender was never synced.
+    since is None for marks stored before the window was recorded.
+    """
+    entry = _load_all(path).get(key)
+    if not entry:
+        return None
+    return int(entry['uidvalidity']), int(entry['last_uid']), entry.get('since')
+
+
+def save_sync_state(key: str, uidvalidity: int, last_uid: int, since: str = None, path: str = None):
+    """
+    Stores the high-water mark for key. The file is replaced atomically,
+    so a crash mid-write never loses the previous position.
+    :param since: First day (YYYY-MM-DD) of the window the mark covers.
+    :param path: State file; SYNC_STATE_PATH (looked up at call time) by default.
+    """
+    path = path or SYNC_STATE_PATH
+    state = _load_all(path)
+    state[key] = {'uidvalidity': int(uidvalidity), 'last_uid': int(last_uid), 'since': since}
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def usable_mark(state, uidvalidity: int, since: str):
+    """
+    The stored last UID if it may be applied to a search starting on since (YYYY-MM-DD), else None
+    (search the whole window). A mark from another UIDVALIDITY, one without a recorded window, or
+    one whose window starts after since (an earlier period, e.g. February after March) would
+    silently skip the messages below it.
+    """
+    if state is None or state[0] != uidvalidity:
+        return None
+    if state[2] is None or since < state[2]:
+        return None
+    return state[1]
+
+
+def record_sync(key: str, state, uidvalidity: int, mark, high_water: int, since: str):
+    """
+    Stores the mark after a sync that started after mark (see usable_mark) and completed every
+    message up to high_water. Without a usable mark, the searched window becomes the stored one:
+    after a backfill of an earlier period the mark moves back with it, so later messages are
+    fetched again once (the attachment store drops the duplicates) but none are skipped.
+    """
+    if mark is not None:
+        if high_water != mark:
+            save_sync_state(key, uidvalidity, high_water, since=state[2])
+    elif state != (uidvalidity, high_water, since):
+        save_sync_state(key, uidvalidity, high_water, since=since)
@@ -0,0 +1,157 @@
+import os
+import sys
+import asyncio
+import logging
+from datetime import date
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from ingestion import async_fetch, fetch_emails
+from ingestion.async_fetch import AsyncIMAPConnection, IMAPError, fetch_job, quote_string
+from ingestion.sync_state import load_sync_state, record_sync, sync_key, usable_mark
+from monitoring import metrics
+
+# Long-running watch on the finance mailbox: IMAP IDLE (RFC 2177) where the server supports it,
+# polling otherwise. New messages go to a callback as soon as they arrive; the position is the
+# same per folder/sender UID high-water mark the batch ingestion uses (state/imap_sync.json).
+IDLE_TIMEOUT = 25 * 60     # Seconds; IDLE is re-issued before the server's 30 minute inactivity logout
+POLL_INTERVAL = 30.0       # Seconds between checks when the server has no IDLE
+RECONNECT_MIN_DELAY = 1.0  # Seconds; doubled after every failed attempt
+RECONNECT_MAX_DELAY = 300.0
+
+_CONNECTION_ERRORS = (ConnectionError, OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, IMAPError)
+
+logger = logging.getLogger(__name__)
+
+
+class MailboxWatcher:
+    """
+    One connection per folder: catch up on everything after the stored mark, then wait
+    (IDLE or sleep) and repeat. A dropped connection is reopened with exponential backoff.
+    on_message is called from a worker thread, one message at a time in UID order, and the
+    mark only moves past a message once on_message has returned.
+    """
+
+    def __init__(self, on_message, senders: list = None, folders: list = None, since: date = None,
+                 use_idle: bool = True, poll_interval: float = POLL_INTERVAL, idle_timeout: float = IDLE_TIMEOUT):
+        """
+        :param on_message: Callable taking an email.message.Message (image/PDF parts only).
+        :param since: Without a stored mark, start with messages from this day on (default: today).
+                      A mark recorded for a later start is not used: everything since this day is searched.
+        :param use_idle: False always polls, even if the server supports IDLE.
+        """
+        self.on_message = on_message
+        self.senders = senders or async_fetch.FINANCE_SENDERS or [s for s in [fetch_emails.FINANCE_SENDER] if s]
+        self.folders = folders or async_fetch.IMAP_FOLDERS
+        self.since = since or date.today()
+        self.use_idle = use_idle
+        self.poll_interval = poll_interval
+        self.idle_timeout = idle_timeout
+        self._handled = set()  # (folder, uid) handed over in this process, even if the mark is held back
+
+    async def run(self):
+        """Watches every folder until cancelled."""
+        if not all([fetch_emails.IMAP_HOST, fetch_emails.IMAP_USER, fetch_emails.IMAP_PASSWORD, self.senders]):
+            logger.error("Missing IMAP configuration or finance sender address.")
+            return
+        await asyncio.gather(*(self._watch_folder(folder) for folder in self.folders))
+
+    async def _watch_folder(self, folder: str):
+        delay = RECONNECT_MIN_DELAY
+        while True:
+            connection = AsyncIMAPConnection(fetch_emails.IMAP_HOST, fetch_emails.IMAP_PORT, fetch_emails.IMAP_SSL,
+                                             fetch_emails.IMAP_USER, fetch_emails.IMAP_PASSWORD, name=f"watch-{folder}")
+            try:
+                await connection.connect()
+                idle = self.use_idle and 'IDLE' in await connection.capabilities()
+                how = "IMAP IDLE" if idle else f"polling every {self.poll_interval:g}s"
+                logger.info(f"👀 Watching {folder} for mail from {', '.join(self.senders)} ({how})")
+                delay = RECONNECT_MIN_DELAY
+                while True:
+                    await self._catch_up(connection, folder)
+                    if idle:
+                        async with connection.mailbox(folder):
+                            # A server announces new mail once: if that happened during the catch-up
+                            # (after its SEARCH), IDLE would not report it again
+                            if connection.mail_announced:
+                                continue
+                            await connection.idle(self.idle_timeout)
+                    else:
+                        await asyncio.sleep(self.poll_interval)
+            except _CONNECTION_ERRORS as e:
+                logger.warning(f"⚠️ {folder}: {e}; reconnecting in {delay:g}s")
+                metrics.count("imap_reconnects")
+            finally:
+                await connection.close()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+    async def _catch_up(self, connection: AsyncIMAPConnection, folder: str):
+        """Fetches and hands over every new message in folder, advancing the marks as it goes."""
+        async with connection.mailbox(folder):
+            connection.mail_announced = False  # From here on, an announcement may be mail the SEARCH missed
+            uidvalidity = connection.uidvalidity.get(folder, 0)
+            since = self.since.isoformat()
+            marks = {}  # key -> [high-water, previous state, sorted new UIDs]
+            for sender in self.senders:
+                key = sync_key(fetch_emails.IMAP_HOST, fetch_emails.IMAP_USER, folder, sender)
+                state = load_sync_state(key)
+                last_uid = usable_mark(state, uidvalidity, since) or 0
+                if last_uid:
+                    query = f'(FROM {quote_string(sender)} UID {last_uid + 1}:*)'
+                else:
+                    query = f'(FROM {quote_string(sender)} SINCE {self.since:%d-%b-%Y})'
+                with metrics.span("imap.search"):
+                    uids = await connection.uid_search(query)
+                marks[key] = [last_uid, state, sorted(u for u in uids if u > last_uid)]
+
+            done = {uid for uids in (m[2] for m in marks.values()) for uid in uids if (folder, uid) in self._handled}
+            pending = sorted({uid for _, _, uids in marks.values() for uid in uids} - done)
+            if pending:
+                logger.info(f"📬 {len(pending)} new message(s) in {folder}")
+            loop = asyncio.get_running_loop()
+            for start in range(0, len(pending), async_fetch.CHUNK_SIZE):
+                chunk = pending[start:start + async_fetch.CHUNK_SIZE]
+                out = asyncio.Queue()
+                await fetch_job(folder, chunk, out)(connection)
+                while not out.empty():
+                    _, uid, msg = out.get_nowait()
+                    if msg is not None:
+                        try:
+                            await loop.run_in_executor(None, self.on_message, msg)
+                        except Exception as e:
+                            logger.error(f"❌ Handling UID {uid} in {folder} failed: {e}")
+                            self._save_marks(marks, done, uidvalidity, since)
+                            return
+                    done.add(uid)
+                    self._handled.add((folder, uid))
+                self._save_marks(marks, done, uidvalidity, since)
+            if not pending:
+                self._save_marks(marks, done, uidvalidity, since)
+
+    @staticmethod
+    def _save_marks(marks: dict, done: set, uidvalidity: int, since: str):
+        for key, mark in marks.items():
+            high_water, state, uids = mark
+            for uid in uids:
+                if uid <= high_water:
+                    continue
+                if uid not in done:
+                    break
+                high_water = uid
+            applied = usable_mark(state, uidvalidity, since)
+            record_sync(key, state, uidvalidity, applied, high_water, since)
+            mark[0], mark[1] = high_water, (uidvalidity, high_water, since if applied is None else state[2])
+
+
+def watch_mailbox(on_message, stop, **kwargs):
+    """
+    Runs a MailboxWatcher in this thread until stop (a threading.Event) is set.
+    kwargs: see MailboxWatcher.
+    """
+    async def main():
+        task = asyncio.ensure_future(MailboxWatcher(on_message, **kwargs).run())
+        while not stop.is_set() and not task.done():
+            await asyncio.sleep(0.2)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(main())
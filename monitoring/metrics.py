@@ -0,0 +1,247 @@
+import os
+import json
+import time
+import logging
+import cProfile
+import tempfile
+import threading
+from contextlib import contextmanager
+
+# Lightweight, dependency-free instrumentation: timing spans, counters, JSON logs
+# and a Prometheus text-format export written once at the end of a run.
+METRICS_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), os.pardir, 'state', 'metrics')
+)
+PROMETHEUS_FILE = os.path.join(METRICS_DIR, 'prove.prom')  # node_exporter textfile-collector friendly
+METRIC_PREFIX = 'prove'
+# Histogram buckets (seconds): IMAP round trips and validation are ms, OCR calls are seconds
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float('inf'))
+PROFILE_ENV = 'PROVE_PROFILE'  # Inherited by pool workers, which profile into <path>.<pid>
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_spans = {}     # name -> {"count", "sum", "max", "buckets": [n per BUCKETS]}
+_counters = {}  # name -> float
+_profiler = None
+_profile_path = None
+_hot_depth = 0
+_json_handler = None
+
+
+def _new_span_stats() -> dict:
+    return {"count": 0, "sum": 0.0, "max": 0.0, "buckets": [0] * len(BUCKETS)}
+
+
+def observe(name: str, seconds: float):
+    """Records one duration for span name."""
+    with _lock:
+        stats = _spans.get(name)
+        if stats is None:
+            stats = _spans[name] = _new_span_stats()
+        stats["count"] += 1
+        stats["sum"] += seconds
+        stats["max"] = max(stats["max"], seconds)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                stats["buckets"][i] += 1
+                break
+
+
+def count(name: str, value: float = 1):
+    """Adds value to counter name (bytes fetched, cache hits, escalations, ...)."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+@contextmanager
+def span(name: str, **fields):
+    """
+    Times the block under name. With JSON logging enabled, every span is also
+    written as one event ({"span": name, "seconds": ..., **fields}).
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        observe(name, elapsed)
+        if _json_handler is not None:
+            logger.debug("span", extra={"event": dict(fields, span=name, seconds=round(elapsed, 6))})
+
+
+@contextmanager
+def hot_path():
+    """
+    Marks the per-timesheet hot path. With profiling enabled (configure(profile=...)
+    or PROVE_PROFILE), cProfile only runs inside these blocks, so the profile is not
+    diluted by model loading and IMAP waits. Keeping the hot path in its own named
+    frames also makes py-spy flame graphs easy to filter.
+    """
+    global _hot_depth
+    if _profiler is None or _hot_depth:  # Not profiling, or already inside a hot-path block
+        yield
+        return
+    _hot_depth += 1
+    _profiler.enable()
+    try:
+        yield
+    finally:
+        _profiler.disable()
+        _hot_depth -= 1
+
+
+def snapshot() -> dict:
+    """Copy of all spans and counters (picklable; pool workers send it to the parent)."""
+    with _lock:
+        return {"spans": {k: dict(v, buckets=list(v["buckets"])) for k, v in _spans.items()},
+                "counters": dict(_counters)}
+
+
+def drain() -> dict:
+    """snapshot() and reset, so a worker reports each task's metrics exactly once."""
+    with _lock:
+        data = {"spans": dict(_spans), "counters": dict(_counters)}
+        _spans.clear()
+        _counters.clear()
+    return data
+
+
+def merge(data: dict):
+    """Adds a snapshot (e.g. from a pool worker) into this process' metrics."""
+    with _lock:
+        for name, other in data.get("spans", {}).items():
+            stats = _spans.get(name)
+            if stats is None:
+                stats = _spans[name] = _new_span_stats()
+            stats["count"] += other["count"]
+            stats["sum"] += other["sum"]
+            stats["max"] = max(stats["max"], other["max"])
+            stats["buckets"] = [a + b for a, b in zip(stats["buckets"], other["buckets"])]
+        for name, value in data.get("counters", {}).items():
+            _counters[name] = _counters.get(name, 0) + value
+
+
+def reset():
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+
+
+class JSONLogFormatter(logging.Formatter):
+    """One JSON object per line: every log record, plus span events."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {"ts": round(record.created, 6), "level": record.levelname, "logger": record.name,
+                 "func": record.funcName, "pid": record.process}
+        event = getattr(record, "event", None)
+        if event is not None:
+            entry.update(event)
+        else:
+            entry["message"] = record.getMessage()
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure(json_log: str = None, profile: str = None):
+    """
+    Enables the optional outputs for this process.
+    :param json_log: Append structured JSON logs (all records + span events) to this file.
+    :param profile: Collect a cProfile of the hot path and write it here (pstats format) in finish().
+    """
+    global _json_handler, _profiler, _profile_path
+    if json_log and _json_handler is None:
+        os.makedirs(os.path.dirname(os.path.abspath(json_log)), exist_ok=True)
+        _json_handler = logging.FileHandler(json_log, encoding='utf-8')
+        _json_handler.setFormatter(JSONLogFormatter())
+        _json_handler.setLevel(logging.DEBUG)
+        logging.getLogger().addHandler(_json_handler)
+        logger.setLevel(logging.DEBUG)  # Span events only; the console level is unchanged
+        logger.propagate = False
+        logger.addHandler(_json_handler)
+    profile = profile or os.getenv(PROFILE_ENV)
+    if profile and _profiler is None:
+        os.environ[PROFILE_ENV] = profile  # Spawned pool workers inherit it
+        _profile_path = profile
+        _profiler = cProfile.Profile()
+
+
+def configure_worker():
+    """Pool-worker counterpart of configure(): profiles into <PROVE_PROFILE>.<pid> if set."""
+    profile = os.getenv(PROFILE_ENV)
+    if profile:
+        configure(profile=f"{profile}.{os.getpid()}")
+
+
+def _label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _metric_name(name: str) -> str:
+    return ''.join(c if c.isalnum() or c == '_' else '_' for c in name)
+
+
+def prometheus_text(data: dict = None) -> str:
+    """Prometheus text exposition format of a snapshot (default: the current one)."""
+    data = data or snapshot()
+    lines = [f"# HELP {METRIC_PREFIX}_span_seconds Duration of instrumented pipeline stages.",
+             f"# TYPE {METRIC_PREFIX}_span_seconds histogram"]
+    for name, stats in sorted(data["spans"].items()):
+        cumulative = 0
+        for bound, n in zip(BUCKETS, stats["buckets"]):
+            cumulative += n
+            le = "+Inf" if bound == float('inf') else repr(bound)
+            lines.append(f'{METRIC_PREFIX}_span_seconds_bucket{{span="{_label(name)}",le="{le}"}} {cumulative}')
+        lines.append(f'{METRIC_PREFIX}_span_seconds_sum{{span="{_label(name)}"}} {stats["sum"]:.6f}')
+        lines.append(f'{METRIC_PREFIX}_span_seconds_count{{span="{_label(name)}"}} {stats["count"]}')
+    for name, value in sorted(data["counters"].items()):
+        metric = f"{METRIC_PREFIX}_{_metric_name(name)}_total"
+        lines += [f"# TYPE {metric} counter", f"{metric} {value:g}"]
+    lines.append(f"# TYPE {METRIC_PREFIX}_last_run_timestamp_seconds gauge")
+    lines.append(f"{METRIC_PREFIX}_last_run_timestamp_seconds {time.time():.0f}")
+    return '\n'.join(lines) + '\n'
+
+
+def write_prometheus(path: str = PROMETHEUS_FILE):
+    """Writes the Prometheus file atomically (a scraper never reads a half-written file)."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(prometheus_text())
+    os.replace(tmp_path, path)
+
+
+def summary_lines(data: dict = None) -> list:
+    data = data or snapshot()
+    lines = []
+    for name, stats in sorted(data["spans"].items(), key=lambda kv: -kv[1]["sum"]):
+        mean = stats["sum"] / stats["count"] if stats["count"] else 0.0
+        lines.append(f"{name}: {stats['count']}x, total {stats['sum']:.2f}s, "
+                     f"mean {mean * 1000:.1f}ms, max {stats['max'] * 1000:.1f}ms")
+    for name, value in sorted(data["counters"].items()):
+        lines.append(f"{name}: {value:g}")
+    return lines
+
+
+def finish(prometheus_file: str = PROMETHEUS_FILE):
+    """End of run: logs a per-stage summary, writes the Prometheus file and the profile."""
+    if not _spans and not _counters:
+        return
+    logging.info("⏱️ Pipeline timings:\n  " + "\n  ".join(summary_lines()))
+    if prometheus_file:
+        try:
+            write_prometheus(prometheus_file)
+            logging.info(f"Metrics written to {prometheus_file}")
+        except OSError as e:
+            logging.warning(f"Could not write metrics file {prometheus_file}: {e}")
+    if dump_profile():
+        logging.info(f"Hot-path profile written to {_profile_path} (python -m pstats {_profile_path})")
+
+
+def dump_profile() -> bool:
+    """Writes the cProfile collected so far (pool workers call this after every task)."""
+    if _profiler is None or not _profile_path:
+        return False
+    _profiler.dump_stats(_profile_path)
+    return True
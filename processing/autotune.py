@@ -0,0 +1,217 @@
+import os
+import sys
+import json
+import time
+import random
+import socket
+import logging
+import tempfile
+from datetime import datetime
+from typing import Union
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+# Per-host OCR settings: how many worker processes, torch intra-op threads per process and EasyOCR
+# batch size give the best throughput here. `run_prove.py tune` measures them on a sample of the
+# timesheets on disk; verify_payroll / verify_stream use them unless the caller passes its own.
+# Only the standard library is imported here: loading the settings must not pull in the OCR stack.
+TUNING_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), os.pardir, 'state', 'tuning')
+)
+SAMPLE_SIZE = 8          # Images timed per configuration (after a warm-up pass that loads the models)
+BATCH_SIZES = (1, 4, 8)  # Recognizer batch sizes tried for the best workers/threads split
+SAMPLE_SEED = 0          # Same sample on every tune run, so results are comparable
+
+logger = logging.getLogger(__name__)
+
+
+def tuning_path(host: str = None) -> str:
+    return os.path.join(TUNING_DIR, f"{host or socket.gethostname()}.json")
+
+
+def load_tuning(host: str = None) -> Union [dict , None]:
+    """
+    Stored settings of this host: {"workers", "torch_threads", "batch_size", "cpu_count", ...},
+    or None when the host was never tuned. Settings measured on a different core count
+    (e.g. a resized VM) are ignored.
+    """
+    path = tuning_path(host)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            settings = json.load(f)
+        settings = dict(settings, workers=int(settings["workers"]), torch_threads=int(settings["torch_threads"]),
+                        batch_size=int(settings["batch_size"]))
+    except FileNotFoundError:
+        return None
+    except (ValueError, KeyError, TypeError) as e:
+        logger.warning(f"Ignoring unreadable tuning file {path}: {e}")
+        return None
+    if settings.get("cpu_count") != os.cpu_count():
+        logger.warning(f"Tuning in {path} was measured on {settings.get('cpu_count')} cores, this host has "
+                       f"{os.cpu_count()}; run `run_prove.py tune` again")
+        return None
+    return settings
+
+
+def save_tuning(settings: dict, host: str = None) -> str:
+    path = tuning_path(host)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(settings, f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def apply_tuning(workers: int = None, batch_size: int = None, torch_threads: int = None) -> tuple:
+    """
+    Fills in what the caller left as None from this host's tuning (1 worker, no batching
+    without one). The tuned torch threads only apply together with the tuned worker count.
+    :returns: (workers, batch_size, torch_threads); torch_threads None = cores / workers.
+    """
+    tuned = load_tuning() if workers is None or batch_size is None else None
+    if tuned is not None:
+        logger.info(f"⚙️ Tuned settings for {socket.gethostname()}: {tuned['workers']} worker(s), "
+                    f"{tuned['torch_threads']} torch thread(s), batch size {tuned['batch_size']}")
+    if workers is None:
+        workers = tuned["workers"] if tuned is not None else 1
+        if torch_threads is None and tuned is not None:
+            torch_threads = tuned["torch_threads"]
+    if batch_size is None:
+        batch_size = tuned["batch_size"] if tuned is not None else 1
+    return workers, batch_size, torch_threads
+
+
+def set_torch_threads(threads: int):
+    """Caps torch's intra-op threads in this process without importing torch before it is needed."""
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(threads)
+    else:
+        os.environ["OMP_NUM_THREADS"] = str(threads)
+
+
+def candidate_splits(cpu_count: int, max_workers: int) -> list:
+    """
+    (workers, torch threads) to try: worker counts of 1, 2, 4, ... cores, each with all of
+    its share of the cores and with half of it (leaves room on a shared host).
+    """
+    splits = []
+    workers = 1
+    while workers <= min(cpu_count, max_workers):
+        share = max(1, cpu_count // workers)
+        for threads in (share, max(1, share // 2)):
+            if (workers, threads) not in splits:
+                splits.append((workers, threads))
+        workers *= 2
+    return splits
+
+
+def _time_serial(processor, paths: list, threads: int, batch_size: int) -> float:
+    set_torch_threads(threads)
+    processor.process_images(paths[:1], batch_size=1, report=False)  # Warm-up: models loaded, caches filled
+    t0 = time.perf_counter()
+    if batch_size > 1:
+        processor.process_images(paths, batch_size=batch_size, report=False)
+    else:
+        for path in paths:
+            processor.process_sheets(path, report=False)
+    return time.perf_counter() - t0
+
+
+def _time_pool(reference_csv: str, paths: list, workers: int, threads: int, batch_size: int) -> float:
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from processing import payroll_verification as pv
+
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=pv._init_worker,
+                             initargs=(reference_csv, threads, False, False, False)) as executor:
+        # Warm-up: every worker starts and loads its models before the clock runs
+        list(executor.map(pv._process_in_worker, [paths[i % len(paths)] for i in range(workers)]))
+        t0 = time.perf_counter()
+        if batch_size > 1:
+            chunks = [paths[i:i + batch_size] for i in range(0, len(paths), batch_size)]
+            list(executor.map(pv._process_batch_in_worker, chunks))
+        else:
+            list(executor.map(pv._process_in_worker, paths))
+        return time.perf_counter() - t0
+
+
+def tune(reference_csv: str = None, image_folder: str = None, sample_size: int = SAMPLE_SIZE,
+         batch_sizes: tuple = BATCH_SIZES) -> Union [dict , None]:
+    """
+    Short calibration on this host. The OCR cache, journal and OCR server are not used, so
+    every configuration really runs OCR on the same sample of images:
+     1) every (workers, torch threads) split from candidate_splits, without batching
+     2) the batch sizes in batch_sizes, for the fastest split
+    The fastest configuration is stored in state/tuning/<hostname>.json (see load_tuning).
+    :returns: The stored settings, or None if there was nothing to measure.
+    """
+    from processing import payroll_verification as pv
+    from processing.ocr_server import OCRClient
+
+    default_csv, default_folder = pv.default_paths()
+    reference_csv = reference_csv or default_csv
+    image_folder = image_folder or default_folder
+    if not os.path.exists(reference_csv):
+        logger.error(f"CSV not found at {reference_csv}")
+        return None
+    if not os.path.isdir(image_folder):
+        logger.error(f"Image folder not found: {image_folder}")
+        return None
+    if OCRClient.connect() is not None:
+        logger.error("An OCR server is running; stop it (run_prove.py serve) so tuning measures this process")
+        return None
+
+    # PDFs with a text layer skip OCR, so only images say anything about OCR throughput
+    images = [path for path in pv.list_images(image_folder) if path.lower().endswith(pv.IMAGE_EXTENSIONS)]
+    if len(images) < 2:
+        logger.error(f"Need at least 2 images in {image_folder} to tune, found {len(images)}")
+        return None
+    sample = sorted(random.Random(SAMPLE_SEED).sample(images, min(sample_size, len(images))))
+    cpu_count = os.cpu_count() or 1
+    logger.info(f"⚙️ Tuning on {len(sample)} image(s), {cpu_count} core(s)...")
+
+    processor = None
+    trials = []
+
+    def measure(workers: int, threads: int, batch_size: int) -> float:
+        nonlocal processor
+        if workers == 1:
+            if processor is None:
+                processor = pv.TimesheetProcessor(csv_path=reference_csv, gpu=False, cache=None, use_server=False)
+            seconds = _time_serial(processor, sample, threads, batch_size)
+        else:
+            seconds = _time_pool(reference_csv, sample, workers, threads, batch_size)
+        rate = len(sample) / seconds
+        trials.append({"workers": workers, "torch_threads": threads, "batch_size": batch_size,
+                       "images_per_second": round(rate, 3)})
+        logger.info(f"  {workers} worker(s) x {threads} thread(s), batch {batch_size}: {rate:.2f} images/s")
+        return rate
+
+    splits = candidate_splits(cpu_count, len(sample))
+    rates = {split: measure(*split, 1) for split in splits}
+    workers, threads = max(rates, key=rates.get)
+    best = (workers, threads, 1, rates[(workers, threads)])
+    for batch_size in batch_sizes:
+        # A batch larger than a worker's share of the sample is never filled
+        if batch_size <= 1 or batch_size > max(1, len(sample) // workers):
+            continue
+        rate = measure(workers, threads, batch_size)
+        if rate > best[3]:
+            best = (workers, threads, batch_size, rate)
+
+    settings = {
+        "host": socket.gethostname(),
+        "cpu_count": os.cpu_count(),
+        "workers": best[0],
+        "torch_threads": best[1],
+        "batch_size": best[2],
+        "images_per_second": round(best[3], 3),
+        "sample_size": len(sample),
+        "tuned_at": datetime.now().isoformat(timespec='seconds'),
+        "trials": trials,
+    }
+    path = save_tuning(settings)
+    logger.info(f"✅ Best: {best[0]} worker(s) x {best[1]} torch thread(s), batch size {best[2]} "
+                f"({best[3]:.2f} images/s); saved to {path}")
+    return settings
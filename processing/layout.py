@@ -0,0 +1,209 @@
+import re
+import numpy as np
+from difflib import SequenceMatcher
+from typing import NamedTuple, Union
+
+ROW_THRESHOLD = 30.0   # Max vertical distance (px) between a label and its value
+LABEL_THRESHOLD = 0.6  # Fuzzy ratio for recognizing a label (same as FUZZY_THRESHOLD)
+GAP_FACTOR = 3.0       # Multi-box values: max horizontal gap, in box heights, between pieces
+
+_MONTHS = ("januar|februar|mars|april|mai|juni|juli|august|september|oktober|november|desember|"
+           "january|february|march|may|june|july|october|december")
+
+
+class FieldSpec(NamedTuple):
+    """A labelled field: where to look (labels) and what its value looks like."""
+    key: str
+    labels: tuple
+    value_pattern: "re.Pattern"
+    numeric: bool = False    # Single numeric box, converted to float
+    multi_box: bool = False  # Value may span several boxes on the row ("Ola" "Nordmann")
+
+
+class FieldMatch(NamedTuple):
+    value: Union [str , float]
+    confidence: float   # min(label confidence, value confidence)
+    label_bbox: list
+    value_bbox: list    # Union of the value boxes
+
+
+NAME_FIELD = FieldSpec(
+    key="name",
+    labels=("navn", "name"),
+    value_pattern=re.compile(r"^[A-Za-zÆØÅæøå][A-Za-zÆØÅæøå \-]*$"),
+    multi_box=True,
+)
+PERIOD_FIELD = FieldSpec(
+    key="period",
+    labels=("periode", "dato", "måned", "period", "date"),
+    value_pattern=re.compile(
+        rf"^(\d{{1,2}}[./-]\d{{1,2}}([./-]\d{{2,4}})?|\d{{4}}|[-–]|til|({_MONTHS})\.?)"
+        rf"(\s+(\d{{1,2}}[./-]\d{{1,2}}([./-]\d{{2,4}})?|\d{{4}}|[-–]|til|({_MONTHS})\.?))*$",
+        re.IGNORECASE,
+    ),
+    multi_box=True,
+)
+SUM_HOURS_FIELD = FieldSpec(
+    key="sum_hours",
+    labels=("sum timer til utbetaling",),
+    value_pattern=re.compile(r"^\d{1,3}([.,]\d+)?$"),  # e.g. 10,00 or 10.00 or 10
+    numeric=True,
+)
+DEFAULT_FIELDS = (NAME_FIELD, PERIOD_FIELD, SUM_HOURS_FIELD)
+
+
+def _is_label(text: str, labels: tuple, threshold: float):
+    """
+    Returns (is_label, inline value). A box is a label if its whole text, or the
+    part before a colon ("Navn: Ola Nordmann"), fuzzy-matches one of the labels.
+    """
+    lowered = text.lower()
+    head, sep, _ = lowered.partition(':')
+    for label in labels:
+        if SequenceMatcher(None, lowered, label).ratio() >= threshold:
+            return True, ''
+        if sep and SequenceMatcher(None, head.strip(), label).ratio() >= threshold:
+            return True, text[len(head) + 1:].strip()
+    return False, ''
+
+
+def merge_word_runs(words: list, gap_factor: float = GAP_FACTOR) -> list:
+    """
+    Turns word-level boxes (Tesseract image_to_data, PDF text layer) into phrase boxes
+    in EasyOCR format, so multi-word labels like "Sum timer til utbetaling" can be matched.
+    Consecutive words on one line are merged into a run; numeric words and large
+    horizontal gaps (table cells) start a new box, keeping labels and values apart.
+    :param words: List of (x0, y0, x1, y1, text, confidence, line_key).
+    """
+    lines = {}
+    for word in words:
+        lines.setdefault(word[6], []).append(word)
+
+    boxes = []
+    for line_words in lines.values():
+        line_words.sort(key=lambda w: w[0])
+        run = []
+        for word in line_words:
+            numeric = bool(SUM_HOURS_FIELD.value_pattern.match(word[4]))
+            if run:
+                gap = word[0] - run[-1][2]
+                if numeric or gap > gap_factor * max(run[-1][3] - run[-1][1], 1.0) or \
+                        SUM_HOURS_FIELD.value_pattern.match(run[-1][4]):
+                    boxes.append(_run_box(run))
+                    run = []
+            run.append(word)
+        if run:
+            boxes.append(_run_box(run))
+    return boxes
+
+
+def _run_box(words: list) -> list:
+    x0 = float(min(w[0] for w in words))
+    y0 = float(min(w[1] for w in words))
+    x1 = float(max(w[2] for w in words))
+    y1 = float(max(w[3] for w in words))
+    text = ' '.join(w[4] for w in words)
+    return [[[x0, y0], [x1, y0], [x1, y1], [x0, y1]], text, float(min(w[5] for w in words))]
+
+
+def _union_bbox(bboxes: np.ndarray) -> list:
+    x0, y0 = bboxes[:, :, 0].min(), bboxes[:, :, 1].min()
+    x1, y1 = bboxes[:, :, 0].max(), bboxes[:, :, 1].max()
+    return [[float(x0), float(y0)], [float(x1), float(y0)], [float(x1), float(y1)], [float(x0), float(y1)]]
+
+
+def find_labels(ocr_results: list, field: FieldSpec, row_threshold: float = ROW_THRESHOLD,
+                label_threshold: float = LABEL_THRESHOLD) -> list:
+    """
+    Indices of EVERY box labelling field (extract_fields only uses the first one), e.g. one
+    "Navn" per timesheet on a page with several. A label-like box that is the nearest value to
+    the right of another label on its row ("Navn" "Anne") is that label's value, not a label.
+    """
+    candidates = [idx for idx, (_, text, _) in enumerate(ocr_results)
+                  if _is_label(str(text).strip(), field.labels, label_threshold)[0]]
+    if len(candidates) < 2:
+        return candidates
+
+    bboxes = np.asarray([bbox for (bbox, _, _) in ocr_results], dtype=float)
+    texts = [str(text).strip() for (_, text, _) in ocr_results]
+    cx = (bboxes[:, 0, 0] + bboxes[:, 2, 0]) / 2.0
+    cy = (bboxes[:, 0, 1] + bboxes[:, 2, 1]) / 2.0
+    value_mask = np.fromiter((bool(field.value_pattern.match(t)) for t in texts), dtype=bool, count=len(texts))
+
+    values = set()
+    for idx in sorted(candidates, key=lambda i: cx[i]):
+        if idx in values:
+            continue
+        _, inline = _is_label(texts[idx], field.labels, label_threshold)
+        if inline and field.value_pattern.match(inline):
+            continue
+        right = np.nonzero((np.abs(cy - cy[idx]) < row_threshold) & (cx > cx[idx]) & value_mask)[0]
+        if right.size:
+            values.add(int(right[np.argmin(cx[right])]))
+    return [idx for idx in candidates if idx not in values]
+
+
+def extract_fields(ocr_results: list, fields: tuple = DEFAULT_FIELDS,
+                   row_threshold: float = ROW_THRESHOLD,
+                   label_threshold: float = LABEL_THRESHOLD) -> dict:
+    """
+    Pulls several labelled fields out of ONE OCR layout ((bbox, text, confidence) boxes,
+    EasyOCR format). Box geometry goes into NumPy arrays once; boxes are bucketed into
+    rows of row_threshold px, and for every field the first box matching one of its labels
+    is paired with the nearest value box to its right in the same row (vectorized masks).
+    :returns: {field.key: FieldMatch or None}
+    """
+    found = {field.key: None for field in fields}
+    if not ocr_results:
+        return found
+
+    bboxes = np.asarray([bbox for (bbox, _, _) in ocr_results], dtype=float)  # (n, 4, 2)
+    texts = [str(text).strip() for (_, text, _) in ocr_results]
+    confs = np.asarray([float(conf) for (_, _, conf) in ocr_results])
+    cx = (bboxes[:, 0, 0] + bboxes[:, 2, 0]) / 2.0
+    cy = (bboxes[:, 0, 1] + bboxes[:, 2, 1]) / 2.0
+    left = bboxes[:, :, 0].min(axis=1)
+    right = bboxes[:, :, 0].max(axis=1)
+    height = np.maximum(bboxes[:, :, 1].max(axis=1) - bboxes[:, :, 1].min(axis=1), 1.0)
+    rows = np.floor(cy / row_threshold).astype(int)
+
+    for field in fields:
+        label_idx, inline = None, ''
+        for idx, text in enumerate(texts):
+            is_label, inline = _is_label(text, field.labels, label_threshold)
+            if is_label:
+                label_idx = idx
+                break
+        if label_idx is None:
+            continue
+
+        # Value written in the label box itself, e.g. "Navn: Ola Nordmann"
+        if inline and field.value_pattern.match(inline):
+            value = float(inline.replace(",", ".")) if field.numeric else inline
+            found[field.key] = FieldMatch(value, float(confs[label_idx]),
+                                          ocr_results[label_idx][0], ocr_results[label_idx][0])
+            continue
+
+        value_mask = np.fromiter((bool(field.value_pattern.match(t)) for t in texts), dtype=bool, count=len(texts))
+        same_row = (np.abs(rows - rows[label_idx]) <= 1) & (np.abs(cy - cy[label_idx]) < row_threshold)
+        candidates = np.nonzero(same_row & (cx > cx[label_idx]) & value_mask)[0]
+        if candidates.size == 0:
+            continue
+        # Horizontally closest box first; the stable sort keeps OCR order on ties
+        order = candidates[np.argsort(cx[candidates] - cx[label_idx], kind="stable")]
+        chosen = [order[0]]
+        if field.multi_box:
+            for idx in order[1:]:
+                if left[idx] - right[chosen[-1]] > GAP_FACTOR * height[chosen[-1]]:
+                    break
+                chosen.append(idx)
+
+        text = " ".join(texts[idx] for idx in chosen)
+        value = float(text.replace(",", ".")) if field.numeric else text
+        found[field.key] = FieldMatch(
+            value,
+            float(min(confs[label_idx], confs[chosen].min())),
+            ocr_results[label_idx][0],
+            _union_bbox(bboxes[chosen]),
+        )
+    return found
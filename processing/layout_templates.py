@@ -0,0 +1,142 @@
+import os
+import json
+import logging
+import tempfile
+from typing import Union
+
+# Learned field regions per timesheet format, so OCR can run on a few crops instead of the whole page.
+# Regions are stored as fractions of the page (x0, y0, x1, y1), independent of scan resolution.
+LAYOUT_TEMPLATES_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), os.pardir, 'state', 'layout_templates.json')
+)
+REQUIRED_FIELDS = ("name", "sum_hours")  # A crop that misses one of these falls back to the full page
+REGION_MARGIN = 0.04     # Padding around a learned region, as a fraction of the page size
+VALUE_EXTENT = 0.35      # Values vary in length: regions extend this far (page fraction) right of the label
+ASPECT_TOLERANCE = 0.1   # Pages only use templates learned from pages with a similar height/width ratio
+REGION_OVERLAP = 0.3     # Min overlap (of the smaller region) for a layout to count as the same template
+MAX_TEMPLATES = 8
+
+logger = logging.getLogger(__name__)
+
+
+def _overlap(a: list, b: list) -> float:
+    """Intersection area divided by the area of the smaller region."""
+    w = min(a[2], b[2]) - max(a[0], b[0])
+    h = min(a[3], b[3]) - max(a[1], b[1])
+    if w <= 0 or h <= 0:
+        return 0.0
+    smaller = min((a[2] - a[0]) * (a[3] - a[1]), (b[2] - b[0]) * (b[3] - b[1]))
+    return w * h / smaller if smaller > 0 else 0.0
+
+
+def _bounds(bbox: list) -> list:
+    xs = [point[0] for point in bbox]
+    ys = [point[1] for point in bbox]
+    return [min(xs), min(ys), max(xs), max(ys)]
+
+
+class LayoutTemplates:
+    """
+    Store of timesheet layout templates: {"aspect": h/w, "regions": {field: [x0, y0, x1, y1]}, "hits": n}.
+    A template is learned from every full-page extraction that found all REQUIRED_FIELDS,
+    either by widening the matching template or by adding a new one. "hits" counts the pages
+    a template was learned from or read (record_hit), and templates are tried most-used first,
+    so the two or three common formats are found immediately.
+    """
+
+    def __init__(self, path: str = LAYOUT_TEMPLATES_PATH):
+        self.path = path
+        self.templates = self._load()
+        self.hits = 0
+        self.fallbacks = 0
+
+    def _load(self) -> list:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable layout templates {self.path}: {e}")
+            return []
+
+    def save(self):
+        """Replaces the template file atomically (parallel workers may save concurrently; last one wins)."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(self.templates, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def candidates(self, width: int, height: int) -> list:
+        """Templates learned from pages shaped like this one, most-used first."""
+        aspect = height / max(width, 1)
+        matching = [t for t in self.templates if abs(t["aspect"] - aspect) <= ASPECT_TOLERANCE * t["aspect"]]
+        return sorted(matching, key=lambda t: t["hits"], reverse=True)
+
+    def record_hit(self, template: dict):
+        """A page was read from this template's crops alone: it moves up in candidates()."""
+        template["hits"] += 1
+        self.hits += 1
+        self.save()  # A few hundred bytes, next to OCR of the crops
+
+    @staticmethod
+    def crop_boxes(template: dict, width: int, height: int) -> list:
+        """
+        Pixel crop rectangles (x0, y0, x1, y1) for a template, one per region.
+        Overlapping regions (e.g. name and period on one line) are merged into one crop.
+        """
+        rects = []
+        for region in template["regions"].values():
+            rect = [int(region[0] * width), int(region[1] * height),
+                    int(round(region[2] * width)), int(round(region[3] * height))]
+            for other in rects:
+                if _overlap(rect, other) > 0:
+                    other[:] = [min(rect[0], other[0]), min(rect[1], other[1]),
+                                max(rect[2], other[2]), max(rect[3], other[3])]
+                    break
+            else:
+                rects.append(rect)
+        return rects
+
+    def learn(self, fields: dict, width: int, height: int) -> Union [dict , None]:
+        """
+        Records where the fields of a full-page extraction were found.
+        :param fields: layout.extract_fields output ({key: FieldMatch or None}).
+        :returns: The updated or newly added template, or None if a required field was missing.
+        """
+        if any(fields.get(key) is None for key in REQUIRED_FIELDS):
+            return None
+        regions = {}
+        for key, match in fields.items():
+            if match is None:
+                continue
+            label = _bounds(match.label_bbox)
+            value = _bounds(match.value_bbox)
+            regions[key] = [
+                max(0.0, min(label[0], value[0]) / width - REGION_MARGIN),
+                max(0.0, min(label[1], value[1]) / height - REGION_MARGIN),
+                min(1.0, max(label[2], value[2]) / width + VALUE_EXTENT),
+                min(1.0, max(label[3], value[3]) / height + REGION_MARGIN),
+            ]
+
+        aspect = height / max(width, 1)
+        for template in self.candidates(width, height):
+            if all(key in template["regions"] and _overlap(region, template["regions"][key]) >= REGION_OVERLAP
+                   for key, region in regions.items() if key in REQUIRED_FIELDS):
+                for key, region in regions.items():
+                    old = template["regions"].get(key, region)
+                    template["regions"][key] = [min(old[0], region[0]), min(old[1], region[1]),
+                                                max(old[2], region[2]), max(old[3], region[3])]
+                template["hits"] += 1
+                self.save()
+                return template
+
+        template = {"aspect": round(aspect, 4), "regions": regions, "hits": 1}
+        self.templates.append(template)
+        if len(self.templates) > MAX_TEMPLATES:
+            self.templates.sort(key=lambda t: t["hits"], reverse=True)
+            del self.templates[MAX_TEMPLATES:]
+        logger.info(f"Learned layout template #{len(self.templates)} (aspect {aspect:.2f})")
+        self.save()
+        return template
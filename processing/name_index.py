@@ -0,0 +1,84 @@
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Union
+
+
+def _trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _length_bound(la: int, lb: int) -> float:
+    """SequenceMatcher.real_quick_ratio() for strings of these lengths (same float arithmetic)."""
+    length = la + lb
+    return 2.0 * min(la, lb) / length if length else 1.0
+
+
+class NameIndex:
+    """
+    Lookup structure for the roster, built once per TimesheetProcessor:
+      - exact-match dict for names OCR'd perfectly (the common case)
+      - trigram inverted index to score the most promising candidates first
+      - names bucketed by length, so once a good score is known, whole
+        buckets that cannot reach it are skipped without scoring
+    best_match() returns exactly what difflib.get_close_matches(name, names, n=1, cutoff)
+    returns: all pruning uses SequenceMatcher's own upper bounds (real_quick_ratio /
+    quick_ratio) against the best score so far, and ties are broken the same way.
+    """
+
+    def __init__(self, names, cutoff: float):
+        """
+        :param names: Normalized (lower-cased, stripped) roster names, in CSV order.
+        :param cutoff: Minimum SequenceMatcher ratio for a fuzzy match (FUZZY_THRESHOLD).
+        """
+        self.cutoff = cutoff
+        self.names = list(dict.fromkeys(names))
+        self.exact = set(self.names)
+        self.by_length = defaultdict(list)
+        self.trigram_index = defaultdict(list)
+        for idx, name in enumerate(self.names):
+            self.by_length[len(name)].append(idx)
+            for gram in _trigrams(name):
+                self.trigram_index[gram].append(idx)
+
+    def best_match(self, name: str) -> Union [str , None]:
+        word = name.lower().strip()
+        if word in self.exact:
+            return word
+
+        matcher = SequenceMatcher()
+        matcher.set_seq2(word)
+        best = None  # (ratio, name); tuple order reproduces get_close_matches' tie-breaking
+        checked = set()
+
+        def consider(idx):
+            nonlocal best
+            checked.add(idx)
+            candidate = self.names[idx]
+            threshold = self.cutoff if best is None else max(self.cutoff, best[0])
+            matcher.set_seq1(candidate)
+            if matcher.real_quick_ratio() < threshold or matcher.quick_ratio() < threshold:
+                return
+            score = (matcher.ratio(), candidate)
+            if score[0] >= self.cutoff and (best is None or score > best):
+                best = score
+
+        # 1) Candidates sharing the most trigrams first: usually finds the winner immediately
+        overlap = defaultdict(int)
+        for gram in _trigrams(word):
+            for idx in self.trigram_index.get(gram, ()):
+                overlap[idx] += 1
+        for idx in sorted(overlap, key=overlap.get, reverse=True):
+            consider(idx)
+
+        # 2) Everything else, nearest lengths first, skipping buckets that cannot reach the best score
+        lb = len(word)
+        for la in sorted(self.by_length, key=lambda la: abs(la - lb)):
+            threshold = self.cutoff if best is None else max(self.cutoff, best[0])
+            if _length_bound(la, lb) < threshold:
+                continue
+            for idx in self.by_length[la]:
+                if idx not in checked:
+                    consider(idx)
+
+        return best[1] if best else None
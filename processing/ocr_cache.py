@@ -0,0 +1,116 @@
+import os
+import json
+import hashlib
+import logging
+import tempfile
+from typing import Any, Union
+
+# Persistent cache for raw OCR output (EasyOCR boxes, Tesseract text).
+# Validation settings (TOLERANCE, reference CSV) are deliberately NOT part of the key,
+# so changing them only re-runs validation, never OCR.
+OCR_CACHE_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), os.pardir, 'state', 'ocr_cache')
+)
+OCR_CACHE_MAX_BYTES = 512 * 1024 * 1024  # Evict least recently used entries above this size
+EVICT_TARGET_RATIO = 0.9                 # Evict down to 90% of the limit to avoid thrashing
+
+logger = logging.getLogger(__name__)
+
+
+class OCRCache:
+    """
+    Content-addressed on-disk cache. Entries are JSON files sharded by the
+    first two hex digits of their key:  <cache_dir>/ab/abcdef....json
+    """
+
+    def __init__(self, cache_dir: str = OCR_CACHE_DIR, max_bytes: int = OCR_CACHE_MAX_BYTES):
+        """
+        :param cache_dir: Directory that holds the cache entries.
+        :param max_bytes: Size bound; the least recently used entries are evicted above it.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._size = sum(size for _, size, _ in self._entries())
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(image_digest: str, engine: str, engine_version: str, settings: dict) -> str:
+        """
+        Cache key = SHA-256 over the image digest, the engine + version and every
+        setting that changes the OCR output (languages, engine config, preprocessing).
+        """
+        material = json.dumps(
+            {"image": image_digest, "engine": engine, "version": engine_version, "settings": settings},
+            sort_keys=True, default=str,
+        )
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Union [Any , None]:
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        # Touch the entry so eviction is least-recently-used rather than oldest-written
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: Any):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and rename, so parallel workers never see half-written entries
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(value, f)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Could not write OCR cache entry {key[:12]}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self._size += size
+        if self._size > self.max_bytes:
+            self._evict()
+
+    def _entries(self):
+        """Yields (path, size, last_used) for every cache entry."""
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith('.json'):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    yield entry.path, stat.st_size, stat.st_mtime
+
+    def _evict(self):
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * EVICT_TARGET_RATIO
+        removed = 0
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # Another worker evicted it first
+            total -= size
+            removed += 1
+        self._size = total
+        logger.info(f"OCR cache: evicted {removed} entries ({total / 1e6:.1f} MB kept)")
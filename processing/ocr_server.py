@@ -0,0 +1,329 @@
+import os
+import sys
+import json
+import time
+import queue
+import signal
+import socket
+import struct
+import logging
+import threading
+import socketserver
+import numpy as np
+from typing import Union
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+# Optional long-lived OCR server: holds an initialized easyocr.Reader and Tesseract engine,
+# so a CLI invocation does not pay the model cold start. TimesheetProcessor uses it
+# automatically when the socket answers (run_prove.py serve).
+OCR_SOCKET_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), os.pardir, 'state', 'ocr.sock')
+)
+BATCH_WINDOW = 0.02      # Seconds to wait for more readtext requests before running a batch
+MAX_BATCH = 8            # readtext requests per batched EasyOCR call
+CONNECT_TIMEOUT = 0.5    # Seconds; a dead socket falls back to local OCR quickly
+REQUEST_TIMEOUT = 300.0  # Seconds for one OCR request (queued behind other clients)
+
+_HEADER = struct.Struct('>I')
+
+logger = logging.getLogger(__name__)
+
+
+# --- Wire format: 4-byte header length, JSON header, then the raw bytes of every array ---
+
+def _recv_exact(sock: socket.socket, n: int) -> bytes:
+    chunks = bytearray()
+    while len(chunks) < n:
+        chunk = sock.recv(min(n - len(chunks), 1 << 20))
+        if not chunk:
+            raise ConnectionError("OCR server connection closed")
+        chunks += chunk
+    return bytes(chunks)
+
+
+def _send(sock: socket.socket, header: dict, arrays: tuple = ()):
+    arrays = [np.ascontiguousarray(a) for a in arrays]
+    header = dict(header, arrays=[{"shape": list(a.shape), "dtype": str(a.dtype)} for a in arrays])
+    raw = json.dumps(header).encode('utf-8')
+    sock.sendall(_HEADER.pack(len(raw)) + raw)
+    for array in arrays:
+        sock.sendall(memoryview(array).cast('B'))
+
+
+def _recv(sock: socket.socket) -> tuple:
+    (length,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    header = json.loads(_recv_exact(sock, length).decode('utf-8'))
+    arrays = []
+    for spec in header.pop("arrays", []):
+        dtype = np.dtype(spec["dtype"])
+        size = int(np.prod(spec["shape"])) * dtype.itemsize
+        arrays.append(np.frombuffer(_recv_exact(sock, size), dtype=dtype).reshape(spec["shape"]))
+    return header, arrays
+
+
+# --- Client side ---
+
+class OCRClient:
+    """
+    Connection details of a running OCR server; every request uses its own
+    connection, so one client can be shared by threads.
+    """
+
+    def __init__(self, socket_path: str = OCR_SOCKET_PATH):
+        self.socket_path = socket_path
+        self.info = self.request("ping")
+
+    @classmethod
+    def connect(cls, socket_path: str = OCR_SOCKET_PATH) -> Union ["OCRClient" , None]:
+        """A client if a server answers on socket_path, else None (no server running)."""
+        if not os.path.exists(socket_path):
+            return None
+        try:
+            client = cls(socket_path)
+        except (OSError, ValueError) as e:
+            logger.debug(f"OCR server at {socket_path} not answering: {e}")
+            return None
+        logger.info(f"Using OCR server at {socket_path}")
+        return client
+
+    def request(self, op: str, arrays: tuple = (), **kwargs):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(CONNECT_TIMEOUT)
+            sock.connect(self.socket_path)
+            sock.settimeout(REQUEST_TIMEOUT)
+            _send(sock, {"op": op, "kwargs": kwargs}, arrays)
+            response, _ = _recv(sock)
+        if "error" in response:
+            raise RuntimeError(f"OCR server: {response['error']}")
+        return response["result"]
+
+
+class RemoteReader:
+    """
+    Stands in for easyocr.Reader (readtext / readtext_batched) and sends the work to
+    the server. If the server goes away mid-run, it switches to the local reader; a
+    request the server fails on (RuntimeError) is read locally, and the next one goes
+    to the server again. The local reader is built and called under a lock: with a
+    server, the regions of a multi-sheet page run in threads (see _region_sheets).
+    """
+
+    def __init__(self, client: OCRClient, fallback):
+        """:param fallback: Callable returning the local easyocr.Reader (built on demand)."""
+        self.client = client
+        self._fallback = fallback
+        self._local = None
+        self._local_lock = threading.Lock()
+        self._use_server = True
+
+    def _run_local(self, op: str, *args, **kwargs):
+        with self._local_lock:
+            if self._local is None:
+                self._local = self._fallback()
+            return getattr(self._local, op)(*args, **kwargs)
+
+    def readtext(self, array: np.ndarray, detail: int = 1):
+        if self._use_server:
+            try:
+                return self.client.request("readtext", (array,))
+            except (OSError, ValueError, RuntimeError) as e:
+                self._use_server = _server_failed(e, self._use_server, "EasyOCR")
+        return self._run_local("readtext", array, detail=detail)
+
+    def readtext_batched(self, arrays: list, n_width: int = None, n_height: int = None,
+                         batch_size: int = 1, detail: int = 1):
+        if self._use_server:
+            try:
+                return self.client.request("readtext_batched", tuple(arrays), n_width=n_width,
+                                           n_height=n_height, batch_size=batch_size)
+            except (OSError, ValueError, RuntimeError) as e:
+                self._use_server = _server_failed(e, self._use_server, "EasyOCR")
+        return self._run_local("readtext_batched", arrays, n_width=n_width, n_height=n_height,
+                               batch_size=batch_size, detail=detail)
+
+
+class RemoteTesseract:
+    """Stands in for TesseractEngine (text / words), with the same locked local fallback as RemoteReader."""
+
+    def __init__(self, client: OCRClient, fallback):
+        self.client = client
+        self.version = client.info["tesseract_version"]
+        self.backend = client.info["tesseract_backend"]
+        self._fallback = fallback
+        self._local = None
+        self._local_lock = threading.Lock()
+        self._use_server = True
+
+    def _call(self, op: str, array: np.ndarray):
+        if self._use_server:
+            try:
+                return self.client.request(op, (array,))
+            except (OSError, ValueError, RuntimeError) as e:
+                self._use_server = _server_failed(e, self._use_server, "Tesseract")
+        with self._local_lock:
+            if self._local is None:
+                self._local = self._fallback()
+            return getattr(self._local, op)(array)
+
+    def text(self, array: np.ndarray) -> str:
+        return self._call("text", array)
+
+    def words(self, array: np.ndarray) -> list:
+        return self._call("words", array)
+
+
+def _server_failed(error: Exception, use_server: bool, engine: str) -> bool:
+    """
+    Logs a failed request and tells whether to keep using the server: an error reported by the
+    server (RuntimeError) only affects that request, a broken connection or reply (OSError,
+    ValueError) the rest of the run.
+    """
+    if isinstance(error, RuntimeError):
+        logger.warning(f"{error}; reading this image with local {engine}")
+        return use_server
+    if use_server:
+        logger.warning(f"OCR server unavailable ({error}), continuing with local {engine}")
+    return False
+
+
+# --- Server side ---
+
+class _Job:
+    def __init__(self, op: str, arrays: list, kwargs: dict):
+        self.op = op
+        self.arrays = arrays
+        self.kwargs = kwargs
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class OCRServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Connection threads only parse requests and queue them; a single OCR thread owns
+    the models. Single-image readtext requests that arrive within BATCH_WINDOW of each
+    other and have the same shape are run as one readtext_batched call.
+    """
+    daemon_threads = True
+
+    def __init__(self, socket_path: str = OCR_SOCKET_PATH, gpu: bool = False):
+        from processing import payroll_verification as pv
+        from processing.tesseract_engine import TesseractEngine
+
+        self.jobs = queue.Queue()
+        self.served = 0
+        self.batches = 0
+        logger.info("Initializing EasyOCR Reader...")
+        import easyocr
+        self.reader = easyocr.Reader(pv.LANGS, model_storage_directory=pv.MODEL_STORAGE_PATH, gpu=gpu)
+        self.tesseract = TesseractEngine(lang=pv.TESSERACT_LANG, oem=pv.TESSERACT_OEM, psm=pv.TESSERACT_PSM)
+        self.plain_boxes = pv._plain_boxes
+
+        if os.path.exists(socket_path):
+            try:
+                OCRClient(socket_path)
+            except (OSError, ValueError):
+                os.remove(socket_path)  # Stale socket from a server that did not shut down cleanly
+            else:
+                raise RuntimeError(f"An OCR server is already running at {socket_path}")
+        os.makedirs(os.path.dirname(socket_path), exist_ok=True)
+        super().__init__(socket_path, _Handler)
+        threading.Thread(target=self._ocr_loop, name="ocr-worker", daemon=True).start()
+
+    def info(self) -> dict:
+        from processing.payroll_verification import easyocr_version
+        return {"pid": os.getpid(), "easyocr_version": easyocr_version(),
+                "tesseract_version": self.tesseract.version, "tesseract_backend": self.tesseract.backend,
+                "served": self.served, "batches": self.batches}
+
+    def submit(self, op: str, arrays: list, kwargs: dict):
+        if op == "ping":  # Answered right away, not queued behind OCR work
+            return self.info()
+        job = _Job(op, arrays, kwargs)
+        self.jobs.put(job)
+        job.done.wait()
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    def _ocr_loop(self):
+        while True:
+            batch = [self.jobs.get()]
+            deadline = time.monotonic() + BATCH_WINDOW
+            while batch[0].op == "readtext" and len(batch) < MAX_BATCH:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.jobs.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._run(batch)
+
+    def _run(self, batch: list):
+        readtext = {}
+        for job in batch:
+            if job.op == "readtext":
+                readtext.setdefault(job.arrays[0].shape, []).append(job)
+            else:
+                self._run_one(job)
+        for jobs in readtext.values():
+            try:
+                if len(jobs) == 1:
+                    outputs = [self.reader.readtext(jobs[0].arrays[0], detail=1)]
+                else:
+                    outputs = self.reader.readtext_batched([job.arrays[0] for job in jobs],
+                                                           batch_size=len(jobs), detail=1)
+                    self.batches += 1
+                for job, output in zip(jobs, outputs):
+                    job.result = self.plain_boxes(output)
+            except Exception as e:
+                for job in jobs:
+                    job.error = e
+            for job in jobs:
+                self.served += 1
+                job.done.set()
+
+    def _run_one(self, job: _Job):
+        try:
+            if job.op == "readtext_batched":
+                outputs = self.reader.readtext_batched(list(job.arrays), detail=1, **job.kwargs)
+                job.result = [self.plain_boxes(output) for output in outputs]
+            elif job.op == "text":
+                job.result = self.tesseract.text(job.arrays[0])
+            elif job.op == "words":
+                job.result = self.tesseract.words(job.arrays[0])
+            else:
+                raise ValueError(f"Unknown operation: {job.op}")
+        except Exception as e:
+            job.error = e
+        self.served += 1
+        job.done.set()
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        try:
+            header, arrays = _recv(self.request)
+            result = self.server.submit(header["op"], arrays, header.get("kwargs") or {})
+            _send(self.request, {"result": result})
+        except ConnectionError:
+            return
+        except Exception as e:
+            logger.error(f"OCR request failed: {e}")
+            _send(self.request, {"error": str(e)})
+
+
+def serve(socket_path: str = OCR_SOCKET_PATH, gpu: bool = False):
+    """Runs the OCR server until SIGINT/SIGTERM, then removes the socket."""
+    server = OCRServer(socket_path, gpu=gpu)
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    logger.info(f"🟢 OCR server listening on {socket_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        logger.info(f"OCR server stopped after {server.served} request(s) ({server.batches} batched call(s))")
@@ -1,16 +1,48 @@
 import os
 import re
+import sys
+import hashlib
+import queue
 import logging
-import pandas as pd
-import pytesseract
-import easyocr
-from difflib import get_close_matches, SequenceMatcher
-from typing import Union 
+import threading
+import contextlib
+import multiprocessing
+from functools import lru_cache
+from importlib import metadata
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from difflib import SequenceMatcher
+from typing import TYPE_CHECKING, Iterable, Union 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from processing.ocr_cache import OCRCache
+from processing import autotune, layout, pdf_extraction, preprocessing, segmentation
+from processing.preprocessing import PreprocessSettings
+from processing.name_index import NameIndex
+from processing.layout_templates import LayoutTemplates, REQUIRED_FIELDS
+from processing.segmentation import SheetRegion
+from processing.run_journal import RESULTS_PATH, RunJournal, append_results, run_fingerprint, write_results
+from ingestion import attachment_store
+from monitoring import metrics
+
+if TYPE_CHECKING:
+    from processing.tesseract_engine import TesseractEngine
 
 MODEL_STORAGE_PATH = '~/.EasyOCR/model/'
 LANGS = ['no', 'en']  # Norwegian + English OCR
 TOLERANCE = 0.1       # Allowed difference between reported & agreed hours
 FUZZY_THRESHOLD = 0.6 # Fuzzy matching threshold for name lookups
+TESSERACT_LANG = "eng"
+TESSERACT_OEM = 1  # LSTM only
+TESSERACT_PSM = 6  # Assume a single uniform block of text
+TESSERACT_CONFIG = f"--oem {TESSERACT_OEM} --psm {TESSERACT_PSM}"
+BATCH_IMAGE_SIZE = (1654, 2339)  # Common (width, height) for batched EasyOCR: A4 portrait at 200 DPI
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+CASCADE_MIN_CONFIDENCE = 0.6  # Cascade: escalate to EasyOCR when a Tesseract field is below this
+PDF_EXTENSIONS = ('.pdf',)
+SUPPORTED_EXTENSIONS = IMAGE_EXTENSIONS + PDF_EXTENSIONS
+NAME_PATTERN = re.compile(r"(?:Navn|Name)\s*:\s*([A-Za-zÆØÅæøå \-]+)", re.IGNORECASE)
+SHEET_WORKERS = 4  # Timesheet regions of one multi-sheet scan in flight at once (OCR server only)
+PREPROCESSING = PreprocessSettings()  # Image normalization before OCR (part of the OCR cache key); None = off
 LOG_LEVEL = logging.INFO
 
 logging.basicConfig(
@@ -20,6 +52,16 @@ logging.basicConfig(
 
 
 
+# easyocr (and with it torch) and pandas take seconds and hundreds of MB to import, so they are
+# imported where first used: listing files, cache hits and the parent of a worker pool never load them.
+# The same goes for pytesseract (tesseract_engine), cv2/PIL (inside preprocessing) and the OCR server client.
+
+@lru_cache(maxsize=None)
+def easyocr_version() -> str:
+    """EasyOCR version for cache keys, read from package metadata without importing easyocr."""
+    return metadata.version("easyocr")
+
+
 def fuzzy_match(str1, str2, threshold=FUZZY_THRESHOLD):
     """
     Returns True if str1 is sufficiently similar to str2 based on a ratio.
@@ -41,6 +83,104 @@ def bbox_center(bbox):
     return (cx, cy)
 
 
+def parse_name(raw_text: str) -> str:
+    """
+    Reads 'Navn: ...' from page text (Tesseract output or a PDF text layer).
+    :returns: Extracted name (or 'Ukjent' if not found).
+    """
+    match = NAME_PATTERN.search(raw_text)
+    if match:
+        return match.group(1).strip()
+    return "Ukjent"
+
+
+def _plain_boxes(ocr_results) -> list:
+    """
+    Converts EasyOCR detail output (NumPy ints/floats) into plain Python lists,
+    so results can be cached as JSON and sent between processes.
+    """
+    return [
+        [[[float(x), float(y)] for (x, y) in bbox], text, float(conf)]
+        for (bbox, text, conf) in ocr_results
+    ]
+
+
+class ImageSource:
+    """
+    One timesheet file: its raw bytes are read once, hashed for the OCR cache,
+    and decoded lazily (at most once) into an array shared by both engines.
+    With preprocessing settings, that array is the normalized image (see preprocessing.py);
+    the digest always covers the original content.
+    """
+
+    def __init__(self, data: Union [bytes , None] = None, name: str = "", array: np.ndarray = None,
+                 preprocessing: Union [PreprocessSettings , None] = None):
+        self.data = data
+        self.name = name
+        self._array = array
+        self._digest = None
+        self.preprocessing = preprocessing
+        self._prepared = array is None or preprocessing is None
+
+    @classmethod
+    def from_path(cls, image_path: str, preprocessing: Union [PreprocessSettings , None] = None) -> "ImageSource":
+        if not os.path.exists(image_path):
+            logging.warning(f"Image not found: {image_path}")
+            return cls(name=image_path, preprocessing=preprocessing)
+        with metrics.span("image.read"), open(image_path, 'rb') as f:
+            return cls(f.read(), name=image_path, preprocessing=preprocessing)
+
+    @classmethod
+    def wrap(cls, image: Union [str , np.ndarray , "ImageSource"],
+             preprocessing: Union [PreprocessSettings , None] = None) -> "ImageSource":
+        """Paths are decoded with preprocessing; arrays and ImageSources are used as given."""
+        if isinstance(image, ImageSource):
+            return image
+        if isinstance(image, str):
+            return cls.from_path(image, preprocessing=preprocessing)
+        return cls(array=image)
+
+    @property
+    def is_empty(self) -> bool:
+        """True when the file was missing, i.e. there is nothing to OCR."""
+        return self.data is None and self._array is None
+
+    @property
+    def digest(self) -> Union [str , None]:
+        """SHA-256 of the file bytes (or of the pixels, for in-memory arrays)."""
+        if self._digest is None:
+            if self.data is not None:
+                self._digest = hashlib.sha256(self.data).hexdigest()
+            elif self._array is not None:
+                h = hashlib.sha256(str(self._array.shape).encode())
+                h.update(np.ascontiguousarray(self._array).tobytes())
+                self._digest = h.hexdigest()
+        return self._digest
+
+    @property
+    def array(self) -> Union [np.ndarray , None]:
+        if self._array is None and self.data:
+            with metrics.span("image.decode"):
+                image = preprocessing.decode(self.data, self.preprocessing)
+            if image is None:
+                logging.warning(f"Could not decode image: {self.name}")
+                self.data = None
+                return None
+            self._array = image
+        elif not self._prepared:
+            # In-memory pages (rendered PDFs): hash the original pixels before normalizing them
+            _ = self.digest
+            with metrics.span("image.decode"):
+                self._array = preprocessing.apply(self._array, self.preprocessing)
+            self._prepared = True
+        return self._array
+
+
+    def release(self):
+        """Drops the raw bytes and decoded pixels once the image is fully processed."""
+        self.data = None
+        self._array = None
+
 
 class TimesheetProcessor:
     """
@@ -52,129 +192,559 @@ class TimesheetProcessor:
       5) Approving or rejecting timesheet
     """
 
-    def __init__(self, csv_path: str, gpu: bool = False):
+    def __init__(self, csv_path: str, gpu: bool = False, cache: Union [OCRCache , None] = None,
+                 cascade: bool = False, templates: Union [LayoutTemplates , None] = None,
+                 preprocessing: Union [PreprocessSettings , None] = PREPROCESSING, use_server: bool = True):
         """
         :param csv_path: Path to CSV with columns [Name, agreed hours, extra hours, hours given away].
         :param gpu: True if you have a GPU and want to enable it in EasyOCR.
+        :param cache: Optional OCRCache; raw OCR output is reused across runs when given.
+        :param cascade: Try Tesseract word boxes first and only run EasyOCR when a field
+                        is missing or below CASCADE_MIN_CONFIDENCE.
+        :param templates: Optional LayoutTemplates; EasyOCR then runs on the learned field
+                          regions only, with the full page as fallback.
+        :param preprocessing: Normalization applied to every image before OCR (None = original pixels).
+        :param use_server: Send OCR to a running OCR server (run_prove.py serve) if one answers,
+                           instead of loading the models in this process.
         """
         # Load CSV
         if not os.path.exists(csv_path):
             raise FileNotFoundError(f"CSV not found at {csv_path}")
+        import pandas as pd
         self.df = pd.read_csv(csv_path)
         self.df.columns = self.df.columns.str.strip()
         # Normalize "Name" column
         self.df["Name"] = self.df["Name"].astype(str).str.lower().str.strip()
-
-        # Initialize EasyOCR
+        # Precompute total agreed hours and the lookup structures once, not per image
+        self.df["total hours"] = (self.df["agreed hours"].astype(float)
+                                  + self.df["extra hours"].astype(float)
+                                  - self.df["hours given away"].astype(float))
+        self.name_index = NameIndex(self.df["Name"].tolist(), cutoff=FUZZY_THRESHOLD)
+        # First row wins for duplicate names, as with the previous row lookup
+        self.agreed_totals = {}
+        for name, total in zip(self.df["Name"], self.df["total hours"]):
+            self.agreed_totals.setdefault(name, float(total))
+
+        # EasyOCR is initialized on first use: in cascade mode clean scans never need it
+        self.gpu = gpu
+        self._reader = None
+        self.server = None
+        if use_server:
+            from processing.ocr_server import OCRClient
+            self.server = OCRClient.connect()
+
+        self.cache = cache
+        self.cascade = cascade
+        self._tesseract = None
+        self._tesseract_version = None  # (version, backend) for cache keys, see _tesseract_settings
+        self.templates = templates
+        self.preprocessing = preprocessing
+        self._preprocessing_key = preprocessing.key() if preprocessing is not None else None
+        # Local engines are not thread-safe; the OCR server is (and is the only case where regions run in threads).
+        # Its clients lock their local fallback themselves (see RemoteReader); _engine_lock builds each client once.
+        self._ocr_lock = threading.RLock() if self.server is None else contextlib.nullcontext()
+        self._engine_lock = threading.Lock()
+
+    def _local_reader(self):
         logging.info("Initializing EasyOCR Reader...")
-        self.reader = easyocr.Reader(LANGS, model_storage_directory=MODEL_STORAGE_PATH, gpu=gpu)
-
-    def extract_name(self, image_path: str) -> str:
+        import easyocr
+        return easyocr.Reader(LANGS, model_storage_directory=MODEL_STORAGE_PATH, gpu=self.gpu)
+
+    def _local_tesseract(self) -> "TesseractEngine":
+        from processing.tesseract_engine import TesseractEngine
+        engine = TesseractEngine(lang=TESSERACT_LANG, oem=TESSERACT_OEM, psm=TESSERACT_PSM)
+        logging.info(f"Tesseract {engine.version} loaded ({engine.backend})")
+        return engine
+
+    @property
+    def reader(self):
+        """easyocr.Reader, or a stand-in that forwards to the OCR server when one is running."""
+        with self._engine_lock:
+            if self._reader is None:
+                from processing.ocr_server import RemoteReader
+                self._reader = (RemoteReader(self.server, self._local_reader) if self.server is not None
+                                else self._local_reader())
+        return self._reader
+
+    @property
+    def tesseract(self) -> "TesseractEngine":
+        """This processor's Tesseract engine (or the OCR server's), loaded once and reused for every image."""
+        with self._engine_lock:
+            if self._tesseract is None:
+                from processing.ocr_server import RemoteTesseract
+                self._tesseract = (RemoteTesseract(self.server, self._local_tesseract) if self.server is not None
+                                   else self._local_tesseract())
+        return self._tesseract
+
+    def _tesseract_settings(self) -> tuple:
         """
-        Simple Tesseract-based approach to read 'Navn: ...' from the image.
-        :returns: Extracted name (or 'Ukjent' if not found).
+        (version, settings) identifying Tesseract output in the OCR cache. The version comes from the
+        OCR server's info or a one-off lookup (see tesseract_engine.installed_version), never from
+        building the engine, so cache hits do not start Tesseract.
         """
-        if not os.path.exists(image_path):
-            logging.warning(f"Image not found: {image_path}")
-            return "Ukjent"
+        if self._tesseract_version is None:
+            if self.server is not None:
+                self._tesseract_version = (self.server.info["tesseract_version"],
+                                           self.server.info["tesseract_backend"])
+            else:
+                from processing.tesseract_engine import installed_version
+                self._tesseract_version = installed_version(TESSERACT_LANG)
+        version, backend = self._tesseract_version
+        return version, {"lang": TESSERACT_LANG, "config": TESSERACT_CONFIG, "backend": backend,
+                         "preprocessing": self._preprocessing_key}
 
-        raw_text = pytesseract.image_to_string(
-            image_path, lang="eng", config="--oem 1 --psm 6"
+    def _cached_ocr(self, source: ImageSource, engine: str, key_settings, run_ocr):
+        """
+        Returns the cached OCR output for this image/engine/settings, or runs
+        run_ocr(array) and stores its (JSON-serializable) result.
+        :param key_settings: Callable returning (engine version, settings); only called with a cache.
+        """
+        key = None
+        if self.cache is not None and source.digest is not None:
+            key = OCRCache.make_key(source.digest, engine, *key_settings())
+            cached = self.cache.get(key)
+            if cached is not None:
+                metrics.count("ocr_cache_hits")
+                return cached
+            metrics.count("ocr_cache_misses")
+        array = source.array
+        with self._ocr_lock, metrics.span(f"ocr.{engine}"):
+            result = run_ocr(array)
+        if key is not None:
+            self.cache.put(key, result)
+        return result
+
+    def read_text(self, image: Union [str , np.ndarray , ImageSource]) -> str:
+        """
+        Full-page Tesseract text (cached when an OCRCache is configured).
+        """
+        source = ImageSource.wrap(image, self.preprocessing)
+        if source.is_empty:
+            return ""
+        return self._cached_ocr(
+            source, "tesseract", self._tesseract_settings,
+            lambda array: "" if array is None else self.tesseract.text(array),
         )
-        pattern = re.compile(r"(?:Navn|Name)\s*:\s*([A-Za-zÆØÅæøå \-]+)", re.IGNORECASE)
-        match = pattern.search(raw_text)
-        if match:
-            return match.group(1).strip()
-        return "Ukjent"
 
-    def extract_sum_timer(self, image_path: str) -> Union [float , str]:
+    def read_words(self, image: Union [str , np.ndarray , ImageSource]) -> list:
         """
-        Finds "Sum timer til utbetaling" bounding box, then
-        locates the nearest numeric bounding box to the right
-        in the same row. Returns the numeric value or a warning string.
+        Tesseract word boxes (see TesseractEngine.words): list of (x0, y0, x1, y1, text, confidence 0-1, line key).
         """
-        if not os.path.exists(image_path):
-            return "⚠️ Could not extract hours"
+        source = ImageSource.wrap(image, self.preprocessing)
+        if source.is_empty:
+            return []
+        return self._cached_ocr(source, "tesseract-data", self._tesseract_settings,
+                                lambda array: [] if array is None else self.tesseract.words(array))
 
-        try:
-            # 1) Perform OCR in detail mode => list of (bbox, text, confidence)
-            ocr_results = self.reader.readtext(image_path, detail=1)
-
-            # 2) Locate bounding box for "Sum timer til utbetaling"
-            target_phrase = "sum timer til utbetaling"
-            sum_timer_bbox = None
-            sum_timer_center_x = None
-            sum_timer_center_y = None
-
-            for (bbox, text, confidence) in ocr_results:
-                if fuzzy_match(text, target_phrase):
-                    sum_timer_bbox = bbox
-                    (sum_timer_center_x, sum_timer_center_y) = bbox_center(bbox)
-                    logging.debug(f"Found phrase '{text}' @ {bbox} (conf={confidence:.2f})")
-                    break
+    def read_boxes(self, image: Union [str , np.ndarray , ImageSource]) -> list:
+        """
+        Full-page EasyOCR readtext in detail mode => list of (bbox, text, confidence),
+        with plain Python types so results can be cached and sent between processes.
+        """
+        source = ImageSource.wrap(image, self.preprocessing)
+        if source.is_empty:
+            return []
+        settings = {"langs": LANGS, "detail": 1, "preprocessing": self._preprocessing_key}
 
-            if not sum_timer_bbox:
-                return "⚠️ Could not extract hours"
+        def run_readtext(array):
+            if array is None:
+                return []
+            return _plain_boxes(self.reader.readtext(array, detail=1))
 
-            # 3) Search numeric bounding boxes in the same row (within ~20px) and to the right
-            row_threshold = 30.0
-            numeric_pattern = re.compile(r"^\d{1,3}([.,]\d+)?$")  # e.g. 10,00 or 10.00 or 10
-            candidates = []
+        return self._cached_ocr(source, "easyocr", lambda: (easyocr_version(), settings), run_readtext)
 
-            for (bbox, text, conf) in ocr_results:
-                text_clean = text.strip()
-                if numeric_pattern.match(text_clean):
-                    (cx, cy) = bbox_center(bbox)
-                    if (cx > sum_timer_center_x) and (abs(cy - sum_timer_center_y) < row_threshold):
-                        dx = cx - sum_timer_center_x
-                        candidates.append((dx, text_clean))
+    def read_boxes_batched(self, sources: list, batch_size: int = 8) -> list:
+        """
+        Batched EasyOCR: every image is resized to BATCH_IMAGE_SIZE so the detector
+        and recognizer see real batches, then boxes are scaled back to the original
+        pixel coordinates so the per-image row search is unaffected.
+        :param sources: List of ImageSource.
+        :param batch_size: Recognizer batch size passed to readtext_batched.
+        :returns: One list of (bbox, text, confidence) per source, in input order.
+        """
+        n_width, n_height = BATCH_IMAGE_SIZE
+        settings = {"langs": LANGS, "detail": 1, "preprocessing": self._preprocessing_key,
+                    "resize": [n_width, n_height]}
+
+        results = [[] for _ in sources]
+        pending = []  # (index, cache key, array) for cache misses
+        for idx, source in enumerate(sources):
+            if source.is_empty:
+                continue
+            key = None
+            if self.cache is not None and source.digest is not None:
+                key = OCRCache.make_key(source.digest, "easyocr", easyocr_version(), settings)
+                cached = self.cache.get(key)
+                if cached is not None:
+                    metrics.count("ocr_cache_hits")
+                    results[idx] = cached
+                    continue
+                metrics.count("ocr_cache_misses")
+            if source.array is not None:
+                pending.append((idx, key, source.array))
+
+        if pending:
+            with metrics.span("ocr.easyocr_batched", images=len(pending)):
+                batch_output = self.reader.readtext_batched(
+                    [array for (_, _, array) in pending],
+                    n_width=n_width, n_height=n_height, batch_size=batch_size, detail=1,
+                )
+            for (idx, key, array), ocr_results in zip(pending, batch_output):
+                scale_x = array.shape[1] / n_width
+                scale_y = array.shape[0] / n_height
+                boxes = [
+                    [[[x * scale_x, y * scale_y] for (x, y) in bbox], text, conf]
+                    for (bbox, text, conf) in _plain_boxes(ocr_results)
+                ]
+                results[idx] = boxes
+                if key is not None:
+                    self.cache.put(key, boxes)
+        return results
+
+    def extract_name(self, image: Union [str , np.ndarray , ImageSource]) -> str:
+        """
+        Simple Tesseract-based approach to read 'Navn: ...' from the image.
+        :param image: Path to the image, an already decoded RGB array or an ImageSource.
+        :returns: Extracted name (or 'Ukjent' if not found).
+        """
+        return parse_name(self.read_text(image))
+
+    def _read_region_boxes(self, array: np.ndarray, rect: list) -> list:
+        """EasyOCR on one crop, with the boxes shifted back into page coordinates."""
+        x0, y0, x1, y1 = rect
+        boxes = self.read_boxes(ImageSource(array=np.ascontiguousarray(array[y0:y1, x0:x1])))
+        return [[[[x + x0, y + y0] for (x, y) in bbox], text, conf] for (bbox, text, conf) in boxes]
+
+    def _template_boxes(self, source: ImageSource) -> Union [list , None]:
+        """
+        Boxes from the field regions of the first learned template matching the page shape
+        whose crops yield all required fields; None when no template does.
+        """
+        array = source.array
+        if array is None:
+            return None
+        height, width = array.shape[:2]
+        for template in self.templates.candidates(width, height):
+            boxes = []
+            for rect in self.templates.crop_boxes(template, width, height):
+                boxes.extend(self._read_region_boxes(array, rect))
+            fields = layout.extract_fields(boxes)
+            if all(fields[key] is not None for key in REQUIRED_FIELDS):
+                self.templates.record_hit(template)
+                return boxes
+        return None
+
+    @staticmethod
+    def _needs_escalation(fields: dict) -> bool:
+        for key in ("name", "sum_hours"):
+            match = fields.get(key)
+            if match is None or match.confidence < CASCADE_MIN_CONFIDENCE:
+                return True
+        return False
+
+    @staticmethod
+    def _merge_fields(fast: dict, full: dict) -> dict:
+        """Per field, the EasyOCR result wins; the Tesseract one is kept where EasyOCR found nothing."""
+        return {key: full.get(key) if full.get(key) is not None else fast.get(key) for key in fast}
+
+    def _tesseract_regions(self, image: ImageSource) -> list:
+        """Tesseract word boxes of the page, split into timesheets (see segmentation.split_sheets)."""
+        try:
+            return segmentation.split_sheets(layout.merge_word_runs(self.read_words(image)))
+        except Exception as e:
+            logging.error(f"Error extracting fields with Tesseract: {e}")
+            return [SheetRegion(None, [])]
 
-            if not candidates:
-                return "⚠️ Could not extract hours"
+    def _easyocr_regions(self, image: ImageSource, page_boxes: Union [list , None] = None) -> list:
+        """
+        EasyOCR layout of the page, split into timesheets. With templates, a page whose
+        learned regions yield all fields is one timesheet; only single-sheet pages are learned.
+        :param page_boxes: The page's EasyOCR boxes when already read (batched, see process_images);
+                           only used without templates.
+        """
+        try:
+            if self.templates is None:
+                return segmentation.split_sheets(page_boxes if page_boxes is not None else self.read_boxes(image))
+            boxes = self._template_boxes(image)
+            if boxes is not None:
+                return [SheetRegion(None, boxes)]
+            self.templates.fallbacks += 1
+            regions = segmentation.split_sheets(self.read_boxes(image))
+            if len(regions) == 1 and image.array is not None:
+                height, width = image.array.shape[:2]
+                self.templates.learn(layout.extract_fields(regions[0].boxes), width, height)
+            return regions
+        except Exception as e:
+            logging.error(f"Error extracting fields: {e}")
+            return [SheetRegion(None, [])]
 
-            # 4) Pick the bounding box that is horizontally closest to the phrase
-            candidates.sort(key=lambda c: c[0])
-            numeric_text = candidates[0][1]  # text of nearest candidate
-            # 5) Convert e.g. "10,00" -> float 10.00
-            numeric_value_str = numeric_text.replace(",", ".")
-            return float(numeric_value_str)
+    def ocr_sheets(self, image: ImageSource) -> list:
+        """
+        Fields of every timesheet on one page, in reading order: [(fields, engine, image)],
+        where image is what the name fallback reads (the page, or the sheet's own crop).
+        The page is read once (Tesseract word boxes in cascade mode, EasyOCR otherwise) and
+        split into regions. In cascade mode EasyOCR only runs when Tesseract misses the name
+        or the sum hours, or reads them with low confidence.
+        """
+        sheets, fast = self._tesseract_sheets(image)
+        if sheets is not None:
+            return sheets
+        return self._easyocr_sheets(image, self._easyocr_regions(image), fast)
 
+    def _tesseract_sheets(self, image: ImageSource) -> tuple:
+        """
+        First cascade stage, shared by ocr_sheets and process_images: (sheets, None) when Tesseract
+        settles the page (a multi-sheet page escalates per region), else (None, the page's Tesseract
+        fields, or None without cascade) for the EasyOCR stage (_easyocr_sheets) to merge with.
+        """
+        if not self.cascade:
+            return None, None
+        regions = self._tesseract_regions(image)
+        if len(regions) > 1:
+            return self._region_sheets(image, regions, "tesseract"), None
+        fast = layout.extract_fields(regions[0].boxes)
+        if not self._needs_escalation(fast):
+            metrics.count("cascade_resolved")
+            return [(fast, "tesseract", image)], None
+        metrics.count("cascade_escalations")
+        return None, fast
+
+    def _easyocr_sheets(self, image: ImageSource, regions: list, fast: Union [dict , None] = None) -> list:
+        """ocr_sheets from an EasyOCR page layout; a single sheet is merged with the Tesseract fields (cascade)."""
+        if len(regions) > 1:
+            return self._region_sheets(image, regions, "easyocr")
+        fields = layout.extract_fields(regions[0].boxes)
+        if fast is not None:
+            fields = self._merge_fields(fast, fields)
+        return [(fields, "easyocr", image)]
+
+    def _region_sheets(self, image: ImageSource, regions: list, engine: str) -> list:
+        """
+        Several timesheets on one page, each resolved from the shared page layout. A region the
+        cascade cannot resolve is re-read with EasyOCR on its crop only. Through the OCR server
+        the regions run in threads, so those crop requests are batched together; local engines
+        serialize every call anyway, so without the server the regions simply run one by one.
+        """
+        metrics.count("multi_sheet_pages")
+        metrics.count("sheets_segmented", len(regions))
+        array = image.array  # Decoded once, before the regions crop it
+        if self.server is None:
+            return [self._region_fields(array, region, engine) for region in regions]
+        with ThreadPoolExecutor(max_workers=min(SHEET_WORKERS, len(regions))) as executor:
+            return list(executor.map(lambda region: self._region_fields(array, region, engine), regions))
+
+    def _region_fields(self, array: Union [np.ndarray , None], region: SheetRegion, engine: str) -> tuple:
+        crop = None
+        if array is not None:
+            x0, y0, x1, y1 = region.rect
+            crop = ImageSource(array=np.ascontiguousarray(array[y0:y1, x0:x1]))
+        try:
+            fields = layout.extract_fields(region.boxes)
+            if engine != "tesseract":
+                return fields, engine, crop
+            if not self._needs_escalation(fields):
+                metrics.count("cascade_resolved")
+                return fields, engine, crop
+            metrics.count("cascade_escalations")
+            if crop is not None:
+                fields = self._merge_fields(fields, layout.extract_fields(self.read_boxes(crop)))
+            return fields, "easyocr", crop
         except Exception as e:
-            logging.error(f"Error extracting sum timer from {image_path}: {e}")
-            return "⚠️ Could not extract hours"
+            logging.error(f"Error extracting fields: {e}")
+            return {field.key: None for field in layout.DEFAULT_FIELDS}, engine, crop
+
+    def _fields_to_values(self, fields: dict, image) -> tuple:
+        """
+        (name, period, hours) from layout fields. Only when the layout has no name
+        does the full-page Tesseract pass run, as a fallback.
+        """
+        if fields["name"] is not None:
+            extracted_name = fields["name"].value
+        elif image is not None and not self.cascade:
+            extracted_name = self.extract_name(image)
+        else:
+            extracted_name = "Ukjent"
+        period = fields["period"].value if fields["period"] is not None else None
+        reported_hours = (fields["sum_hours"].value if fields["sum_hours"] is not None
+                          else "⚠️ Could not extract hours")
+        return extracted_name, period, reported_hours
 
     def get_best_match(self, name: str) -> Union [str , None]:
         """
-        Finds best fuzzy match for a given name in self.df["Name"].
+        Finds best fuzzy match for a given name in self.df["Name"]
+        (same result as difflib.get_close_matches at FUZZY_THRESHOLD, see NameIndex).
         """
-        normalized = name.lower().strip()
-        csv_names = self.df["Name"].tolist()
-        matches = get_close_matches(normalized, csv_names, n=1, cutoff=FUZZY_THRESHOLD)
-        return matches[0] if matches else None
+        with metrics.span("validation.name_match"):
+            return self.name_index.best_match(name)
 
     def get_agreed_hours(self, matched_name: str) -> Union [float , None]:
         """
-        Return total agreed hours = (agreed + extra - given away).
+        Return total agreed hours = (agreed + extra - given away), precomputed at load time.
         """
-        row = self.df[self.df["Name"] == matched_name]
-        if row.empty:
-            return None
-        agreed_hours = float(row["agreed hours"].values[0])
-        extra_hours = float(row["extra hours"].values[0])
-        given_away = float(row["hours given away"].values[0])
-        return agreed_hours + extra_hours - given_away
+        return self.agreed_totals.get(matched_name)
 
-    def process_image(self, image_path: str):
+    def process_image(self, image_path: str, report: bool = True) -> dict:
         """
-        Main routine to:
-         1) Extract employee name
-         2) Extract reported hours
-         3) Compare to CSV
-         4) Print an approval result
+        The first timesheet of one file, for callers that know it holds a single sheet;
+        see process_sheets for scans with several.
+        :returns: Dict with the extracted fields, match, agreed hours and status.
         """
-        extracted_name = self.extract_name(image_path)
-        reported_hours = self.extract_sum_timer(image_path)
+        return self.process_sheets(image_path, report=report)[0]
 
+    def process_sheets(self, image_path: str, report: bool = True) -> list:
+        """
+        Main routine to:
+         1) Extract employee name, date period and reported hours of every timesheet on
+            the page, from one OCR layout split into per-sheet regions (see ocr_sheets)
+         2) Compare each to the CSV
+         3) Print an approval result per timesheet
+        The file is read once and only decoded on an OCR cache miss. Tesseract
+        only runs (on the same array) if the layout has no name.
+        :param report: Log the verdicts right away (set False when the caller reports in order).
+        :returns: One result dict per timesheet (at least one). With several, their "file"
+                  is numbered in reading order: scan.jpg#1, scan.jpg#2, ...
+        """
+        with metrics.hot_path(), metrics.span("timesheet"):
+            if image_path.lower().endswith(PDF_EXTENSIONS):
+                return self.process_pdf(image_path, report=report)
+            image = ImageSource.from_path(image_path, self.preprocessing)
+            sheets = [(*self._fields_to_values(fields, sheet_image), engine)
+                      for fields, engine, sheet_image in self.ocr_sheets(image)]
+            return self._validate_sheets(image_path, sheets, report)
+
+    def _validate_sheets(self, image_path: str, sheets: list, report: bool) -> list:
+        """validate() for [(name, period, hours, engine)] of one file, numbering the sheets when there are several."""
+        results = []
+        for number, (extracted_name, period, reported_hours, engine) in enumerate(sheets, 1):
+            label = image_path if len(sheets) == 1 else f"{image_path}#{number}"
+            results.append(self.validate(label, extracted_name, reported_hours, report=report, period=period,
+                                         engine=engine))
+        return results
+
+    def process_pdf(self, pdf_path: str, report: bool = True) -> list:
+        """
+        PDF timesheets, every page:
+         1) Text-layer fast path: the page's text boxes are split into timesheets; if each
+            has its name and "Sum timer til utbetaling" as text, no OCR runs.
+         2) Otherwise the page is rasterized at PDF_DPI and sent through the OCR path.
+        A page whose first sheet has no name of its own while the previous sheet still lacks
+        its hours continues that sheet, so a timesheet spanning two pages stays one.
+        :returns: One result dict per timesheet, as in process_sheets.
+        """
+        sheets = []  # [name, period, hours, engine]
+        if pdf_extraction.pdf_support_available():
+            try:
+                for page_no, page in enumerate(pdf_extraction.iter_pages(pdf_path), 1):
+                    for sheet in self._pdf_page_sheets(pdf_path, page_no, page):
+                        name, period, hours, engine = sheet
+                        previous = sheets[-1] if sheets else None
+                        if previous is not None and name == "Ukjent" and not isinstance(previous[2], float):
+                            previous[1] = previous[1] or period
+                            previous[2] = hours
+                            if engine != "text-layer":
+                                previous[3] = engine
+                        elif name != "Ukjent" or isinstance(hours, float):
+                            sheets.append(sheet)
+            except Exception as e:
+                logging.error(f"Error reading PDF {pdf_path}: {e}")
+        if not sheets:
+            sheets = [["Ukjent", None, "⚠️ Could not extract hours", "text-layer"]]
+        return self._validate_sheets(pdf_path, sheets, report)
+
+    def _pdf_page_sheets(self, pdf_path: str, page_no: int, page) -> list:
+        """[name, period, hours, engine] per timesheet on one PDF page, text layer first."""
+        regions = segmentation.split_sheets(pdf_extraction.page_boxes(page))
+        sheets = []
+        for region in regions:
+            fields = layout.extract_fields(region.boxes)
+            name, period, hours = self._fields_to_values(fields, None)
+            if name == "Ukjent" and fields["name"] is None and len(regions) == 1:
+                name = parse_name(pdf_extraction.page_text(page))
+            sheets.append([name, period, hours, "text-layer"])
+        if all(name != "Ukjent" and isinstance(hours, float) for name, _, hours, _ in sheets):
+            return sheets
+
+        logging.info(f"No usable text layer on page {page_no}, running OCR...")
+        image = ImageSource(array=pdf_extraction.render_page(page), name=f"{pdf_path}#{page_no}",
+                            preprocessing=self.preprocessing)
+        ocr = [[*self._fields_to_values(fields, sheet_image), engine]
+               for fields, engine, sheet_image in self.ocr_sheets(image)]
+        image.release()
+        if len(ocr) != len(sheets):
+            return ocr
+        # Same sheets found both ways: text-layer values win, OCR fills what the text layer lacks
+        for text, scanned in zip(sheets, ocr):
+            if text[0] == "Ukjent":
+                text[0] = scanned[0]
+            text[1] = text[1] or scanned[1]
+            if not isinstance(text[2], float):
+                text[2] = scanned[2]
+            text[3] = scanned[3]
+        return sheets
+
+    def process_images(self, image_paths: list, batch_size: int = 8, report: bool = True) -> list:
+        """
+        Batch variant of process_sheets: EasyOCR runs over batch_size images at a time
+        (see read_boxes_batched), then every timesheet on each image goes through the usual validation.
+        :returns: One list of result dicts (see process_sheets) per path, in input order.
+        """
+        results = {}
+        # PDFs mostly skip OCR (text layer), so they do not take part in image batches
+        for path in image_paths:
+            if path.lower().endswith(PDF_EXTENSIONS):
+                results[path] = self.process_pdf(path, report=report)
+        batch_paths = [path for path in image_paths if path not in results]
+        for start in range(0, len(batch_paths), batch_size):
+            chunk = batch_paths[start:start + batch_size]
+            sources = [ImageSource.from_path(path, self.preprocessing) for path in chunk]
+            # Cascade: only the images Tesseract could not resolve go into the EasyOCR batch
+            sheets = {}
+            escalate = []  # (index, Tesseract fields or None)
+            for i, source in enumerate(sources):
+                resolved, fast = self._tesseract_sheets(source)
+                if resolved is not None:
+                    sheets[i] = resolved
+                else:
+                    escalate.append((i, fast))
+            escalated_sources = [sources[i] for i, _ in escalate]
+            # Region crops differ in size per image, so with templates the pages are read one at a time
+            batch_boxes = [None] * len(escalated_sources)
+            if self.templates is None:
+                try:
+                    batch_boxes = self.read_boxes_batched(escalated_sources, batch_size=batch_size)
+                except Exception as e:
+                    logging.error(f"Batched OCR failed, falling back to one image at a time: {e}")
+            page_regions = [self._easyocr_regions(source, boxes)
+                            for source, boxes in zip(escalated_sources, batch_boxes)]
+            for (i, fast), regions in zip(escalate, page_regions):
+                try:
+                    sheets[i] = self._easyocr_sheets(sources[i], regions, fast)
+                except Exception as e:
+                    logging.error(f"Error extracting fields: {e}")
+                    sheets[i] = [({field.key: None for field in layout.DEFAULT_FIELDS}, "easyocr", sources[i])]
+
+            for i, (image_path, source) in enumerate(zip(chunk, sources)):
+                logging.info(f"Processing: {image_path}")
+                values = [(*self._fields_to_values(fields, sheet_image), engine)
+                          for fields, engine, sheet_image in sheets[i]]
+                results[image_path] = self._validate_sheets(image_path, values, report)
+                # Release the decoded pixels; the next chunk should not pile up on top of this one
+                source.release()
+        return [results[path] for path in image_paths]
+
+    def validate(self, image_path: str, extracted_name: str, reported_hours: Union [float , str],
+                 report: bool = True, period: Union [str , None] = None, engine: str = "easyocr") -> dict:
+        """
+        Compares the extracted name/hours with the CSV and builds the result dict.
+        """
+        with metrics.span("validation"):
+            result = self._validate(image_path, extracted_name, reported_hours, period, engine)
+        if report:
+            log_result(result)
+        return result
+
+    def _validate(self, image_path: str, extracted_name: str, reported_hours: Union [float , str],
+                  period: Union [str , None], engine: str) -> dict:
         # Attempt to match the extracted name in our CSV
         matched_name = self.get_best_match(extracted_name)
         if matched_name:
@@ -195,45 +765,389 @@ class TimesheetProcessor:
         else:
             status = "❌ Ikke godkjent (Kunne ikke hente timer eller avtalt tid)"
 
-        # Log final
-        logging.info("\n--- TIMELISTE GODKJENNING ---")
-        logging.info(f"📂 File: {os.path.basename(image_path)}")
-        logging.info(f"👤 Name: {extracted_name} (Matched: {matched_name})")
-        logging.info("📅 Date: Extracted from image")
-        logging.info(f"⏳ Reported Hours: {reported_hours}")
-        logging.info(f"📋 Agreed Hours: {agreed_hours if agreed_hours is not None else '⚠️ Not found'}")
-        logging.info(f"📌 Status: {status}")
-        logging.info("----------------------------\n")
+        result = {
+            "file": os.path.basename(image_path),
+            "name": extracted_name,
+            "period": period,
+            "matched_name": matched_name,
+            "reported_hours": reported_hours,
+            "agreed_hours": agreed_hours,
+            "status": status,
+            "engine": engine,
+        }
+        return result
+
+
+def log_engine_stats(results: list):
+    """
+    Logs how many timesheets each engine resolved (cascade hit rates).
+    """
+    if not results:
+        return
+    counts = {}
+    for result in results:
+        counts[result.get("engine", "easyocr")] = counts.get(result.get("engine", "easyocr"), 0) + 1
+    summary = ", ".join(f"{engine}: {n} ({100.0 * n / len(results):.0f}%)" for engine, n in sorted(counts.items()))
+    logging.info(f"🔎 OCR engines used: {summary}")
+
+
+def log_result(result: dict):
+    """
+    Logs the verdict for one timesheet in the standard terminal format.
+    """
+    agreed_hours = result["agreed_hours"]
+    logging.info("\n--- TIMELISTE GODKJENNING ---")
+    logging.info(f"📂 File: {result['file']}")
+    logging.info(f"👤 Name: {result['name']} (Matched: {result['matched_name']})")
+    logging.info(f"📅 Date: {result.get('period') or '⚠️ Not found'}")
+    logging.info(f"⏳ Reported Hours: {result['reported_hours']}")
+    logging.info(f"📋 Agreed Hours: {agreed_hours if agreed_hours is not None else '⚠️ Not found'}")
+    logging.info(f"📌 Status: {result['status']}")
+    logging.info("----------------------------\n")
+
+
+# One TimesheetProcessor (and thus one easyocr.Reader) per pool worker
+_worker_processor = None
+
+
+def _init_worker(reference_csv: str, torch_threads: int, use_cache: bool, cascade: bool = False,
+                 use_templates: bool = False):
+    """
+    Process-pool initializer: builds this worker's processor once and, when it runs OCR
+    locally, caps torch's intra-op threads so the workers do not oversubscribe the cores.
+    With an OCR server the worker never loads torch.
+    """
+    global _worker_processor
+    metrics.configure_worker()
+    cache = OCRCache() if use_cache else None
+    templates = LayoutTemplates() if use_templates else None
+    _worker_processor = TimesheetProcessor(csv_path=reference_csv, gpu=False, cache=cache, cascade=cascade,
+                                           templates=templates)
+    if _worker_processor.server is None:
+        autotune.set_torch_threads(torch_threads)
+
+
+def _process_in_worker(image_path: str) -> tuple:
+    """:returns: (result dicts of the file's timesheets, this task's metrics for the parent to merge)."""
+    result = _worker_processor.process_sheets(image_path, report=False)
+    metrics.dump_profile()
+    return result, metrics.drain()
+
 
+def _process_batch_in_worker(image_paths: list) -> tuple:
+    with metrics.hot_path():
+        results = _worker_processor.process_images(image_paths, batch_size=len(image_paths), report=False)
+    metrics.dump_profile()
+    return results, metrics.drain()
 
-def verify_payroll(reference_csv: str = None, image_folder: str = None):
+
+def _collect(output: tuple):
+    """Unpacks a worker's (result, metrics) and merges the metrics into this process."""
+    result, worker_metrics = output
+    metrics.merge(worker_metrics)
+    return result
+
+
+def default_paths():
+    """(reference CSV, image folder) used when the caller does not pass any."""
     script_dir = os.path.dirname(os.path.abspath(__file__))
+    return (os.path.join(script_dir, "..", "reference_data", "mars.csv"),
+            os.path.join(script_dir, "..", "raw_pictures"))
+
 
+def list_images(image_folder: str) -> list:
+    """
+    Full paths of the supported timesheets (images and PDFs) in image_folder, in file-name order.
+    For an attachment store (see ingestion/attachment_store.py) these come from its index,
+    one per unique document, plus any file dropped into the folder by hand.
+    """
+    image_files = sorted(f for f in os.listdir(image_folder) if f.lower().endswith(SUPPORTED_EXTENSIONS))
+    loose = [os.path.join(image_folder, filename) for filename in image_files]
+    if not attachment_store.is_store(image_folder):
+        return loose
+    stored = attachment_store.AttachmentStore(image_folder).paths(SUPPORTED_EXTENSIONS)
+    return sorted(stored + loose, key=lambda p: (os.path.basename(p).lower(), p))
+
+
+def verdict_settings(cascade: bool, use_templates: bool) -> dict:
+    """Everything besides the reference CSV that can change a verdict; hashed into the run fingerprint."""
+    return {
+        "tolerance": TOLERANCE,
+        "fuzzy_threshold": FUZZY_THRESHOLD,
+        "cascade": cascade,
+        "cascade_min_confidence": CASCADE_MIN_CONFIDENCE if cascade else None,
+        "templates": use_templates,
+        "langs": LANGS,
+        "tesseract": [TESSERACT_LANG, TESSERACT_CONFIG],
+        "preprocessing": PREPROCESSING.key() if PREPROCESSING is not None else None,
+    }
+
+
+def verify_payroll(reference_csv: str = None, image_folder: str = None, workers: int = None,
+                   use_cache: bool = True, batch_size: int = None, cascade: bool = False,
+                   use_templates: bool = False, resume: bool = False, output: str = RESULTS_PATH,
+                   torch_threads: int = None):
+    """
+    Verifies every timesheet (image or PDF) in image_folder against reference_csv.
+    Every verdict is appended to the run journal (see run_journal.py) as soon as it is known.
+    :param workers: Number of OCR processes. 1 runs serially in this process.
+    :param batch_size: Images per batched EasyOCR call (see process_images). 1 disables batching.
+    :param torch_threads: torch intra-op threads per OCR process (default: cores / workers).
+                          workers, batch_size and torch_threads left as None come from this host's
+                          tuning (run_prove.py tune, see autotune.py), else 1 / 1 / cores per worker.
+    :param use_cache: Reuse OCR output of previously processed images (see ocr_cache.py).
+    :param cascade: Tesseract first, EasyOCR only for low-confidence sheets (see TimesheetProcessor).
+    :param use_templates: OCR only the learned field regions of known layouts (see layout_templates.py).
+    :param resume: Skip timesheets the journal already has a verdict for (same file, CSV and
+                   verdict_settings), so a restarted run only does the remaining work.
+    :param output: Write all results at the end as CSV (or Parquet for *.parquet); None to skip.
+    :returns: List of result dicts (see process_sheets), one per timesheet, in file-name order.
+    """
     if reference_csv is None:
-        reference_csv = os.path.join(script_dir, "..", "reference_data", "mars.csv")
+        reference_csv = default_paths()[0]
     if image_folder is None:
-        image_folder = os.path.join(script_dir, "..", "raw_pictures")
+        image_folder = default_paths()[1]
 
+    if not os.path.isdir(image_folder):
+        logging.error(f"Image folder not found: {image_folder}")
+        return []
+
+    image_paths = list_images(image_folder)
+
+    if not image_paths:
+        logging.warning("No image or PDF files found.")
+        return []
+
+    if not os.path.exists(reference_csv):
+        logging.error(f"Failed to initialize TimesheetProcessor: CSV not found at {reference_csv}")
+        return []
+
+    workers, batch_size, torch_threads = autotune.apply_tuning(workers, batch_size, torch_threads)
+    fingerprint = run_fingerprint(reference_csv, verdict_settings(cascade, use_templates))
+    with RunJournal(fingerprint, resume=resume) as journal:
+        pending = [path for path in image_paths if not journal.is_done(path)]
+        if len(pending) < len(image_paths):
+            logging.info(f"⏩ Resuming: {len(image_paths) - len(pending)} of {len(image_paths)} "
+                         f"timesheet(s) already verified, {len(pending)} left")
+        if workers > 1 and pending:
+            _verify_parallel(reference_csv, pending, workers, use_cache, batch_size, cascade, use_templates,
+                             journal=journal, torch_threads=torch_threads)
+        elif pending:
+            _verify_serial(reference_csv, pending, use_cache, batch_size, cascade, use_templates, journal,
+                           torch_threads)
+        results = journal.results(image_paths)
+
+    if output and results:
+        output = write_results(results, output)
+        logging.info(f"📄 {len(results)} result(s) written to {output}")
+    log_engine_stats(results)
+    return results
+
+
+def _verify_serial(reference_csv: str, image_paths: list, use_cache: bool, batch_size: int,
+                   cascade: bool, use_templates: bool, journal: RunJournal, torch_threads: int = None):
+    if torch_threads is not None:
+        autotune.set_torch_threads(torch_threads)
     try:
-        processor = TimesheetProcessor(csv_path=reference_csv, gpu=False)
+        cache = OCRCache() if use_cache else None
+        templates = LayoutTemplates() if use_templates else None
+        processor = TimesheetProcessor(csv_path=reference_csv, gpu=False, cache=cache, cascade=cascade,
+                                       templates=templates)
     except Exception as e:
         logging.error(f"Failed to initialize TimesheetProcessor: {e}")
         return
 
-    if not os.path.isdir(image_folder):
-        logging.error(f"Image folder not found: {image_folder}")
-        return
+    if batch_size > 1:
+        # One chunk at a time, so every finished chunk is journaled before the next one starts
+        for start in range(0, len(image_paths), batch_size):
+            chunk = image_paths[start:start + batch_size]
+            with metrics.hot_path():
+                chunk_results = processor.process_images(chunk, batch_size=batch_size)
+            for image_path, sheet_results in zip(chunk, chunk_results):
+                journal.record(image_path, sheet_results)
+    else:
+        for image_path in image_paths:
+            logging.info(f"Processing: {image_path}")
+            journal.record(image_path, processor.process_sheets(image_path))
+    if cache is not None:
+        logging.info(f"OCR cache: {cache.hits} hit(s), {cache.misses} miss(es)")
+    if templates is not None:
+        logging.info(f"Layout templates: {templates.hits} region hit(s), {templates.fallbacks} full-page fallback(s)")
+
+
+def _verify_parallel(reference_csv: str, image_paths: list, workers: int, use_cache: bool,
+                     batch_size: int = 1, cascade: bool = False, use_templates: bool = False,
+                     journal: RunJournal = None, torch_threads: int = None) -> list:
+    """
+    Spreads the images over a pool of worker processes. executor.map keeps
+    the input order, so results are reported deterministically.
+    :param journal: Records every result as it arrives (in the parent; workers never write it).
+    """
+    if not os.path.exists(reference_csv):
+        logging.error(f"Failed to initialize TimesheetProcessor: CSV not found at {reference_csv}")
+        return []
+
+    workers = min(workers, len(image_paths))
+    torch_threads = torch_threads or max(1, (os.cpu_count() or 1) // workers)
+    logging.info(f"Processing {len(image_paths)} image(s) with {workers} workers "
+                 f"({torch_threads} torch thread(s) each)...")
+
+    # spawn: torch's thread pools are not fork-safe
+    context = multiprocessing.get_context("spawn")
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker,
+                             initargs=(reference_csv, torch_threads, use_cache, cascade, use_templates)) as executor:
+        if batch_size > 1:
+            chunks = [image_paths[i:i + batch_size] for i in range(0, len(image_paths), batch_size)]
+            outputs = (result for output in executor.map(_process_batch_in_worker, chunks)
+                       for result in _collect(output))
+        else:
+            outputs = (_collect(output) for output in executor.map(_process_in_worker, image_paths))
+        for image_path, sheet_results in zip(image_paths, outputs):
+            for result in sheet_results:
+                log_result(result)
+            if journal is not None:
+                journal.record(image_path, sheet_results)
+            results.extend(sheet_results)
+    return results
+
+
+def verify_stream(image_paths: Iterable[str], reference_csv: str = None, workers: int = None,
+                  use_cache: bool = True, cascade: bool = False, use_templates: bool = False,
+                  resume: bool = False, output: str = RESULTS_PATH, torch_threads: int = None,
+                  keep_results: bool = True) -> list:
+    """
+    Streaming variant of verify_payroll: consumes image paths as they arrive
+    (e.g. from a queue fed by the downloader) instead of listing a folder.
+    At most 2 * workers images are in flight, so a slow consumer pushes back
+    on the iterable. Every verdict is reported and journaled as soon as its file is
+    done, even while the iterable waits for more (resume / output / tuned workers work
+    as in verify_payroll).
+    :param keep_results: False for an iterable that never ends (watch mode): each file's results are
+                         appended to output (CSV, see append_results) as they arrive instead of being
+                         collected for one write at the end, and nothing is returned.
+    :returns: List of result dicts, in arrival order.
+    """
+    if reference_csv is None:
+        reference_csv = default_paths()[0]
+    if not os.path.exists(reference_csv):
+        logging.error(f"Failed to initialize TimesheetProcessor: CSV not found at {reference_csv}")
+        return []
+
+    workers, _, torch_threads = autotune.apply_tuning(workers, 1, torch_threads)
+    fingerprint = run_fingerprint(reference_csv, verdict_settings(cascade, use_templates))
+    with RunJournal(fingerprint, resume=resume, keep_results=keep_results) as journal:
+        results = _verify_stream(image_paths, reference_csv, workers, use_cache, cascade, use_templates, journal,
+                                 torch_threads, None if keep_results else output)
+    if output and results:
+        output = write_results(results, output)
+        logging.info(f"📄 {len(results)} result(s) written to {output}")
+    log_engine_stats(results)
+    return results
+
+
+def _verify_stream(image_paths: Iterable[str], reference_csv: str, workers: int, use_cache: bool,
+                   cascade: bool, use_templates: bool, journal: RunJournal, torch_threads: int = None,
+                   append_to: str = None) -> list:
+    """:param append_to: Append each file's results to this CSV right away (see verify_stream's keep_results)."""
+    arrived = []  # Every path in arrival order; the results are read back from the journal at the end
+    skipped = 0
+
+    def pending(paths):
+        # Already-journaled sheets are answered from the journal without touching the OCR path
+        nonlocal skipped
+        for path in paths:
+            if journal.keep_results:
+                arrived.append(path)
+            if journal.is_done(path):
+                skipped += 1
+            else:
+                yield path
 
-    image_files = [f for f in os.listdir(image_folder) if f.lower().endswith(('.png', '.jpg', '.jpeg'))]
+    def finish(image_path, sheet_results):
+        stored = journal.record(image_path, sheet_results)
+        if append_to:
+            append_results(stored, append_to)
 
-    if not image_files:
-        logging.warning("No image files found.")
-        return
+    if workers <= 1:
+        if torch_threads is not None:
+            autotune.set_torch_threads(torch_threads)
+        try:
+            cache = OCRCache() if use_cache else None
+            templates = LayoutTemplates() if use_templates else None
+            processor = TimesheetProcessor(csv_path=reference_csv, gpu=False, cache=cache, cascade=cascade,
+                                           templates=templates)
+        except Exception as e:
+            logging.error(f"Failed to initialize TimesheetProcessor: {e}")
+            return []
+        for image_path in pending(image_paths):
+            logging.info(f"Processing: {image_path}")
+            finish(image_path, processor.process_sheets(image_path))
+    else:
+        torch_threads = torch_threads or max(1, (os.cpu_count() or 1) // workers)
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_worker,
+                                 initargs=(reference_csv, torch_threads, use_cache, cascade, use_templates)) as executor:
+            for image_path, sheet_results in _as_completed_stream(executor, pending(image_paths), 2 * workers):
+                for result in sheet_results:
+                    log_result(result)
+                finish(image_path, sheet_results)
+    if skipped:
+        logging.info(f"⏩ Resumed: {skipped} timesheet(s) were already verified")
+    return journal.results(arrived)
+
+
+def _as_completed_stream(executor: ProcessPoolExecutor, image_paths: Iterable[str], limit: int):
+    """
+    Submits image_paths to the pool as they arrive and yields (path, sheet results) as soon as
+    each file is done, also while the iterable is still waiting for its next path (a watched
+    mailbox can be quiet for hours). The iterable is read in a thread that only takes the next
+    path while fewer than limit files are in flight, so a slow pool still pushes back on it.
+    """
+    events = queue.Queue()  # ("path", path) | ("done", future) | ("error", exception) | ("end", None)
+    slots = threading.Semaphore(limit)
+    stop = threading.Event()
 
-    for filename in image_files:
-        image_path = os.path.join(image_folder, filename)
-        logging.info(f"Processing: {image_path}")
-        processor.process_image(image_path)
+    def read_input():
+        try:
+            paths = iter(image_paths)
+            while True:
+                while not slots.acquire(timeout=0.5):
+                    if stop.is_set():
+                        return
+                try:
+                    path = next(paths)
+                except StopIteration:
+                    break
+                events.put(("path", path))
+        except Exception as e:
+            events.put(("error", e))
+        finally:
+            events.put(("end", None))
+
+    reader = threading.Thread(target=read_input, name="verify-input", daemon=True)
+    reader.start()
+    in_flight = {}
+    ended = False
+    try:
+        while not ended or in_flight:
+            kind, item = events.get()
+            if kind == "path":
+                future = executor.submit(_process_in_worker, item)
+                in_flight[future] = item
+                future.add_done_callback(lambda done: events.put(("done", done)))
+            elif kind == "done":
+                image_path = in_flight.pop(item)
+                slots.release()
+                yield image_path, _collect(item.result())
+            elif kind == "error":
+                raise item
+            else:
+                ended = True
+    finally:
+        stop.set()
 
 
 def main():
@@ -0,0 +1,60 @@
+import os
+import sys
+import logging
+import importlib.util
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from processing import layout
+
+# PyMuPDF is optional (images work without it) and imported where first used, like the OCR
+# engines: runs without PDFs, and the workers of a pool, never pay for importing it.
+
+PDF_DPI = 200  # Resolution for rasterizing image-only pages (and the unit of text-layer boxes)
+PDF_POINTS_PER_INCH = 72.0
+
+logger = logging.getLogger(__name__)
+
+
+def pdf_support_available() -> bool:
+    if importlib.util.find_spec("pymupdf") is None:
+        logger.error("PyMuPDF is not installed (pip install pymupdf); PDF timesheets are skipped.")
+        return False
+    return True
+
+
+def iter_pages(pdf_path: str):
+    """
+    Yields the pages of a PDF one at a time; nothing is rendered up front.
+    """
+    import pymupdf
+
+    with pymupdf.open(pdf_path) as doc:
+        for page in doc:
+            yield page
+
+
+def page_text(page) -> str:
+    """Embedded text layer of a page ('' for scanned, image-only pages)."""
+    return page.get_text("text")
+
+
+def page_boxes(page, dpi: int = PDF_DPI) -> list:
+    """
+    Phrase boxes from the text layer, in the same (bbox, text, confidence) format as
+    EasyOCR, scaled to pixels at dpi so the layout engine's row threshold means the
+    same thing as on a rasterized page (see layout.merge_word_runs).
+    """
+    scale = dpi / PDF_POINTS_PER_INCH
+    words = [
+        (x0 * scale, y0 * scale, x1 * scale, y1 * scale, word, 1.0, (block, line))
+        for (x0, y0, x1, y1, word, block, line, _) in page.get_text("words")
+    ]
+    return layout.merge_word_runs(words)
+
+
+def render_page(page, dpi: int = PDF_DPI) -> np.ndarray:
+    """Rasterizes one page into an RGB array for the OCR path."""
+    import pymupdf
+
+    pix = page.get_pixmap(dpi=dpi, colorspace=pymupdf.csRGB, alpha=False)
+    return np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, 3).copy()
@@ -0,0 +1,135 @@
+import io
+import logging
+import numpy as np
+from typing import NamedTuple, Union
+
+logger = logging.getLogger(__name__)
+
+# cv2 and PIL (installed with EasyOCR) are imported where first used: PreprocessSettings is read at
+# import time by payroll_verification, and a run that only hits the OCR cache never decodes an image.
+
+
+class PreprocessSettings(NamedTuple):
+    """
+    Image normalization applied before both OCR engines. Every field changes the OCR
+    output, so the whole tuple is part of the OCR cache key (see TimesheetProcessor).
+    """
+    target_height: int = 2339  # Downscale taller images to this height (A4 at 200 DPI, like PDF_DPI); 0 = keep
+    draft: bool = True         # Let libjpeg decode JPEGs at a reduced scale (1/2, 1/4, 1/8) close to the target
+    grayscale: bool = True
+    deskew: bool = True
+    max_skew: float = 10.0     # Degrees; larger estimated angles are treated as noise and ignored
+    skew_scale: float = 0.4    # The angle is measured on a copy this size: same angle, ~1/6 of the Hough cost
+    binarize: bool = False     # Adaptive threshold; helps Tesseract on uneven lighting, can hurt EasyOCR
+    block_size: int = 31       # Adaptive threshold neighbourhood (odd, px)
+    offset: int = 15           # Adaptive threshold constant subtracted from the local mean
+
+    def key(self) -> dict:
+        return self._asdict()
+
+
+def _decode_jpeg_draft(data: bytes, settings: PreprocessSettings) -> Union [np.ndarray , None]:
+    """
+    Reduced-scale JPEG decoding: PIL's draft mode makes libjpeg skip DCT
+    coefficients, so a 4000x3000 photo is never materialized at full size.
+    Returns None for anything that is not a JPEG.
+    """
+    from PIL import Image, ImageOps
+
+    try:
+        image = Image.open(io.BytesIO(data))
+    except Exception:
+        return None
+    if image.format != 'JPEG':
+        return None
+    width, height = image.size
+    if settings.target_height and height > settings.target_height:
+        # draft() picks the largest scale that stays >= the requested size
+        image.draft('L' if settings.grayscale else 'RGB',
+                    (max(1, width * settings.target_height // height), settings.target_height))
+    image = ImageOps.exif_transpose(image)  # cv2.imdecode applies EXIF orientation as well
+    return np.asarray(image.convert('L' if settings.grayscale else 'RGB'))
+
+
+def decode(data: bytes, settings: Union [PreprocessSettings , None] = None) -> Union [np.ndarray , None]:
+    """
+    Decodes image bytes into an RGB (or, with grayscale, 2-D) array and applies the
+    rest of the pipeline. Returns None if the bytes cannot be decoded.
+    """
+    import cv2
+
+    array = None
+    if settings is not None and settings.draft:
+        array = _decode_jpeg_draft(data, settings)
+    if array is None:
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            return None
+        array = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    return apply(array, settings)
+
+
+def estimate_skew(gray: np.ndarray, max_skew: float, scale: float = 1.0) -> float:
+    """
+    Skew angle in degrees from near-horizontal line segments (table rules and text
+    baselines), as the median of their angles. 0.0 when there is nothing to measure.
+    :param scale: Measure on a copy downscaled by this factor; rotation does not depend on
+                  size, and the Hough transform's cost grows with the number of edge pixels.
+    """
+    import cv2
+
+    if 0 < scale < 1:
+        gray = cv2.resize(gray, (max(1, round(gray.shape[1] * scale)), max(1, round(gray.shape[0] * scale))),
+                          interpolation=cv2.INTER_AREA)
+    else:
+        scale = 1.0
+    edges = cv2.Canny(gray, 50, 150)
+    min_length = max(gray.shape[1] // 8, 20)
+    # Votes scale with segment length; the gap is kept, which also bridges the narrower word gaps
+    lines = cv2.HoughLinesP(edges, 1, np.pi / 1800, threshold=max(20, round(100 * scale)),
+                            minLineLength=min_length, maxLineGap=10)
+    if lines is None:
+        return 0.0
+    # (N, 1, 4) up to OpenCV 4, (N, 4) in OpenCV 5
+    x0, y0, x1, y1 = lines.reshape(-1, 4).T
+    angles = np.degrees(np.arctan2(y1 - y0, x1 - x0))
+    angles = angles[np.abs(angles) <= max_skew]
+    return float(np.median(angles)) if angles.size else 0.0
+
+
+def _rotate(array: np.ndarray, angle: float) -> np.ndarray:
+    import cv2
+
+    height, width = array.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2.0, height / 2.0), angle, 1.0)
+    return cv2.warpAffine(array, matrix, (width, height), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+
+
+def apply(array: np.ndarray, settings: Union [PreprocessSettings , None] = None) -> np.ndarray:
+    """
+    Resize -> grayscale -> deskew -> binarize, each step optional.
+    Resizing comes first so the remaining steps work on the small image.
+    """
+    if settings is None:
+        return array
+    import cv2
+
+    height, width = array.shape[:2]
+    if settings.target_height and height > settings.target_height:
+        scale = settings.target_height / height
+        array = cv2.resize(array, (max(1, round(width * scale)), settings.target_height), interpolation=cv2.INTER_AREA)
+
+    gray = array if array.ndim == 2 else cv2.cvtColor(array, cv2.COLOR_RGB2GRAY)
+    if settings.grayscale or settings.binarize:
+        array = gray
+
+    if settings.deskew:
+        angle = estimate_skew(gray, settings.max_skew, settings.skew_scale)
+        if abs(angle) >= 0.1:
+            logger.debug(f"Deskewing by {angle:.2f} degrees")
+            array = _rotate(array, angle)
+
+    if settings.binarize:
+        array = cv2.adaptiveThreshold(array, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY,
+                                      settings.block_size, settings.offset)
+    return np.ascontiguousarray(array)
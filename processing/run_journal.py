@@ -0,0 +1,218 @@
+import os
+import csv
+import json
+import hashlib
+import logging
+import tempfile
+from datetime import datetime
+
+# Append-only record of every verified timesheet, written as soon as its verdict is known,
+# so an interrupted run can be resumed (verify_payroll(resume=True)) without redoing OCR.
+RUN_JOURNAL_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), os.pardir, 'state', 'run_journal.jsonl')
+)
+RESULTS_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), os.pardir, 'state', 'results', 'verification.csv')
+)
+WATCH_RESULTS_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), os.pardir, 'state', 'results', 'watch.csv')
+)
+RESULT_COLUMNS = ("file", "path", "name", "period", "matched_name", "reported_hours",
+                  "agreed_hours", "status", "engine", "verified_at")
+ROTATE_BYTES = 64 << 20  # A new (non-resumed) run moves a journal this large to <path>.<n> and starts a fresh one
+
+logger = logging.getLogger(__name__)
+
+
+def file_key(path: str) -> str:
+    """Cheap identity of a file on disk: a replaced or edited timesheet gets a new key."""
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def run_fingerprint(reference_csv: str, settings: dict) -> str:
+    """
+    SHA-256 over the reference CSV and every setting that changes a verdict (e.g. TOLERANCE).
+    Journal entries written under a different fingerprint are not reused on resume.
+    """
+    digest = hashlib.sha256()
+    with open(reference_csv, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    digest.update(json.dumps(settings, sort_keys=True, default=str).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class RunJournal:
+    """
+    JSONL journal, one line per file: {"path", "key", "fingerprint", "results"}, with one
+    result per timesheet in the file (a multi-sheet scan has several).
+    Lines are flushed one by one, so a crash loses at most the line being written;
+    a truncated last line is ignored when the journal is read back.
+    The journal is only ever appended to: runs with different fingerprints, and processes
+    running at the same time (a watch and a manual verify), each add their own lines.
+    """
+
+    def __init__(self, fingerprint: str, path: str = RUN_JOURNAL_PATH, resume: bool = False,
+                 keep_results: bool = True):
+        """
+        :param fingerprint: run_fingerprint() of this run.
+        :param resume: Reuse the entries of earlier runs with this fingerprint. Without it every file is
+                       verified again; earlier entries stay in the journal for a later resume.
+        :param keep_results: False only remembers which files are done (is_done), not their results,
+                             so a long-running watch does not hold every verdict in memory.
+        """
+        self.path = path
+        self.fingerprint = fingerprint
+        self.keep_results = keep_results
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entries = self._load() if resume else {}
+        if not resume:
+            self._rotate()
+        self.done = {p: entry["results"] if keep_results else None for p, entry in entries.items()}
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def _rotate(self):
+        """
+        Keeps the journal file from growing forever: it becomes the next generation <path>.1, <path>.2, ...
+        Generations are never overwritten or deleted, and all of them are read on resume, so lines a
+        concurrent writer still appends to a rotated file are not lost either.
+        """
+        try:
+            if os.path.getsize(self.path) < ROTATE_BYTES:
+                return
+        except OSError:
+            return
+        generations = self._generations()
+        number = int(generations[-1].rsplit('.', 1)[1]) + 1 if generations else 1
+        while True:
+            target = f"{self.path}.{number}"
+            try:
+                os.link(self.path, target)  # Unlike a rename, fails instead of replacing an existing generation
+                break
+            except FileExistsError:
+                number += 1  # Another process rotated at the same moment
+            except OSError:
+                return  # Journal gone (rotated by another process) or no hard links: keep appending
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass  # Rotated by another process too; both generations are read, so nothing is lost
+        logger.info(f"Run journal rotated to {target}")
+
+    def _generations(self) -> list:
+        """Rotated journal files, oldest first."""
+        directory, name = os.path.split(self.path)
+        numbers = sorted(int(entry[len(name) + 1:]) for entry in os.listdir(directory)
+                         if entry.startswith(name + '.') and entry[len(name) + 1:].isdigit())
+        return [f"{self.path}.{number}" for number in numbers]
+
+    def _load(self) -> dict:
+        """{path: journal entry} of the entries that are still valid (same file, same fingerprint)."""
+        done = {}
+        for path in self._generations() + [self.path]:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                            if "results" not in entry or entry.get("fingerprint") != self.fingerprint:
+                                continue  # Other settings, or from before per-timesheet results: verified again
+                            done[entry["path"]] = entry
+                        except (ValueError, KeyError, TypeError, AttributeError):
+                            continue  # Partially written line of a killed run
+            except FileNotFoundError:
+                continue
+        valid = {}
+        for path, entry in done.items():
+            try:
+                current = file_key(path)
+            except OSError:
+                continue
+            if entry.get("key") == current:
+                valid[path] = entry
+        return valid
+
+    def is_done(self, path: str) -> bool:
+        return os.path.abspath(path) in self.done
+
+    def record(self, path: str, results: list) -> list:
+        """Appends the results of one file (plus path and timestamp) to the journal; returns the stored results."""
+        path = os.path.abspath(path)
+        verified_at = datetime.now().isoformat(timespec='seconds')
+        results = [dict(result, path=path, verified_at=verified_at) for result in results]
+        try:
+            key = file_key(path)
+        except OSError:
+            key = None
+        entry = {"path": path, "key": key, "fingerprint": self.fingerprint, "results": results}
+        self._file.write(json.dumps(entry, ensure_ascii=False, default=str) + '\n')
+        self._file.flush()
+        self.done[path] = results if self.keep_results else None
+        return results
+
+    def result(self, path: str) -> list:
+        """Journaled results of one file, one per timesheet (empty without keep_results)."""
+        return self.done[os.path.abspath(path)] or []
+
+    def results(self, paths: list) -> list:
+        """Journaled results of paths, flattened in the given order (paths without an entry are left out)."""
+        return [result for p in map(os.path.abspath, paths) if self.done.get(p) for result in self.done[p]]
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_results(results: list, path: str = RESULTS_PATH):
+    """
+    Writes all results at once as CSV, or as Parquet when path ends in .parquet
+    (needs pyarrow; falls back to CSV next to it). The file is replaced atomically.
+    """
+    import pandas as pd
+
+    frame = pd.DataFrame([{column: result.get(column) for column in RESULT_COLUMNS} for result in results],
+                         columns=list(RESULT_COLUMNS))
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    if path.endswith('.parquet'):
+        # "reported_hours" mixes floats with error messages; the status column already explains a missing value
+        frame["reported_hours"] = pd.to_numeric(frame["reported_hours"], errors='coerce')
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+        os.close(fd)
+        try:
+            frame.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+            return path
+        except ImportError as e:
+            logger.warning(f"Parquet output unavailable ({e}), writing CSV instead")
+            path = path[:-len('.parquet')] + '.csv'
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+        frame.to_csv(f, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def append_results(results: list, path: str = WATCH_RESULTS_PATH) -> str:
+    """
+    Appends results to a CSV (with the same columns as write_results; the header is written
+    when the file is new), so a long-running watch has every verdict on disk as soon as it is
+    known. Parquet cannot be appended to: a *.parquet path gets a CSV next to it.
+    """
+    if path.endswith('.parquet'):
+        path = path[:-len('.parquet')] + '.csv'
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'a', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_COLUMNS, extrasaction='ignore')
+        if f.tell() == 0:
+            writer.writeheader()
+        writer.writerows(results)
+    return path
@@ -0,0 +1,85 @@
+import os
+import sys
+import numpy as np
+from typing import NamedTuple
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from processing import layout
+
+# Bulk scans from the office copier put several timesheets on one page (2-up, 4-up).
+# Every "Navn" and "Sum timer til utbetaling" label is found in the page's single OCR layout,
+# and the page is cut into one region per timesheet around them, so each one is validated on its own.
+COLUMN_GAP = 200.0                     # Min horizontal distance (px) between the labels of side-by-side sheets
+REGION_MARGIN = layout.ROW_THRESHOLD   # px kept above a sheet's first label and below its sum row
+
+
+class SheetRegion(NamedTuple):
+    rect: tuple   # (x0, y0, x1, y1) page pixels; x1/y1 None = to the page edge. None = the whole page
+    boxes: list   # OCR boxes (EasyOCR format) whose centre lies in rect
+
+
+def _columns(left: np.ndarray, anchors: list, column_gap: float) -> list:
+    """Anchors grouped into side-by-side columns (left to right) by their left edge."""
+    columns = []
+    for idx in sorted(anchors, key=lambda i: left[i]):
+        if columns and left[idx] - left[columns[-1][-1]] <= column_gap:
+            columns[-1].append(idx)
+        else:
+            columns.append([idx])
+    return columns
+
+
+def split_sheets(ocr_results: list, column_gap: float = COLUMN_GAP, margin: float = REGION_MARGIN) -> list:
+    """
+    Splits one page layout into per-timesheet regions. The label that occurs most often
+    (name, else sum hours) anchors the sheets: anchors are grouped into columns, and within a
+    column a sheet ends just below the "Sum timer" row that precedes the next sheet's name
+    (or just above that name when there is none).
+    :returns: List of SheetRegion in reading order (row by row, left to right); a page with
+              at most one timesheet gives one region with rect None and all boxes.
+    """
+    names = layout.find_labels(ocr_results, layout.NAME_FIELD)
+    sums = layout.find_labels(ocr_results, layout.SUM_HOURS_FIELD)
+    by_name = len(names) >= len(sums)
+    anchors = names if by_name else sums
+    if len(anchors) <= 1:
+        return [SheetRegion(None, list(ocr_results))]
+
+    bboxes = np.asarray([bbox for (bbox, _, _) in ocr_results], dtype=float)  # (n, 4, 2)
+    cx = (bboxes[:, 0, 0] + bboxes[:, 2, 0]) / 2.0
+    cy = (bboxes[:, 0, 1] + bboxes[:, 2, 1]) / 2.0
+    left = bboxes[:, :, 0].min(axis=1)
+    top = bboxes[:, :, 1].min(axis=1)
+    bottom = bboxes[:, :, 1].max(axis=1)
+
+    columns = _columns(left, anchors, column_gap)
+    # Column c runs from just left of its labels to just left of the next column's labels
+    x_bounds = [0] + [max(0, int(left[column].min() - margin)) for column in columns[1:]] + [None]
+
+    regions = []  # (row in column, column, rect)
+    for col, column in enumerate(columns):
+        column.sort(key=lambda i: top[i])
+        x0, x1 = x_bounds[col], x_bounds[col + 1]
+        in_column = [i for i in sums if x0 <= cx[i] and (x1 is None or cx[i] < x1)]
+        y_bounds = [0]
+        for upper, lower in zip(column, column[1:]):
+            if by_name:
+                between = [bottom[i] for i in in_column if cy[upper] < cy[i] < top[lower]]
+                edge = max(between) + margin if between else top[lower] - margin
+            else:
+                edge = bottom[upper] + margin
+            y_bounds.append(int(min(max(edge, y_bounds[-1]), top[lower])))
+        y_bounds.append(None)
+        for row in range(len(column)):
+            regions.append((row, col, (x0, y_bounds[row], x1, y_bounds[row + 1])))
+
+    regions.sort(key=lambda region: region[:2])
+    sheets = []
+    for _, _, rect in regions:
+        x0, y0, x1, y1 = rect
+        inside = (cx >= x0) & (cy >= y0)
+        if x1 is not None:
+            inside &= cx < x1
+        if y1 is not None:
+            inside &= cy < y1
+        sheets.append(SheetRegion(rect, [ocr_results[i] for i in np.nonzero(inside)[0]]))
+    return sheets
@@ -0,0 +1,127 @@
+import logging
+import numpy as np
+import pytesseract
+from functools import lru_cache
+
+try:
+    import tesserocr  # In-process libtesseract bindings
+except ImportError:  # Optional; pytesseract (one tesseract process per call) is used without it
+    tesserocr = None
+
+logger = logging.getLogger(__name__)
+
+_fallback_reported = False  # The pytesseract fallback is reported once per process, not per engine
+
+
+class TesseractEngine:
+    """
+    Tesseract kept loaded for the whole run. With tesserocr, one TessBaseAPI holds the
+    traineddata in memory and images are handed over as pixel buffers, so a call costs
+    only the recognition itself. Without it, calls go through pytesseract, which starts
+    a tesseract process (and reloads the traineddata) for every image.
+    Not thread-safe: use one engine per process (each pool worker builds its own).
+    """
+
+    def __init__(self, lang: str = "eng", oem: int = 1, psm: int = 6):
+        self.lang = lang
+        self.oem = oem
+        self.psm = psm
+        self.config = f"--oem {oem} --psm {psm}"
+        self._api = None
+        if tesserocr is not None:
+            try:
+                self._api = tesserocr.PyTessBaseAPI(lang=lang, oem=oem, psm=psm)
+            except RuntimeError as e:
+                logger.warning(f"tesserocr could not load '{lang}', falling back to pytesseract: {e}")
+        self.backend = "tesserocr" if self._api is not None else "pytesseract"
+        if self._api is None:
+            _report_fallback()
+        self.version = _backend_version(self.backend)
+
+    def _set_image(self, array: np.ndarray):
+        array = np.ascontiguousarray(array)
+        height, width = array.shape[:2]
+        bytes_per_pixel = 1 if array.ndim == 2 else array.shape[2]
+        self._api.SetImageBytes(array.tobytes(), width, height, bytes_per_pixel, width * bytes_per_pixel)
+
+    def text(self, array: np.ndarray) -> str:
+        """Full-page text of an RGB or grayscale array."""
+        if self._api is None:
+            return pytesseract.image_to_string(array, lang=self.lang, config=self.config)
+        self._set_image(array)
+        return self._api.GetUTF8Text()
+
+    def words(self, array: np.ndarray) -> list:
+        """
+        Word boxes: list of [x0, y0, x1, y1, text, confidence 0-1, line key], where words
+        with the same line key were recognized on the same text line.
+        """
+        if self._api is None:
+            return self._words_pytesseract(array)
+        self._set_image(array)
+        self._api.Recognize()
+        words = []
+        block = par = line = 0
+        level = tesserocr.RIL.WORD
+        for result in tesserocr.iterate_level(self._api.GetIterator(), level):
+            if result.IsAtBeginningOf(tesserocr.RIL.BLOCK):
+                block += 1
+            if result.IsAtBeginningOf(tesserocr.RIL.PARA):
+                par += 1
+            if result.IsAtBeginningOf(tesserocr.RIL.TEXTLINE):
+                line += 1
+            text = (result.GetUTF8Text(level) or "").strip()
+            bbox = result.BoundingBox(level)
+            if not text or bbox is None:
+                continue
+            x0, y0, x1, y1 = bbox
+            words.append([x0, y0, x1, y1, text, result.Confidence(level) / 100.0, f"{block}.{par}.{line}"])
+        return words
+
+    def _words_pytesseract(self, array: np.ndarray) -> list:
+        data = pytesseract.image_to_data(array, lang=self.lang, config=self.config,
+                                         output_type=pytesseract.Output.DICT)
+        words = []
+        for i, text in enumerate(data["text"]):
+            conf = float(data["conf"][i])
+            if conf < 0 or not text.strip():
+                continue
+            x0, y0 = data["left"][i], data["top"][i]
+            words.append([x0, y0, x0 + data["width"][i], y0 + data["height"][i], text.strip(),
+                          conf / 100.0, f"{data['block_num'][i]}.{data['par_num'][i]}.{data['line_num'][i]}"])
+        return words
+
+    def close(self):
+        if self._api is not None:
+            self._api.End()
+            self._api = None
+
+
+@lru_cache(maxsize=None)
+def installed_version(lang: str = "eng") -> tuple:
+    """
+    (version, backend) that TesseractEngine(lang) will report, looked up without building an
+    engine (no traineddata is loaded), once per process. Used for OCR cache keys, so a run
+    whose Tesseract output is all cached never starts Tesseract.
+    """
+    if tesserocr is not None:
+        _, languages = tesserocr.get_languages()
+        if all(code in languages for code in lang.split('+')):
+            return _backend_version("tesserocr"), "tesserocr"
+    return _backend_version("pytesseract"), "pytesseract"
+
+
+def _backend_version(backend: str) -> str:
+    if backend == "tesserocr":
+        return tesserocr.tesseract_version().split()[1]
+    return str(pytesseract.get_tesseract_version())
+
+
+def _report_fallback():
+    global _fallback_reported
+    if _fallback_reported:
+        return
+    _fallback_reported = True
+    reason = "tesserocr is not installed" if tesserocr is None else "tesserocr could not be used"
+    logger.warning(f"{reason}: Tesseract runs through pytesseract, one tesseract process per image "
+                   f"(`pip install tesserocr` keeps it loaded in-process)")
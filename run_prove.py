@@ -1,22 +1,324 @@
 # python3 run_prove.py --start-date YYYY-MM-DD --end-date YYYY-MM-DD
+# python3 run_prove.py ingest --start-date YYYY-MM-DD --end-date YYYY-MM-DD
+# python3 run_prove.py serve                    (keeps the OCR models loaded for later runs)
+# python3 run_prove.py verify raw_pictures/x.jpg
+# python3 run_prove.py watch                    (verifies new timesheets as they are mailed)
+# python3 run_prove.py tune                     (measures the best OCR settings for this host)
 
-from ingestion.download_attachments import download_pics_main
-from processing.payroll_verification import verify_payroll
+import os
 import argparse
+import logging
+import queue
+import sys
+import threading
 
-def main():
-    parser = argparse.ArgumentParser(description="Run full PROVE pipeline.")
+# Only the standard library is imported up front: ingestion modules are loaded by the
+# subcommands that need them, and the OCR stack (processing.*, easyocr/torch, pandas)
+# only once verification starts, so --help, argument errors and `ingest` stay fast.
+
+COMMANDS = ("run", "ingest", "verify", "serve", "watch", "tune")
+DEFAULT_COMMAND = "run"  # `run_prove.py --start-date ...` without a subcommand
+
+STREAM_QUEUE_SIZE = 32  # Saved-but-not-yet-verified files before the downloader blocks
+_DONE = object()        # End-of-stream sentinel
+
+
+class StreamAborted(Exception):
+    """Raised in the downloader thread once verification has stopped consuming."""
+
+
+def _verify_while_ingesting(args, ingest, **verify_kwargs):
+    """
+    Overlaps ingestion and verification: ingest(on_saved, stop) runs in a thread and
+    puts every saved attachment on a bounded queue, while OCR/validation
+    consumes it right away. Files already on disk are queued first.
+    A full queue blocks the downloader (backpressure); if verification stops
+    early, the downloader is told to stop at its next save.
+    """
+    from ingestion.download_attachments import get_store
+    from processing.payroll_verification import SUPPORTED_EXTENSIONS, list_images, verify_stream
+
+    files = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+    stop = threading.Event()
+    errors = []
+
+    def enqueue(path):
+        while not stop.is_set():
+            try:
+                files.put(path, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+        raise StreamAborted("Verification stopped, aborting download.")
+
+    def on_saved(path):
+        if path.lower().endswith(SUPPORTED_EXTENSIONS):
+            enqueue(path)
+
+    def produce():
+        try:
+            # Opening the store first moves files of the old flat layout into it, so the paths
+            # listed here are the ones that stay on disk
+            for path in list_images(get_store().root):
+                enqueue(path)
+            ingest(on_saved, stop)
+        except StreamAborted:
+            pass
+        except Exception as e:
+            errors.append(e)
+        finally:
+            # Always terminate the stream, even on failure, so the consumer can finish
+            while True:
+                try:
+                    files.put(_DONE, timeout=0.5)
+                    break
+                except queue.Full:
+                    if stop.is_set():
+                        break
+
+    producer = threading.Thread(target=produce, name="prove-ingestion", daemon=True)
+    producer.start()
+    try:
+        verify_stream(iter(files.get, _DONE), workers=args.workers,
+                      use_cache=not args.no_ocr_cache, cascade=args.cascade,
+                      use_templates=args.templates, **verify_kwargs)
+    finally:
+        stop.set()
+        producer.join()
+    if errors:
+        logging.error(f"❌ Ingestion failed: {errors[0]}")
+
+
+def run_streaming(args):
+    from ingestion.download_attachments import download_pics_main
+
+    def ingest(on_saved, stop):
+        download_pics_main(start_date=args.start_date, end_date=args.end_date,
+                           full_resync=args.full_resync, on_saved=on_saved, backend=args.imap_backend)
+
+    _verify_while_ingesting(args, ingest, **_output_kwargs(args))
+
+
+def run_watch(args):
+    """
+    Long-running: holds IMAP IDLE (or polls) on the finance folders, stores new attachments
+    and verifies them right away with the OCR models loaded once. Verdicts are journaled, so
+    a restart picks up stored-but-unverified sheets and skips the verified ones. Each verdict is
+    appended to the output CSV as it arrives; none are kept in memory. Stop with Ctrl-C.
+    """
+    from datetime import datetime
+    from ingestion.download_attachments import extract_attachments
+    from ingestion.watch import watch_mailbox
+    from processing.run_journal import WATCH_RESULTS_PATH
+
+    since = datetime.strptime(args.since, '%Y-%m-%d').date() if args.since else None
+
+    def ingest(on_saved, stop):
+        def on_message(msg):
+            try:
+                extract_attachments(msg, on_saved=on_saved)
+            except StreamAborted:
+                pass  # Stored already; verified on the next start
+
+        watch_mailbox(on_message, stop, since=since, use_idle=not args.no_idle,
+                      poll_interval=args.poll_interval)
+
+    print("Watching the finance mailbox; press Ctrl-C to stop.")
+    try:
+        _verify_while_ingesting(args, ingest, resume=True, keep_results=False,
+                                output=args.output or WATCH_RESULTS_PATH)
+    except KeyboardInterrupt:
+        print("👋 Watch stopped.")
+
+
+def _add_ingest_args(parser):
     parser.add_argument("--start-date", required=True)
     parser.add_argument("--end-date", required=True)
-    args = parser.parse_args()
+    parser.add_argument("--full-resync", action="store_true",
+                        help="Ignore the stored IMAP UID high-water mark and re-fetch the whole period.")
+    parser.add_argument("--imap-backend", choices=("imaplib", "async"), default=None,
+                        help="'async' fetches over a pool of IMAP connections, from every sender in "
+                             "FINANCE_SENDERS and every folder in IMAP_FOLDERS (default: IMAP_BACKEND or imaplib).")
+
+
+def _add_output_args(parser):
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip timesheets the run journal already has a verdict for (after a crash or kill).")
+    parser.add_argument("--output", metavar="PATH", default=None,
+                        help="Write all results as CSV, or Parquet for *.parquet "
+                             "(default: state/results/verification.csv).")
+
+
+def _add_metrics_args(parser):
+    parser.add_argument("--json-log", metavar="PATH",
+                        help="Also write structured JSON logs, including per-stage timing events, to PATH.")
+    parser.add_argument("--metrics-file", metavar="PATH", default=None,
+                        help="Prometheus text file written at the end of the run (default: state/metrics/prove.prom).")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="cProfile the per-timesheet hot path into PATH (workers write PATH.<pid>).")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Run full PROVE pipeline.",
+        epilog="Without a subcommand, 'run' is assumed: run_prove.py --start-date ... --end-date ...",
+    )
+    commands = parser.add_subparsers(dest="command", metavar="{" + ",".join(COMMANDS) + "}")
+
+    ingest = commands.add_parser("ingest", help="Only fetch emails and download attachments (no OCR).")
+    _add_ingest_args(ingest)
+    _add_metrics_args(ingest)
+
+    run = commands.add_parser("run", help="Download attachments, then verify payroll (default).")
+    _add_ingest_args(run)
+    _add_output_args(run)
+    _add_metrics_args(run)
+    run.add_argument("--workers", type=int, default=None,
+                     help="Number of parallel OCR processes (default: tuned for this host, else 1).")
+    run.add_argument("--batch-size", type=int, default=None,
+                     help="Images per batched EasyOCR call (default: tuned for this host, else 1, no batching).")
+    run.add_argument("--no-ocr-cache", action="store_true",
+                     help="Ignore cached OCR results and re-run OCR on every image.")
+    run.add_argument("--cascade", action="store_true",
+                     help="Read with Tesseract first; run EasyOCR only on sheets it cannot read confidently.")
+    run.add_argument("--templates", action="store_true",
+                     help="OCR only the learned field regions of known timesheet layouts (full page as fallback).")
+    run.add_argument("--stream", action="store_true",
+                     help="Start verifying attachments as soon as they are saved, overlapping download and OCR.")
+
+    verify = commands.add_parser("verify", help="Verify the given timesheet files (or folders) only; no download.")
+    verify.add_argument("paths", nargs="+")
+    _add_output_args(verify)
+    _add_metrics_args(verify)
+    verify.add_argument("--no-ocr-cache", action="store_true",
+                        help="Ignore cached OCR results and re-run OCR on every image.")
+    verify.add_argument("--cascade", action="store_true",
+                        help="Read with Tesseract first; run EasyOCR only on sheets it cannot read confidently.")
+    verify.add_argument("--templates", action="store_true",
+                        help="OCR only the learned field regions of known timesheet layouts (full page as fallback).")
+
+    watch = commands.add_parser("watch", help="Keep running: verify new timesheets as soon as they are mailed.")
+    watch.add_argument("--since", metavar="YYYY-MM-DD",
+                       help="On the very first start, also take mail from this day on (default: today).")
+    watch.add_argument("--no-idle", action="store_true", help="Poll even if the server supports IMAP IDLE.")
+    watch.add_argument("--poll-interval", type=float, default=30.0,
+                       help="Seconds between mailbox checks when polling (default: 30).")
+    watch.add_argument("--output", metavar="PATH", default=None,
+                       help="CSV every verdict is appended to as it arrives (default: state/results/watch.csv).")
+    watch.add_argument("--workers", type=int, default=None,
+                       help="Number of parallel OCR processes (default: tuned for this host, else 1).")
+    watch.add_argument("--no-ocr-cache", action="store_true",
+                       help="Ignore cached OCR results and re-run OCR on every image.")
+    watch.add_argument("--cascade", action="store_true",
+                       help="Read with Tesseract first; run EasyOCR only on sheets it cannot read confidently.")
+    watch.add_argument("--templates", action="store_true",
+                       help="OCR only the learned field regions of known timesheet layouts (full page as fallback).")
+    _add_metrics_args(watch)
+
+    serve = commands.add_parser("serve", help="Run the OCR server: models stay loaded and later runs use it.")
+    serve.add_argument("--gpu", action="store_true", help="Run EasyOCR on the GPU.")
+
+    tune = commands.add_parser("tune", help="Measure the fastest workers / torch threads / batch size on this "
+                                            "host; later runs use them unless given on the command line.")
+    tune.add_argument("folder", nargs="?", default=None,
+                      help="Folder with timesheet images to sample (default: raw_pictures).")
+    tune.add_argument("--sample", type=int, default=8, help="Images timed per configuration (default: 8).")
+    _add_metrics_args(tune)
+    return parser
+
+
+def _output_kwargs(args) -> dict:
+    kwargs = {"resume": args.resume}
+    if args.output:
+        kwargs["output"] = args.output
+    return kwargs
+
+
+def run_verify(args):
+    from processing.payroll_verification import list_images, verify_stream
+
+    paths = []
+    for path in args.paths:
+        paths.extend(list_images(path) if os.path.isdir(path) else [path])
+    # Several files use the host's tuned worker count; for one, a worker pool only adds start-up time
+    verify_stream(paths, workers=None if len(paths) > 1 else 1, use_cache=not args.no_ocr_cache,
+                  cascade=args.cascade, use_templates=args.templates, **_output_kwargs(args))
+
+
+def run_tune(args):
+    from processing.autotune import tune
+
+    print("Tuning OCR settings for this host (runs OCR on a sample several times)...")
+    if tune(image_folder=args.folder, sample_size=args.sample) is None:
+        print("❌ Tuning failed, see the log above.")
+        return
+    print("✅ All done!")
+
+
+def run_serve(args):
+    from processing.ocr_server import serve
+
+    serve(gpu=args.gpu)
+
+
+def run_ingest(args):
+    from ingestion.download_attachments import download_pics_main
+
+    print("Fetching emails and downloading attachments...")
+    download_pics_main(start_date=args.start_date, end_date=args.end_date,
+                       full_resync=args.full_resync, backend=args.imap_backend)
+    print("✅ All done!")
+
+
+def run_pipeline(args):
+    if args.stream:
+        print("Fetching emails and verifying payroll as attachments arrive...")
+        run_streaming(args)
+        print("✅ All done!")
+        return
+
+    from ingestion.download_attachments import download_pics_main
 
     print("Step 1: Fetching emails and downloading attachments...")
-    download_pics_main(start_date=args.start_date, end_date=args.end_date)
+    download_pics_main(start_date=args.start_date, end_date=args.end_date,
+                       full_resync=args.full_resync, backend=args.imap_backend)
 
     print("Step 2: Verifying payroll...")
-    verify_payroll()
+    from processing.payroll_verification import verify_payroll
+    verify_payroll(workers=args.workers, use_cache=not args.no_ocr_cache,
+                   batch_size=args.batch_size, cascade=args.cascade, use_templates=args.templates,
+                   **_output_kwargs(args))
 
     print("✅ All done!")
 
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] not in COMMANDS and argv[0] not in ("-h", "--help"):
+        argv = [DEFAULT_COMMAND] + argv
+    args = build_parser().parse_args(argv)
+    if args.command == "serve":
+        run_serve(args)
+        return
+    if args.command not in ("ingest", "verify", "run", "watch", "tune"):
+        build_parser().print_help()
+        return
+
+    from monitoring import metrics
+    metrics.configure(json_log=args.json_log, profile=args.profile)
+    try:
+        if args.command == "ingest":
+            run_ingest(args)
+        elif args.command == "verify":
+            run_verify(args)
+        elif args.command == "watch":
+            run_watch(args)
+        elif args.command == "tune":
+            run_tune(args)
+        else:
+            run_pipeline(args)
+    finally:
+        metrics.finish(args.metrics_file or metrics.PROMETHEUS_FILE)
+
 if __name__ == "__main__":
     main()
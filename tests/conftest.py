@@ -0,0 +1,61 @@
+import os
+import sys
+from datetime import datetime, timezone
+from email.mime.application import MIMEApplication
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from email.utils import format_datetime
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from benchmarks.imap_server import BenchmarkIMAPServer
+
+# tests/imap_test.py and tests/test_mailfetcher.py are manual scripts against the real mailbox (.env)
+collect_ignore = ["imap_test.py", "test_mailfetcher.py"]
+
+FINANCE_SENDER = 'lonn@example.no'
+
+
+def build_email(day: datetime, filename: str = None, sender: str = FINANCE_SENDER, data: bytes = b'%PDF-1.4 test') -> bytes:
+    """A mail like the finance department sends: text body plus (optionally) one PDF attachment."""
+    msg = MIMEMultipart()
+    msg['From'] = sender
+    msg['To'] = 'prove@example.no'
+    msg['Subject'] = f'Timeliste {day:%Y-%m-%d}'
+    msg['Date'] = format_datetime(day.replace(tzinfo=timezone.utc))
+    msg.attach(MIMEText('Vedlagt timeliste.', 'plain', 'utf-8'))
+    if filename:
+        part = MIMEApplication(data, _subtype='pdf')
+        part.add_header('Content-Disposition', 'attachment', filename=filename)
+        msg.attach(part)
+    return msg.as_bytes()
+
+
+@pytest.fixture
+def imap_server(tmp_path, monkeypatch):
+    """
+    Starts the benchmark IMAP server with the given raw messages and points ingestion at it;
+    the sync state lives in tmp_path. Usage: server = imap_server([raw, ...], idle=False)
+    """
+    from ingestion import async_fetch, fetch_emails, sync_state
+
+    servers = []
+
+    def start(raw_messages: list, **kwargs) -> BenchmarkIMAPServer:
+        server = BenchmarkIMAPServer(raw_messages, **kwargs).__enter__()
+        servers.append(server)
+        monkeypatch.setattr(fetch_emails, 'IMAP_HOST', '127.0.0.1')
+        monkeypatch.setattr(fetch_emails, 'IMAP_PORT', server.port)
+        monkeypatch.setattr(fetch_emails, 'IMAP_SSL', False)
+        monkeypatch.setattr(fetch_emails, 'IMAP_USER', 'test')
+        monkeypatch.setattr(fetch_emails, 'IMAP_PASSWORD', 'test')
+        monkeypatch.setattr(fetch_emails, 'FINANCE_SENDER', FINANCE_SENDER)
+        monkeypatch.setattr(async_fetch, 'FINANCE_SENDERS', [])
+        monkeypatch.setattr(async_fetch, 'IMAP_FOLDERS', ['INBOX'])
+        monkeypatch.setattr(sync_state, 'SYNC_STATE_PATH', str(tmp_path / 'imap_sync.json'))
+        return server
+
+    yield start
+    for server in servers:
+        server.__exit__(None, None, None)
@@ -0,0 +1,71 @@
+import threading
+from datetime import datetime
+
+import pytest
+
+from benchmarks import imap_server
+from conftest import build_email
+from ingestion import async_fetch
+
+MARCH = ('2025-03-01', '2025-03-31')
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(async_fetch, 'RETRY_BACKOFF', 0.01)
+
+
+def _mailbox(count: int = 5) -> list:
+    return [build_email(datetime(2025, 3, day + 1), f'sheet_{day}.pdf') for day in range(count)]
+
+
+def _drop_connection_on(monkeypatch, should_drop):
+    """Closes the client's connection instead of answering the first command should_drop(command, args) picks."""
+    original = imap_server._Handler.dispatch
+    dropped = threading.Event()
+
+    def dispatch(self, tag, command, args):
+        if not dropped.is_set() and should_drop(command, args):
+            dropped.set()
+            return False
+        return original(self, tag, command, args)
+
+    monkeypatch.setattr(imap_server._Handler, 'dispatch', dispatch)
+    return dropped
+
+
+def _fetch_subjects(**kwargs) -> list:
+    return [msg['Subject'] for msg in async_fetch.get_finance_emails_concurrently(*MARCH, incremental=False, **kwargs)]
+
+
+def test_body_fetch_is_retried_after_connection_loss(imap_server, monkeypatch):
+    imap_server(_mailbox())
+    dropped = _drop_connection_on(monkeypatch, lambda command, args: command == 'UID FETCH'
+                                  and 'BODY.PEEK[2]' in args.upper())
+    subjects = _fetch_subjects(pool_size=1)
+    assert dropped.is_set()
+    assert sorted(subjects) == [f'Timeliste 2025-03-0{day + 1}' for day in range(5)]
+
+
+def test_job_failing_partway_does_not_repeat_delivered_messages(imap_server, monkeypatch):
+    imap_server(_mailbox())
+    original = async_fetch.build_message
+    calls = []
+
+    def flaky_build_message(headers, payloads):
+        # The connection "breaks" after two messages were already handed to the consumer
+        calls.append(1)
+        if len(calls) == 3:
+            raise ConnectionResetError("connection reset by peer")
+        return original(headers, payloads)
+
+    monkeypatch.setattr(async_fetch, 'build_message', flaky_build_message)
+    subjects = _fetch_subjects(pool_size=1)
+    assert len(subjects) == len(set(subjects)) == 5
+
+
+def test_search_survives_a_dropped_connection(imap_server, monkeypatch):
+    imap_server(_mailbox(3))
+    dropped = _drop_connection_on(monkeypatch, lambda command, args: command == 'UID SEARCH')
+    assert len(_fetch_subjects(pool_size=2)) == 3
+    assert dropped.is_set()
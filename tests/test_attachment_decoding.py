@@ -0,0 +1,66 @@
+import email
+import os
+from email.message import EmailMessage
+
+import pytest
+
+from ingestion import download_attachments
+
+# Every byte value, so escapes and padding are exercised
+DATA = bytes(range(256)) * 8 + b'tail'
+
+
+def _part(data: bytes, cte: str):
+    msg = EmailMessage()
+    msg.set_content(data, maintype='application', subtype='pdf', cte=cte, filename='sheet.pdf')
+    # Parse it back, as received from IMAP
+    return email.message_from_bytes(msg.as_bytes())
+
+
+def _decoded(part) -> bytes:
+    return b''.join(download_attachments._iter_decoded(part))
+
+
+@pytest.mark.parametrize('chunk_chars', [1, 3, 5, 7, 76, 77, 4096])
+@pytest.mark.parametrize('cte', ['base64', 'quoted-printable'])
+def test_chunked_decoding_matches_get_payload(monkeypatch, cte, chunk_chars):
+    # Small odd chunk sizes split base64 quanta, =XX escapes and soft line breaks across chunks
+    monkeypatch.setattr(download_attachments, 'DECODE_CHUNK_CHARS', chunk_chars)
+    part = _part(DATA, cte)
+    assert _decoded(part) == part.get_payload(decode=True) == DATA
+
+
+@pytest.mark.parametrize('chunk_chars', [2, 5, 6])
+def test_unpadded_base64_tail(monkeypatch, chunk_chars):
+    monkeypatch.setattr(download_attachments, 'DECODE_CHUNK_CHARS', chunk_chars)
+    part = _part(b'', 'base64')
+    part.set_payload('VGltZWxp\r\nc3Rl')  # "Timeliste", padding stripped by the sender
+    assert _decoded(part) == part.get_payload(decode=True) == b'Timeliste'
+
+
+def test_quoted_printable_escape_split_across_a_chunk_boundary(monkeypatch):
+    # A long line with a soft break, then an =XX escape right where a chunk would end
+    text = 'Timer: ' + 'x' * 70 + '=\r\n' + 'Sum =C3=A5 =3D 10,00\r\n'
+    part = _part(b'', 'quoted-printable')
+    part.set_payload(text)
+    for chunk_chars in range(1, len(text) + 2):
+        monkeypatch.setattr(download_attachments, 'DECODE_CHUNK_CHARS', chunk_chars)
+        assert _decoded(part) == part.get_payload(decode=True), chunk_chars
+
+
+def test_unencoded_payload_is_passed_through(monkeypatch):
+    monkeypatch.setattr(download_attachments, 'DECODE_CHUNK_CHARS', 3)
+    part = _part(b'', '7bit')
+    part.set_payload('plain %PDF-1.4 bytes\r\n')
+    assert _decoded(part) == part.get_payload(decode=True)
+
+
+def test_store_receives_the_decoded_bytes(tmp_path, monkeypatch):
+    monkeypatch.setattr(download_attachments, 'PICTURE_FOLDER', str(tmp_path))
+    monkeypatch.setattr(download_attachments, '_store', None)
+    monkeypatch.setattr(download_attachments, 'DECODE_CHUNK_CHARS', 7)
+    path, written, new = download_attachments._save_part(_part(DATA, 'base64'), 'sheet.pdf', {})
+    assert new and written == len(DATA)
+    with open(path, 'rb') as f:
+        assert f.read() == DATA
+    assert os.path.basename(path) == 'sheet.pdf'
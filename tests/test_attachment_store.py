@@ -0,0 +1,83 @@
+import argparse
+import os
+
+import run_prove
+from ingestion import attachment_store, download_attachments
+from ingestion.attachment_store import AttachmentStore
+from processing import payroll_verification
+
+SOURCE = {"subject": "Timeliste mars", "date": "Mon, 03 Mar 2025 08:00:00 +0000", "sender": "lonn@example.no"}
+
+
+def _chunks(data: bytes, size: int = 3):
+    return (data[i:i + size] for i in range(0, len(data), size))
+
+
+def test_add_stream_stores_content_once(tmp_path):
+    store = AttachmentStore(str(tmp_path))
+    path, size, new = store.add_stream(_chunks(b'timesheet one'), 'mars.pdf', SOURCE)
+    assert new and size == 13
+    assert path.startswith(str(tmp_path)) and os.path.basename(path) == 'mars.pdf'
+    with open(path, 'rb') as f:
+        assert f.read() == b'timesheet one'
+
+    # Forwarded: same bytes under another name, only the source is added
+    again, _, new = store.add_stream(_chunks(b'timesheet one'), 'Fwd mars.pdf', dict(SOURCE, subject="Fwd"))
+    assert again == path and not new
+    assert store.paths() == [path]
+    assert [s["subject"] for s in store.documents[os.path.basename(os.path.dirname(path))]["sources"]] == \
+        ["Timeliste mars", "Fwd"]
+    assert not [f for f in os.listdir(tmp_path) if f.endswith('.part')]
+
+
+def test_empty_stream_is_not_stored(tmp_path):
+    store = AttachmentStore(str(tmp_path))
+    assert store.add_stream(iter([b'']), 'empty.pdf') == (None, 0, False)
+    assert store.paths() == []
+
+
+def test_index_is_reloaded(tmp_path):
+    store = AttachmentStore(str(tmp_path))
+    first, _, _ = store.add_stream(_chunks(b'b sheet'), 'b.png', SOURCE)
+    second, _, _ = store.add_stream(_chunks(b'a sheet'), 'a.pdf', SOURCE)
+    store.add_stream(_chunks(b'b sheet'), 'b.png', SOURCE)
+    with open(store.index_path, 'a', encoding='utf-8') as f:
+        f.write('{"sha256": "ab')  # Killed while appending
+
+    reloaded = AttachmentStore(str(tmp_path))
+    assert attachment_store.is_store(str(tmp_path))
+    assert reloaded.paths() == [second, first]
+    assert reloaded.paths(('.pdf',)) == [second]
+    assert sum(len(d["sources"]) for d in reloaded.documents.values()) == 3
+
+
+def test_import_loose_files_moves_them_into_the_store(tmp_path):
+    store = AttachmentStore(str(tmp_path))
+    stored, _, _ = store.add_stream(_chunks(b'known'), 'known.png')
+    (tmp_path / 'old.jpg').write_bytes(b'old flat layout')
+    (tmp_path / 'copy.png').write_bytes(b'known')
+    (tmp_path / 'notes.txt').write_text('not a timesheet')
+
+    assert store.import_loose_files(('.jpg', '.png')) == 2
+    assert not (tmp_path / 'old.jpg').exists() and not (tmp_path / 'copy.png').exists()
+    assert (tmp_path / 'notes.txt').exists()
+    assert [os.path.basename(p) for p in store.paths()] == ['known.png', 'old.jpg']
+    assert store.paths()[0] == stored
+
+
+def test_stream_lists_the_store_after_importing_loose_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(download_attachments, 'PICTURE_FOLDER', str(tmp_path))
+    monkeypatch.setattr(download_attachments, '_store', None)
+    (tmp_path / 'scan.jpg').write_bytes(b'saved before the store existed')
+    queued = []
+
+    def verify_stream(paths, **kwargs):
+        queued.extend(paths)
+
+    monkeypatch.setattr(payroll_verification, 'verify_stream', verify_stream)
+    args = argparse.Namespace(workers=1, no_ocr_cache=True, cascade=False, templates=False)
+    run_prove._verify_while_ingesting(args, lambda on_saved, stop: None)
+
+    assert [os.path.basename(p) for p in queued] == ['scan.jpg']
+    assert all(os.path.exists(p) for p in queued)
+    assert not (tmp_path / 'scan.jpg').exists()
@@ -0,0 +1,140 @@
+import cv2
+import numpy as np
+import pytest
+
+from processing import payroll_verification
+from processing.payroll_verification import BATCH_IMAGE_SIZE, ImageSource, TimesheetProcessor
+
+WIDTH, HEIGHT = BATCH_IMAGE_SIZE  # Batched boxes then need no rescaling
+
+
+def _words(x: float, y: float, text: str, conf: float = 0.9) -> list:
+    """Tesseract word boxes for text on one line starting at (x, y)."""
+    words = []
+    for word in text.split():
+        words.append((x, y, x + 12 * len(word), y + 20, word, conf, y))
+        x += 12 * len(word) + 10
+    return words
+
+
+def _sheet_words(x: float, y: float, name: str, hours: str = None, name_conf: float = 0.9) -> list:
+    words = _words(x, y, "Navn") + _words(x + 150, y, name, name_conf)
+    words += _words(x, y + 40, "Periode") + _words(x + 150, y + 40, "mars 2025")
+    words += _words(x, y + 200, "Sum timer til utbetaling")
+    if hours is not None:
+        words += _words(x + 400, y + 200, hours)
+    return words
+
+
+def _box(x: float, y: float, text: str, width: float = 120, conf: float = 0.95) -> list:
+    return [[[x, y], [x + width, y], [x + width, y + 20], [x, y + 20]], text, conf]
+
+
+def _sheet_boxes(x: float, y: float, name: str, hours: str) -> list:
+    """EasyOCR boxes of a sheet; no period, which only Tesseract can provide in these tests."""
+    return [_box(x, y, "Navn"), _box(x + 150, y, name, width=200),
+            _box(x, y + 200, "Sum timer til utbetaling", width=250), _box(x + 400, y + 200, hours, width=50)]
+
+
+class _Tesseract:
+    version = "5.0"
+    backend = "stub"
+
+    def __init__(self, words: list):
+        self.page_words = words
+
+    def words(self, array):
+        return self.page_words
+
+    def text(self, array):
+        return ""
+
+
+class _Reader:
+    """easyocr.Reader stand-in: the full page gives page_boxes, any smaller crop crop_boxes."""
+
+    def __init__(self, page_boxes: list = (), crop_boxes: list = ()):
+        self.page_boxes = list(page_boxes)
+        self.crop_boxes = list(crop_boxes)
+        self.calls = []
+
+    def _boxes(self, array):
+        return self.page_boxes if array.shape[:2] == (HEIGHT, WIDTH) else self.crop_boxes
+
+    def readtext(self, array, detail=1):
+        self.calls.append(("readtext", array.shape[:2]))
+        return self._boxes(array)
+
+    def readtext_batched(self, arrays, n_width=None, n_height=None, batch_size=1, detail=1):
+        self.calls.append(("readtext_batched", len(arrays)))
+        return [self._boxes(array) for array in arrays]
+
+
+@pytest.fixture
+def processor(tmp_path):
+    csv = tmp_path / "ref.csv"
+    csv.write_text("Name,agreed hours,extra hours,hours given away\nOla Nordmann,10,0,0\nKari Hansen,7.5,0,0\n",
+                   encoding="utf-8")
+
+    def build(words, reader: _Reader) -> TimesheetProcessor:
+        proc = TimesheetProcessor(str(csv), cascade=True, preprocessing=None, use_server=False)
+        proc._tesseract = _Tesseract(words)
+        proc._reader = reader
+        return proc
+
+    return build
+
+
+def _page() -> ImageSource:
+    return ImageSource(array=np.full((HEIGHT, WIDTH), 255, dtype=np.uint8))
+
+
+def _values(sheets: list) -> list:
+    return [(fields["name"].value, fields["period"].value, fields["sum_hours"].value, engine)
+            for fields, engine, _ in sheets]
+
+
+def test_clean_page_is_resolved_by_tesseract_alone(processor):
+    reader = _Reader()
+    proc = processor(_sheet_words(50, 50, "Ola Nordmann", "10,00"), reader)
+    assert _values(proc.ocr_sheets(_page())) == [("Ola Nordmann", "mars 2025", 10.0, "tesseract")]
+    assert reader.calls == []
+
+
+def test_low_confidence_name_escalates_and_keeps_what_only_tesseract_read(processor):
+    reader = _Reader(page_boxes=_sheet_boxes(50, 50, "Ola Nordmann", "10,00"))
+    proc = processor(_sheet_words(50, 50, "0la Nordmarn", "10,00", name_conf=0.3), reader)
+    # Name and hours from EasyOCR, the period (which EasyOCR missed) from Tesseract
+    assert _values(proc.ocr_sheets(_page())) == [("Ola Nordmann", "mars 2025", 10.0, "easyocr")]
+    assert reader.calls == [("readtext", (HEIGHT, WIDTH))]
+
+
+def test_missing_hours_escalate_one_region_of_a_multi_sheet_page(processor):
+    reader = _Reader(crop_boxes=_sheet_boxes(50, 50, "Kari Hansen", "7,50"))
+    words = _sheet_words(50, 50, "Ola Nordmann", "10,00") + _sheet_words(50, 800, "Kari Hansen")
+    proc = processor(words, reader)
+    sheets = proc.ocr_sheets(_page())
+    assert _values(sheets) == [("Ola Nordmann", "mars 2025", 10.0, "tesseract"),
+                               ("Kari Hansen", "mars 2025", 7.5, "easyocr")]
+    # Only the unresolved sheet's crop is read with EasyOCR
+    assert len(reader.calls) == 1 and reader.calls[0][1][0] < HEIGHT
+    assert sheets[1][2].array.shape[0] < HEIGHT
+
+
+def test_batched_path_escalates_like_the_single_image_path(processor, tmp_path, monkeypatch):
+    monkeypatch.setattr(payroll_verification, "log_result", lambda result: None)
+    paths = []
+    for name in ("clean.png", "blurry.png"):
+        paths.append(str(tmp_path / name))
+        cv2.imwrite(paths[-1], np.full((HEIGHT, WIDTH), 255, dtype=np.uint8))
+    clean = _sheet_words(50, 50, "Kari Hansen", "7,50")
+    blurry = _sheet_words(50, 50, "0la Nordmarn", "10,00", name_conf=0.3)
+    reader = _Reader(page_boxes=_sheet_boxes(50, 50, "Ola Nordmann", "10,00"))
+    proc = processor([], reader)
+    pages = iter([clean, blurry])  # Tesseract reads the pages in input order
+    proc._tesseract.words = lambda array: next(pages)
+    results = proc.process_images(paths, batch_size=2)
+    assert [(r["name"], r["period"], r["reported_hours"], r["engine"]) for [r] in results] == \
+        [("Kari Hansen", "mars 2025", 7.5, "tesseract"), ("Ola Nordmann", "mars 2025", 10.0, "easyocr")]
+    # Only the escalated page goes into the EasyOCR batch
+    assert reader.calls == [("readtext_batched", 1)]
@@ -0,0 +1,67 @@
+from datetime import datetime
+
+import pytest
+
+from conftest import build_email
+from ingestion import async_fetch, fetch_emails, sync_state
+
+FEBRUARY = ('2025-02-01', '2025-02-28')
+MARCH = ('2025-03-01', '2025-03-31')
+APRIL = ('2025-04-01', '2025-04-30')
+
+BACKENDS = {
+    'imaplib': fetch_emails.get_finance_emails_in_period,
+    'async': async_fetch.get_finance_emails_concurrently,
+}
+
+
+def _subjects(fetch, period, incremental=True) -> list:
+    return sorted(msg['Subject'] for msg in fetch(*period, incremental=incremental))
+
+
+def _mailbox() -> list:
+    # Arrival (UID) order follows the dates: February is UIDs 1-2, March 3-4
+    return [build_email(datetime(2025, month, day), f'sheet_{month}_{day}.pdf')
+            for month, day in ((2, 10), (2, 20), (3, 5), (3, 15))]
+
+
+@pytest.mark.parametrize('backend', sorted(BACKENDS))
+def test_second_run_only_fetches_new_mail(imap_server, backend):
+    fetch = BACKENDS[backend]
+    server = imap_server(_mailbox())
+    assert _subjects(fetch, MARCH) == ['Timeliste 2025-03-05', 'Timeliste 2025-03-15']
+    assert _subjects(fetch, MARCH) == []
+
+    server.deliver(build_email(datetime(2025, 4, 2), 'sheet_4_2.pdf'))
+    assert _subjects(fetch, APRIL) == ['Timeliste 2025-04-02']
+    assert _subjects(fetch, APRIL) == []
+
+
+@pytest.mark.parametrize('backend', sorted(BACKENDS))
+def test_earlier_period_after_later_one_is_searched_in_full(imap_server, backend):
+    fetch = BACKENDS[backend]
+    imap_server(_mailbox())
+    assert len(_subjects(fetch, MARCH)) == 2
+
+    # The March mark (UID 4) must not hide February's UIDs 1-2
+    assert _subjects(fetch, FEBRUARY) == ['Timeliste 2025-02-10', 'Timeliste 2025-02-20']
+    assert _subjects(fetch, FEBRUARY) == []
+
+
+def test_mark_records_the_window_it_covers(imap_server):
+    imap_server(_mailbox())
+    list(fetch_emails.get_finance_emails_in_period(*MARCH))
+    key = sync_state.sync_key('127.0.0.1', 'test', fetch_emails.MAILBOX, fetch_emails.FINANCE_SENDER)
+    uidvalidity, last_uid, since = sync_state.load_sync_state(key)
+    assert (last_uid, since) == (4, MARCH[0])
+
+    assert sync_state.usable_mark((uidvalidity, last_uid, since), uidvalidity, APRIL[0]) == 4
+    assert sync_state.usable_mark((uidvalidity, last_uid, since), uidvalidity, FEBRUARY[0]) is None
+    assert sync_state.usable_mark((uidvalidity, last_uid, since), uidvalidity + 1, APRIL[0]) is None
+    assert sync_state.usable_mark((uidvalidity, last_uid, None), uidvalidity, APRIL[0]) is None
+
+
+def test_full_resync_ignores_the_mark(imap_server):
+    imap_server(_mailbox())
+    list(fetch_emails.get_finance_emails_in_period(*MARCH))
+    assert len(_subjects(fetch_emails.get_finance_emails_in_period, MARCH, incremental=False)) == 2
@@ -0,0 +1,69 @@
+from processing.layout import extract_fields, find_labels, merge_word_runs, NAME_FIELD
+
+
+def _box(x0, y0, x1, y1, text, conf=0.9) -> list:
+    return [[[x0, y0], [x1, y0], [x1, y1], [x0, y1]], text, conf]
+
+
+def _sheet() -> list:
+    return [
+        _box(100, 100, 160, 120, "Navn", 0.95),
+        _box(200, 100, 250, 120, "Ola", 0.8),
+        _box(260, 100, 360, 120, "Nordmann", 0.85),
+        _box(900, 100, 1000, 120, "Avdeling"),  # Far to the right: not part of the name
+        _box(100, 150, 180, 170, "Periode"),
+        _box(200, 150, 250, 170, "mars"),
+        _box(260, 150, 310, 170, "2025"),
+        _box(100, 900, 350, 920, "Sum timer til utbetaling", 0.7),
+        _box(400, 900, 450, 920, "10,50"),
+    ]
+
+
+def test_label_and_value_on_one_row():
+    found = extract_fields(_sheet())
+    assert found["name"].value == "Ola Nordmann"
+    assert found["name"].confidence == 0.8  # Lowest of label and value pieces
+    assert found["name"].value_bbox == [[200.0, 100.0], [360.0, 100.0], [360.0, 120.0], [200.0, 120.0]]
+    assert found["period"].value == "mars 2025"
+
+
+def test_sum_hours_with_decimal_comma_is_a_float():
+    found = extract_fields(_sheet())
+    assert found["sum_hours"].value == 10.5
+    assert found["sum_hours"].confidence == 0.7
+
+
+def test_inline_value_in_label_box():
+    found = extract_fields([_box(100, 100, 400, 120, "Navn: Kari Hansen", 0.9)])
+    assert found["name"].value == "Kari Hansen"
+    assert found["name"].label_bbox == found["name"].value_bbox
+
+
+def test_value_on_another_row_is_not_used():
+    found = extract_fields([_box(100, 100, 160, 120, "Navn"), _box(200, 300, 300, 320, "Ola")])
+    assert found["name"] is None
+
+
+def test_missing_fields_are_none():
+    assert extract_fields([]) == {"name": None, "period": None, "sum_hours": None}
+    found = extract_fields([_box(100, 100, 160, 120, "Navn"), _box(200, 100, 300, 120, "Ola")])
+    assert found["period"] is None and found["sum_hours"] is None
+
+
+def test_find_labels_skips_label_like_values():
+    # "Nann" is close enough to "navn" to look like a label, but it is the value of the first one
+    boxes = [_box(100, 100, 160, 120, "Navn"), _box(200, 100, 260, 120, "Nann"),
+             _box(100, 800, 160, 820, "Navn"), _box(200, 800, 300, 820, "Ola")]
+    assert find_labels(boxes, NAME_FIELD) == [0, 2]
+
+
+def test_merge_word_runs_keeps_numbers_apart():
+    words = [
+        (100, 900, 130, 920, "Sum", 0.9, 1), (135, 900, 190, 920, "timer", 0.8, 1),
+        (195, 900, 220, 920, "til", 0.9, 1), (225, 900, 350, 920, "utbetaling", 0.9, 1),
+        (400, 900, 450, 920, "10,50", 0.95, 1),
+        (100, 100, 160, 120, "Navn", 0.9, 2), (900, 100, 1000, 120, "Avdeling", 0.9, 2),
+    ]
+    texts = [text for _, text, _ in merge_word_runs(words)]
+    assert texts == ["Sum timer til utbetaling", "10,50", "Navn", "Avdeling"]
+    assert extract_fields(merge_word_runs(words))["sum_hours"].value == 10.5
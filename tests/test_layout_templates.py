@@ -0,0 +1,62 @@
+from processing.layout import FieldMatch
+from processing.layout_templates import LayoutTemplates
+
+WIDTH, HEIGHT = 1654, 2339
+
+
+def _rect(x0, y0, x1, y1) -> list:
+    return [[x0, y0], [x1, y0], [x1, y1], [x0, y1]]
+
+
+def _fields(top: int) -> dict:
+    """Name and sum hours found `top` px down the page (one layout per distinct top)."""
+    return {
+        "name": FieldMatch("Ola Nordmann", 0.9, _rect(100, top, 200, top + 20), _rect(250, top, 450, top + 20)),
+        "period": None,
+        "sum_hours": FieldMatch(10.0, 0.9, _rect(100, top + 900, 350, top + 920), _rect(400, top + 900, 450, top + 920)),
+    }
+
+
+def test_learn_requires_name_and_hours(tmp_path):
+    templates = LayoutTemplates(str(tmp_path / 'templates.json'))
+    assert templates.learn(dict(_fields(100), sum_hours=None), WIDTH, HEIGHT) is None
+    assert templates.templates == []
+
+
+def test_same_layout_widens_one_template(tmp_path):
+    templates = LayoutTemplates(str(tmp_path / 'templates.json'))
+    first = templates.learn(_fields(100), WIDTH, HEIGHT)
+    second = templates.learn(_fields(110), WIDTH, HEIGHT)
+    assert first is second and len(templates.templates) == 1
+    assert first["hits"] == 2
+    # Only pages of a similar shape use it
+    assert templates.candidates(WIDTH, HEIGHT) == [first]
+    assert templates.candidates(HEIGHT, WIDTH) == []
+
+
+def test_successful_crop_reads_make_a_template_most_used(tmp_path):
+    path = str(tmp_path / 'templates.json')
+    templates = LayoutTemplates(path)
+    often_failed = templates.learn(_fields(100), WIDTH, HEIGHT)
+    templates.learn(_fields(100), WIDTH, HEIGHT)
+    templates.learn(_fields(100), WIDTH, HEIGHT)
+    reliable = templates.learn(_fields(1200), WIDTH, HEIGHT)
+    assert templates.candidates(WIDTH, HEIGHT)[0] is often_failed
+
+    for _ in range(3):
+        templates.record_hit(reliable)
+    assert templates.hits == 3
+    assert templates.candidates(WIDTH, HEIGHT)[0] is reliable
+
+    # The counts are stored, so the next run starts with the right order
+    reloaded = LayoutTemplates(path).candidates(WIDTH, HEIGHT)
+    assert [t["hits"] for t in reloaded] == [4, 3]
+
+
+def test_crop_boxes_merge_overlapping_regions(tmp_path):
+    templates = LayoutTemplates(str(tmp_path / 'templates.json'))
+    template = templates.learn(_fields(100), WIDTH, HEIGHT)
+    rects = templates.crop_boxes(template, WIDTH, HEIGHT)
+    assert len(rects) == 2  # Name row and sum row are far apart
+    x0, y0, x1, y1 = rects[0]
+    assert x0 <= 100 and y0 <= 100 and x1 >= 450 and y1 >= 120
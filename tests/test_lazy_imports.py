@@ -0,0 +1,48 @@
+import os
+import subprocess
+import sys
+
+from processing import ocr_server, payroll_verification
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+OCR_MODULES = ("torch", "easyocr", "cv2", "PIL", "pytesseract", "tesserocr", "pymupdf", "fitz")
+
+
+def _loaded_after(statement: str) -> list:
+    probe = (f"import sys; sys.path.insert(0, {REPO_ROOT!r}); {statement}; "
+             f"print(','.join(m for m in {OCR_MODULES!r} if m in sys.modules))")
+    out = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True).stdout
+    last_line = out.splitlines()[-1] if out else ''  # Only the probe's own line counts
+    return [m for m in last_line.split(',') if m]
+
+
+def test_importing_verification_loads_no_ocr_engine():
+    assert _loaded_after("import processing.payroll_verification") == []
+
+
+def test_preprocessing_settings_without_cv2():
+    assert _loaded_after("from processing.preprocessing import PreprocessSettings; PreprocessSettings().key()") == []
+
+
+def test_worker_with_ocr_server_skips_torch(tmp_path, monkeypatch):
+    csv = tmp_path / "ref.csv"
+    csv.write_text("Name,agreed hours,extra hours,hours given away\nOla Nordmann,10,0,0\n", encoding="utf-8")
+    monkeypatch.setattr(ocr_server.OCRClient, "connect", classmethod(lambda cls: object()))
+    monkeypatch.delenv("OMP_NUM_THREADS", raising=False)
+
+    payroll_verification._init_worker(str(csv), 2, use_cache=False)
+    assert payroll_verification._worker_processor.server is not None
+    assert "OMP_NUM_THREADS" not in os.environ
+    assert "torch" not in sys.modules
+
+
+def test_local_worker_caps_torch_threads(tmp_path, monkeypatch):
+    csv = tmp_path / "ref.csv"
+    csv.write_text("Name,agreed hours,extra hours,hours given away\nOla Nordmann,10,0,0\n", encoding="utf-8")
+    monkeypatch.setattr(ocr_server.OCRClient, "connect", classmethod(lambda cls: None))
+    monkeypatch.delenv("OMP_NUM_THREADS", raising=False)
+
+    payroll_verification._init_worker(str(csv), 2, use_cache=False)
+    assert payroll_verification._worker_processor.server is None
+    assert os.environ["OMP_NUM_THREADS"] == "2"
+    monkeypatch.delenv("OMP_NUM_THREADS")
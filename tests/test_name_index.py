@@ -0,0 +1,59 @@
+import random
+import string
+from difflib import get_close_matches
+
+import pytest
+
+from processing.name_index import NameIndex
+
+FIRST = ["ola", "kari", "per", "anne", "nils", "ingrid", "lars", "marit", "jon", "silje", "aleksander", "åse"]
+LAST = ["nordmann", "hansen", "olsen", "berg", "johansen", "larsen", "dahl", "bakken", "sæther", "lie"]
+
+
+def _roster(rng: random.Random, size: int) -> list:
+    return [f"{rng.choice(FIRST)} {rng.choice(LAST)}" for _ in range(size)]
+
+
+def _ocr_noise(rng: random.Random, name: str) -> str:
+    """Drops, swaps or replaces a few characters, like a poor scan."""
+    chars = list(name)
+    for _ in range(rng.randint(0, 4)):
+        op = rng.choice("drs")
+        pos = rng.randrange(len(chars)) if chars else 0
+        if op == "d" and chars:
+            del chars[pos]
+        elif op == "r" and chars:
+            chars[pos] = rng.choice(string.ascii_lowercase + " ")
+        elif op == "s" and pos + 1 < len(chars):
+            chars[pos], chars[pos + 1] = chars[pos + 1], chars[pos]
+    return "".join(chars)
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("cutoff", [0.6, 0.8])
+def test_same_result_as_get_close_matches(seed, cutoff):
+    rng = random.Random(seed)
+    names = _roster(rng, 80)
+    index = NameIndex(names, cutoff=cutoff)
+    queries = [_ocr_noise(rng, rng.choice(names)) for _ in range(150)] + ["", "x", "ukjent", "Ola  NORDMANN "]
+    for query in queries:
+        word = query.lower().strip()
+        expected = get_close_matches(word, list(dict.fromkeys(names)), n=1, cutoff=cutoff)
+        assert index.best_match(query) == (expected[0] if expected else None), query
+
+
+def test_exact_match_and_normalization():
+    index = NameIndex(["ola nordmann", "kari hansen"], cutoff=0.6)
+    assert index.best_match("  Kari Hansen ") == "kari hansen"
+
+
+def test_ties_are_broken_like_difflib():
+    # Both candidates score the same against the query
+    names = ["anne berg", "anna berg"]
+    index = NameIndex(names, cutoff=0.6)
+    assert index.best_match("ann_ berg") == get_close_matches("ann_ berg", names, n=1, cutoff=0.6)[0]
+
+
+def test_no_match_below_cutoff():
+    assert NameIndex(["ola nordmann"], cutoff=0.6).best_match("zzzz") is None
+    assert NameIndex([], cutoff=0.6).best_match("ola nordmann") is None
@@ -0,0 +1,74 @@
+import os
+
+import numpy as np
+import pytest
+
+from processing import payroll_verification, tesseract_engine
+from processing.ocr_cache import OCRCache
+from processing.payroll_verification import ImageSource, TimesheetProcessor
+
+SETTINGS = {"langs": ["no", "en"], "detail": 1, "preprocessing": None}
+
+
+def test_key_covers_image_engine_version_and_settings():
+    key = OCRCache.make_key("digest", "easyocr", "1.7.1", SETTINGS)
+    assert key == OCRCache.make_key("digest", "easyocr", "1.7.1", dict(reversed(list(SETTINGS.items()))))
+    others = [
+        OCRCache.make_key("other digest", "easyocr", "1.7.1", SETTINGS),
+        OCRCache.make_key("digest", "tesseract", "1.7.1", SETTINGS),
+        OCRCache.make_key("digest", "easyocr", "1.7.2", SETTINGS),
+        OCRCache.make_key("digest", "easyocr", "1.7.1", dict(SETTINGS, preprocessing="gray")),
+    ]
+    assert len({key, *others}) == 5
+
+
+def test_put_and_get(tmp_path):
+    cache = OCRCache(str(tmp_path))
+    key = OCRCache.make_key("digest", "tesseract", "5.3.0", {})
+    assert cache.get(key) is None
+    cache.put(key, [[[[0.0, 0.0]], "Navn", 0.9]])
+    assert OCRCache(str(tmp_path)).get(key) == [[[[0.0, 0.0]], "Navn", 0.9]]
+    assert (cache.hits, cache.misses) == (0, 1)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    entry = "x" * 1000
+    cache = OCRCache(str(tmp_path), max_bytes=3500)
+    keys = [OCRCache.make_key(str(i), "easyocr", "1", {}) for i in range(3)]
+    for age, key in enumerate(keys):
+        cache.put(key, entry)
+        os.utime(cache._path(key), (1000 + age, 1000 + age))
+    cache.get(keys[0])  # Used again: now the most recent
+
+    cache.put(OCRCache.make_key("3", "easyocr", "1", {}), entry)
+    assert [cache.get(key) is not None for key in keys] == [True, False, True]
+    assert cache._size <= 3500 * 0.9
+
+
+@pytest.fixture
+def processor(tmp_path):
+    csv = tmp_path / "ref.csv"
+    csv.write_text("Name,agreed hours,extra hours,hours given away\nOla Nordmann,10,0,0\n", encoding="utf-8")
+    return TimesheetProcessor(str(csv), cache=OCRCache(str(tmp_path / "cache")), preprocessing=None,
+                              use_server=False)
+
+
+def test_cache_hit_does_not_build_tesseract(processor, monkeypatch):
+    versions = []
+
+    def installed_version(lang):
+        versions.append(lang)
+        return "5.3.0", "pytesseract"
+
+    def no_engine():
+        raise AssertionError("Tesseract was started for a cache hit")
+
+    monkeypatch.setattr(tesseract_engine, "installed_version", installed_version)
+    monkeypatch.setattr(processor, "_local_tesseract", no_engine)
+    page = ImageSource(array=np.zeros((20, 20), dtype=np.uint8))
+    key = OCRCache.make_key(page.digest, "tesseract", *processor._tesseract_settings())
+    processor.cache.put(key, "Navn: Ola Nordmann")
+
+    assert processor.extract_name(page) == "Ola Nordmann"
+    assert processor.read_text(page) == "Navn: Ola Nordmann"
+    assert versions == [payroll_verification.TESSERACT_LANG]  # Looked up once
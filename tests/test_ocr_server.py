@@ -0,0 +1,121 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from processing.ocr_server import RemoteReader, RemoteTesseract
+
+
+class _Client:
+    """OCRClient stand-in: answers from a list of outcomes (exceptions are raised)."""
+    info = {"tesseract_version": "5.0", "tesseract_backend": "test"}
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.requests = []
+
+    def request(self, op, arrays=(), **kwargs):
+        self.requests.append(op)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+class _LocalReader:
+    built = 0
+
+    def __init__(self):
+        _LocalReader.built += 1
+
+    def readtext(self, array, detail=1):
+        return "local"
+
+    def readtext_batched(self, arrays, n_width=None, n_height=None, batch_size=1, detail=1):
+        return ["local"] * len(arrays)
+
+
+class _LocalTesseract:
+    def text(self, array):
+        return "local text"
+
+    def words(self, array):
+        return []
+
+
+PAGE = np.zeros((10, 10), dtype=np.uint8)
+
+
+def test_server_error_falls_back_for_that_request_only():
+    client = _Client(RuntimeError("OCR server: CUDA out of memory"), "remote")
+    reader = RemoteReader(client, _LocalReader)
+    assert reader.readtext(PAGE) == "local"
+    assert reader.readtext(PAGE) == "remote"
+    assert client.requests == ["readtext", "readtext"]
+
+
+def test_lost_server_switches_to_local_for_the_rest_of_the_run():
+    _LocalReader.built = 0
+    client = _Client(ConnectionRefusedError("gone"))
+    reader = RemoteReader(client, _LocalReader)
+    assert reader.readtext(PAGE) == "local"
+    assert reader.readtext_batched([PAGE, PAGE]) == ["local", "local"]
+    assert client.requests == ["readtext"]
+    assert _LocalReader.built == 1
+
+
+def test_batched_server_error_is_read_locally():
+    client = _Client(RuntimeError("OCR server: bad batch"), [["remote"]])
+    reader = RemoteReader(client, _LocalReader)
+    assert reader.readtext_batched([PAGE]) == ["local"]
+    assert reader.readtext_batched([PAGE]) == [["remote"]]
+
+
+def test_tesseract_falls_back_on_server_error():
+    client = _Client(RuntimeError("OCR server: tesseract crashed"), "remote text", OSError("reset"))
+    engine = RemoteTesseract(client, _LocalTesseract)
+    assert engine.text(PAGE) == "local text"
+    assert engine.text(PAGE) == "remote text"
+    assert engine.text(PAGE) == "local text"
+    assert engine.words(PAGE) == []
+    assert client.requests == ["text", "text", "text"]
+
+
+class _SlowLocalEngine:
+    """Local engine that records how many calls overlap (the real ones are not thread-safe)."""
+    built = 0
+
+    def __init__(self):
+        time.sleep(0.05)  # Model load
+        _SlowLocalEngine.built += 1
+        self.active = 0
+        self.overlaps = 0
+        self.lock = threading.Lock()
+
+    def _enter(self):
+        with self.lock:
+            self.active += 1
+            self.overlaps += self.active > 1
+        time.sleep(0.01)
+        with self.lock:
+            self.active -= 1
+
+    def readtext(self, array, detail=1):
+        self._enter()
+        return "local"
+
+    def text(self, array):
+        self._enter()
+        return "local text"
+
+
+def test_local_fallback_is_built_once_and_not_called_concurrently():
+    _SlowLocalEngine.built = 0
+    reader = RemoteReader(_Client(*[ConnectionRefusedError("gone")] * 8), _SlowLocalEngine)
+    tesseract = RemoteTesseract(_Client(*[OSError("reset")] * 8), _SlowLocalEngine)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        texts = list(executor.map(lambda _: (reader.readtext(PAGE), tesseract.text(PAGE)), range(8)))
+    assert texts == [("local", "local text")] * 8
+    assert _SlowLocalEngine.built == 2  # One reader, one Tesseract
+    assert reader._local.overlaps == 0 and tesseract._local.overlaps == 0
@@ -0,0 +1,68 @@
+import os
+from datetime import datetime
+from email.mime.application import MIMEApplication
+from email.mime.image import MIMEImage
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+import pytest
+
+from benchmarks import imap_server
+from conftest import FINANCE_SENDER, build_email
+from ingestion import async_fetch, fetch_emails
+
+PDF = b'%PDF-1.4 ' + os.urandom(4096)
+PNG = b'\x89PNG\r\n\x1a\n' + os.urandom(2048)
+DOCX = os.urandom(512 * 1024)
+
+
+def _mail_with_extras() -> bytes:
+    msg = MIMEMultipart()
+    msg['From'] = FINANCE_SENDER
+    msg['Subject'] = 'Timelister mars'
+    msg['Date'] = 'Wed, 05 Mar 2025 12:00:00 +0000'
+    msg.attach(MIMEText('<p>Vedlagt</p>', 'html', 'utf-8'))
+    for data, filename, subtype in ((DOCX, 'notat.docx', 'octet-stream'), (PDF, 'ark.pdf', 'pdf')):
+        part = MIMEApplication(data, _subtype=subtype)
+        part.add_header('Content-Disposition', 'attachment', filename=filename)
+        msg.attach(part)
+    image = MIMEImage(PNG, _subtype='png')
+    image.add_header('Content-Disposition', 'attachment', filename='skann.png')
+    msg.attach(image)
+    return msg.as_bytes()
+
+
+@pytest.fixture
+def fetched_items(monkeypatch):
+    """Every FETCH item list the server answered, e.g. '(UID BODY.PEEK[3])'."""
+    seen = []
+    original = imap_server._Handler.fetch
+
+    def fetch(self, uid_spec, items):
+        seen.append(items.upper())
+        return original(self, uid_spec, items)
+
+    monkeypatch.setattr(imap_server._Handler, 'fetch', fetch)
+    return seen
+
+
+@pytest.mark.parametrize('fetch', [fetch_emails.get_finance_emails_in_period,
+                                   async_fetch.get_finance_emails_concurrently], ids=['imaplib', 'async'])
+def test_only_image_and_pdf_parts_are_downloaded(imap_server, fetched_items, fetch):
+    imap_server([_mail_with_extras(), build_email(datetime(2025, 3, 6))])
+    messages = list(fetch('2025-03-01', '2025-03-31', incremental=False))
+
+    # The mail without attachments carries nothing to download after its BODYSTRUCTURE
+    with_parts = [msg for msg in messages if any(part.get_filename() for part in msg.walk())]
+    assert len(with_parts) == 1
+    msg = with_parts[0]
+    assert msg['Subject'] == 'Timelister mars'
+    parts = {part.get_filename(): part.get_payload(decode=True) for part in msg.walk() if part.get_filename()}
+    assert parts == {'ark.pdf': PDF, 'skann.png': PNG}
+
+    # Structure first, then only sections 3 (PDF) and 4 (PNG); never the whole message or the .docx
+    assert any('BODYSTRUCTURE' in items for items in fetched_items)
+    bodies = [items for items in fetched_items if 'BODY.PEEK[' in items and 'HEADER.FIELDS' not in items]
+    assert bodies and all('BODY.PEEK[3]' in items and 'BODY.PEEK[4]' in items for items in bodies)
+    assert not any('BODY.PEEK[2]' in items or 'BODY.PEEK[]' in items or 'RFC822' in items
+                   for items in fetched_items)
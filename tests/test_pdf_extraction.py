@@ -0,0 +1,60 @@
+import pytest
+
+from benchmarks.synthetic import render_pdf
+from processing import layout, pdf_extraction
+from processing.payroll_verification import TimesheetProcessor
+
+LINES = [(60, 110, "Navn: Ola Nordmann"), (60, 135, "Periode: mars 2025"),
+         (60, 185, "Sum timer til utbetaling"), (440, 185, "10,00")]
+
+
+@pytest.fixture
+def processor(tmp_path, monkeypatch):
+    csv = tmp_path / "ref.csv"
+    csv.write_text("Name,agreed hours,extra hours,hours given away\nOla Nordmann,10,0,0\n", encoding="utf-8")
+    proc = TimesheetProcessor(str(csv), preprocessing=None, use_server=False)
+    proc.ocr_pages = []
+
+    def ocr_sheets(image):
+        # Stands in for OCR: what a scan of LINES would give
+        proc.ocr_pages.append(image.array.shape)
+        fields = {
+            "name": layout.FieldMatch("Ola Nordmann", 0.9, None, None),
+            "period": None,
+            "sum_hours": layout.FieldMatch(10.0, 0.9, None, None),
+        }
+        return [(fields, "easyocr", image)]
+
+    monkeypatch.setattr(proc, "ocr_sheets", ocr_sheets)
+    monkeypatch.setattr("processing.payroll_verification.log_result", lambda result: None)
+    return proc
+
+
+def _pdf(tmp_path, scanned: bool) -> str:
+    path = tmp_path / ("scan.pdf" if scanned else "digital.pdf")
+    path.write_bytes(render_pdf(LINES, dpi=100, skew=0.0, scanned=scanned))
+    return str(path)
+
+
+def test_text_layer_is_read_without_ocr(processor, tmp_path):
+    [result] = processor.process_pdf(_pdf(tmp_path, scanned=False))
+    assert (result["name"], result["period"], result["reported_hours"], result["engine"]) == \
+        ("Ola Nordmann", "mars 2025", 10.0, "text-layer")
+    assert result["status"] == "✅ Godkjent"
+    assert processor.ocr_pages == []
+
+
+def test_image_only_page_is_rasterized_for_ocr(processor, tmp_path):
+    [result] = processor.process_pdf(_pdf(tmp_path, scanned=True))
+    assert (result["name"], result["reported_hours"], result["engine"]) == ("Ola Nordmann", 10.0, "easyocr")
+    # A4 rendered at PDF_DPI
+    [(height, width, channels)] = processor.ocr_pages
+    assert abs(width - 595 * pdf_extraction.PDF_DPI / 72) <= 1 and channels == 3
+    assert height > width
+
+
+def test_text_layer_boxes_are_in_pixels(tmp_path):
+    [boxes] = [pdf_extraction.page_boxes(page) for page in pdf_extraction.iter_pages(_pdf(tmp_path, False))]
+    hours = [box for box in boxes if box[1] == "10,00"]
+    assert len(hours) == 1
+    assert hours[0][0][0][0] == pytest.approx(440 * pdf_extraction.PDF_DPI / 72, abs=1)
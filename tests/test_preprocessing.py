@@ -0,0 +1,32 @@
+import cv2
+import numpy as np
+import pytest
+
+from processing import preprocessing
+
+
+def _ruled_page(angle: float) -> np.ndarray:
+    """White A4 page at 200 DPI with table rules, rotated by angle degrees."""
+    page = np.full((2339, 1654), 255, dtype=np.uint8)
+    for y in range(300, 2100, 60):
+        cv2.line(page, (150, y), (1500, y), 0, 3)
+    matrix = cv2.getRotationMatrix2D((827, 1169), angle, 1.0)
+    return cv2.warpAffine(page, matrix, (1654, 2339), borderValue=255)
+
+
+@pytest.mark.parametrize('angle', [-4.0, -1.5, 0.0, 2.5])
+@pytest.mark.parametrize('scale', [1.0, 0.4])
+def test_estimate_skew_finds_rotation(angle, scale):
+    # The page was rotated by angle, so deskewing rotates back by -angle
+    assert preprocessing.estimate_skew(_ruled_page(angle), 10.0, scale) == pytest.approx(-angle, abs=0.2)
+
+
+def test_estimate_skew_without_lines():
+    assert preprocessing.estimate_skew(np.full((400, 300), 255, dtype=np.uint8), 10.0, 0.4) == 0.0
+
+
+def test_apply_deskews_and_keeps_size():
+    settings = preprocessing.PreprocessSettings(target_height=0)
+    out = preprocessing.apply(_ruled_page(3.0), settings)
+    assert out.shape == (2339, 1654)
+    assert abs(preprocessing.estimate_skew(out, 10.0)) < 0.3
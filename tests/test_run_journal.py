@@ -0,0 +1,142 @@
+import json
+
+import pytest
+
+from processing import run_journal
+from processing.run_journal import RunJournal, run_fingerprint
+
+
+@pytest.fixture
+def sheets(tmp_path):
+    paths = []
+    for idx in range(3):
+        path = tmp_path / f'sheet_{idx}.png'
+        path.write_bytes(b'image %d' % idx)
+        paths.append(str(path))
+    return paths
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return str(tmp_path / 'state' / 'run_journal.jsonl')
+
+
+def _result(path: str) -> list:
+    return [{"file": path.rsplit('/', 1)[-1], "status": "OK"}]
+
+
+def test_resume_reuses_entries_of_interrupted_run(sheets, journal_path):
+    with RunJournal('fp', path=journal_path) as journal:
+        journal.record(sheets[0], _result(sheets[0]))
+        journal.record(sheets[1], _result(sheets[1]))
+
+    with RunJournal('fp', path=journal_path, resume=True) as journal:
+        assert [journal.is_done(p) for p in sheets] == [True, True, False]
+        assert journal.result(sheets[0])[0]["status"] == "OK"
+        assert journal.result(sheets[0])[0]["path"] == sheets[0]
+        assert [r["file"] for r in journal.results(sheets)] == ['sheet_0.png', 'sheet_1.png']
+
+
+def test_resume_ignores_changed_files_and_other_fingerprints(sheets, journal_path):
+    with RunJournal('fp', path=journal_path) as journal:
+        for path in sheets:
+            journal.record(path, _result(path))
+    with open(sheets[1], 'ab') as f:
+        f.write(b' edited')
+
+    with RunJournal('fp', path=journal_path, resume=True) as journal:
+        assert [journal.is_done(p) for p in sheets] == [True, False, True]
+    with RunJournal('other settings', path=journal_path, resume=True) as journal:
+        assert not any(journal.is_done(p) for p in sheets)
+
+
+def test_new_run_keeps_earlier_entries(sheets, journal_path):
+    with RunJournal('fp', path=journal_path) as journal:
+        journal.record(sheets[0], _result(sheets[0]))
+
+    # A plain run (no resume) redoes everything, but must not wipe what is there
+    with RunJournal('fp', path=journal_path) as journal:
+        assert not journal.is_done(sheets[0])
+        journal.record(sheets[2], _result(sheets[2]))
+
+    with RunJournal('fp', path=journal_path, resume=True) as journal:
+        assert [journal.is_done(p) for p in sheets] == [True, False, True]
+
+
+def test_concurrent_writer_is_not_lost(sheets, journal_path):
+    watcher = RunJournal('fp', path=journal_path)
+    with RunJournal('fp', path=journal_path):
+        watcher.record(sheets[0], _result(sheets[0]))
+    watcher.close()
+    with RunJournal('fp', path=journal_path, resume=True) as journal:
+        assert journal.is_done(sheets[0])
+
+
+def test_truncated_last_line_is_ignored(sheets, journal_path):
+    with RunJournal('fp', path=journal_path) as journal:
+        journal.record(sheets[0], _result(sheets[0]))
+    with open(journal_path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({"path": sheets[1], "fingerprint": "fp"})[:20])
+
+    with RunJournal('fp', path=journal_path, resume=True) as journal:
+        assert [journal.is_done(p) for p in sheets] == [True, False, False]
+
+
+def test_large_journal_is_rotated_and_still_resumable(sheets, journal_path, monkeypatch):
+    monkeypatch.setattr(run_journal, 'ROTATE_BYTES', 1)
+    for path in sheets:
+        with RunJournal('fp', path=journal_path) as journal:
+            journal.record(path, _result(path))
+
+    # Every rotation is a new generation; none replaces an older one
+    for generation in (1, 2):
+        with open(f'{journal_path}.{generation}', encoding='utf-8') as f:
+            assert len(f.readlines()) == 1
+    with RunJournal('fp', path=journal_path, resume=True) as journal:
+        assert [journal.is_done(p) for p in sheets] == [True, True, True]
+
+
+def test_writer_of_a_rotated_journal_is_not_lost(sheets, journal_path, monkeypatch):
+    monkeypatch.setattr(run_journal, 'ROTATE_BYTES', 1)
+    watcher = RunJournal('fp', path=journal_path)
+    watcher.record(sheets[0], _result(sheets[0]))
+    with RunJournal('fp', path=journal_path):
+        # The watch still has the file open that this run just rotated away
+        watcher.record(sheets[1], _result(sheets[1]))
+    watcher.close()
+    with RunJournal('fp', path=journal_path, resume=True) as journal:
+        assert [journal.is_done(p) for p in sheets] == [True, True, False]
+
+
+def test_fingerprint_covers_csv_and_settings(tmp_path):
+    csv = tmp_path / 'ref.csv'
+    csv.write_text('name,hours\nOla,10\n', encoding='utf-8')
+    base = run_fingerprint(str(csv), {"tolerance": 0.1, "cascade": False})
+    assert run_fingerprint(str(csv), {"cascade": False, "tolerance": 0.1}) == base
+    assert run_fingerprint(str(csv), {"tolerance": 0.1, "cascade": True}) != base
+    csv.write_text('name,hours\nOla,11\n', encoding='utf-8')
+    assert run_fingerprint(str(csv), {"tolerance": 0.1, "cascade": False}) != base
+
+
+def test_journal_without_results_only_remembers_done_files(sheets, journal_path):
+    with RunJournal('fp', path=journal_path) as journal:
+        journal.record(sheets[0], _result(sheets[0]))
+
+    with RunJournal('fp', path=journal_path, resume=True, keep_results=False) as journal:
+        journal.record(sheets[1], _result(sheets[1]))
+        assert [journal.is_done(p) for p in sheets] == [True, True, False]
+        assert journal.results(sheets) == [] and journal.result(sheets[1]) == []
+    # What it does not keep is still in the journal
+    with RunJournal('fp', path=journal_path, resume=True) as journal:
+        assert [r["file"] for r in journal.results(sheets)] == ['sheet_0.png', 'sheet_1.png']
+
+
+def test_append_results_writes_the_header_once(tmp_path):
+    path = str(tmp_path / 'results' / 'watch.csv')
+    run_journal.append_results([{"file": "a.png", "status": "OK", "extra": 1}], path)
+    run_journal.append_results([{"file": "b.png", "status": "OK"}], path)
+    with open(path, encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    assert lines[0] == ','.join(run_journal.RESULT_COLUMNS)
+    assert [line.split(',')[0] for line in lines[1:]] == ['a.png', 'b.png']
+    assert run_journal.append_results([], str(tmp_path / 'out.parquet')).endswith('out.csv')
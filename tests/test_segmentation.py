@@ -0,0 +1,58 @@
+from processing import layout, segmentation
+
+
+def _box(x: float, y: float, text: str, width: float = 120, height: float = 20, conf: float = 0.9) -> list:
+    return [[[x, y], [x + width, y], [x + width, y + height], [x, y + height]], text, conf]
+
+
+def _sheet(x: float, y: float, name: str, hours: str) -> list:
+    """One timesheet's boxes with its top-left corner at (x, y)."""
+    return [
+        _box(x, y, "Navn"), _box(x + 150, y, name, width=200),
+        _box(x, y + 40, "Periode"), _box(x + 150, y + 40, "mars 2025"),
+        _box(x, y + 120, "01.03"), _box(x + 150, y + 120, "Mentor"), _box(x + 300, y + 120, "4,00", width=50),
+        _box(x, y + 200, "Sum timer til utbetaling", width=250), _box(x + 300, y + 200, hours, width=50),
+    ]
+
+
+def _fields(region) -> tuple:
+    fields = layout.extract_fields(region.boxes)
+    return fields["name"].value, fields["period"].value, fields["sum_hours"].value
+
+
+def test_single_sheet_is_one_region_with_all_boxes():
+    boxes = _sheet(50, 50, "Ola Nordmann", "10,00")
+    regions = segmentation.split_sheets(boxes)
+    assert len(regions) == 1
+    assert regions[0].rect is None and regions[0].boxes == boxes
+
+
+def test_empty_page():
+    assert segmentation.split_sheets([]) == [segmentation.SheetRegion(None, [])]
+
+
+def test_two_up_stacked():
+    boxes = _sheet(50, 50, "Ola Nordmann", "10,00") + _sheet(50, 600, "Kari Hansen", "7,50")
+    regions = segmentation.split_sheets(boxes)
+    assert [_fields(r) for r in regions] == [("Ola Nordmann", "mars 2025", 10.0),
+                                            ("Kari Hansen", "mars 2025", 7.5)]
+    # Every box lands in exactly one region
+    assert sum(len(r.boxes) for r in regions) == len(boxes)
+
+
+def test_four_up_in_reading_order():
+    boxes = (_sheet(900, 600, "Dina Berg", "4,00") + _sheet(50, 50, "Ola Nordmann", "10,00")
+             + _sheet(900, 50, "Kari Hansen", "7,50") + _sheet(50, 600, "Nils Olsen", "12,25"))
+    regions = segmentation.split_sheets(boxes)
+    assert [_fields(r)[0] for r in regions] == ["Ola Nordmann", "Kari Hansen", "Nils Olsen", "Dina Berg"]
+    assert [_fields(r)[2] for r in regions] == [10.0, 7.5, 12.25, 4.0]
+    x0, y0, x1, y1 = regions[0].rect
+    assert (x0, y0) == (0, 0) and x1 is not None and y1 is not None
+    assert regions[-1].rect[2:] == (None, None)
+
+
+def test_name_value_that_looks_like_a_label_is_not_an_anchor():
+    # "Navne" (a surname) right of "Navn" is its value, not a second timesheet
+    boxes = [_box(50, 50, "Navn"), _box(200, 50, "Navne"), _box(50, 250, "Sum timer til utbetaling", width=250),
+             _box(350, 250, "8,00", width=50)]
+    assert len(segmentation.split_sheets(boxes)) == 1
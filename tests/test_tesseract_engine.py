@@ -0,0 +1,28 @@
+import logging
+
+from processing import tesseract_engine
+
+
+def test_pytesseract_fallback_is_reported_once(monkeypatch, caplog):
+    monkeypatch.setattr(tesseract_engine, "tesserocr", None)
+    monkeypatch.setattr(tesseract_engine, "_fallback_reported", False)
+    monkeypatch.setattr(tesseract_engine.pytesseract, "get_tesseract_version", lambda: "5.3.0")
+
+    with caplog.at_level(logging.WARNING, logger=tesseract_engine.__name__):
+        engines = [tesseract_engine.TesseractEngine() for _ in range(3)]
+
+    assert [engine.backend for engine in engines] == ["pytesseract"] * 3
+    assert engines[0].version == "5.3.0"
+    warnings = [r.getMessage() for r in caplog.records if "pytesseract" in r.getMessage()]
+    assert len(warnings) == 1 and "tesserocr is not installed" in warnings[0]
+
+
+def test_installed_version_does_not_build_an_engine(monkeypatch):
+    monkeypatch.setattr(tesseract_engine, "tesserocr", None)
+    monkeypatch.setattr(tesseract_engine.pytesseract, "get_tesseract_version", lambda: "5.3.0")
+    monkeypatch.setattr(tesseract_engine, "TesseractEngine", None)
+    tesseract_engine.installed_version.cache_clear()
+    try:
+        assert tesseract_engine.installed_version("eng") == ("5.3.0", "pytesseract")
+    finally:
+        tesseract_engine.installed_version.cache_clear()
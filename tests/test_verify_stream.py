@@ -0,0 +1,49 @@
+import threading
+
+from processing import payroll_verification
+from processing.run_journal import RunJournal
+
+TIMEOUT = 60.0  # Seconds; spawning the pool imports the processing stack in every worker
+
+
+def test_verdict_is_reported_before_the_next_file_arrives(tmp_path, monkeypatch):
+    csv = tmp_path / "ref.csv"
+    csv.write_text("Name,agreed hours,extra hours,hours given away\nOla Nordmann,10,0,0\n", encoding="utf-8")
+    # Missing files still get a verdict ("Image not found"), without loading any OCR engine
+    paths = [str(tmp_path / "first.png"), str(tmp_path / "second.png")]
+    reported = threading.Event()
+    log_result = payroll_verification.log_result
+
+    def on_verdict(result):
+        log_result(result)
+        reported.set()
+
+    monkeypatch.setattr(payroll_verification, "log_result", on_verdict)
+    reported_before_second = []
+
+    def quiet_mailbox():
+        yield paths[0]
+        # Nothing else arrives for a while: the first verdict must not wait for the next file
+        reported_before_second.append(reported.wait(TIMEOUT))
+        yield paths[1]
+
+    with RunJournal("fp", path=str(tmp_path / "run_journal.jsonl")) as journal:
+        results = payroll_verification._verify_stream(quiet_mailbox(), str(csv), 2, use_cache=False, cascade=False,
+                                                      use_templates=False, journal=journal)
+    assert reported_before_second == [True]
+    assert [r["file"] for r in results] == ["first.png", "second.png"]
+
+
+def test_results_are_appended_instead_of_collected(tmp_path):
+    csv = tmp_path / "ref.csv"
+    csv.write_text("Name,agreed hours,extra hours,hours given away\nOla Nordmann,10,0,0\n", encoding="utf-8")
+    output = tmp_path / "watch.csv"
+    paths = iter([str(tmp_path / "first.png"), str(tmp_path / "second.png")])
+
+    with RunJournal("fp", path=str(tmp_path / "run_journal.jsonl"), keep_results=False) as journal:
+        results = payroll_verification._verify_stream(paths, str(csv), 1, use_cache=False, cascade=False,
+                                                      use_templates=False, journal=journal, append_to=str(output))
+        assert results == []
+        assert list(journal.done.values()) == [None, None]
+    lines = output.read_text(encoding="utf-8").splitlines()
+    assert [line.split(",")[0] for line in lines[1:]] == ["first.png", "second.png"]
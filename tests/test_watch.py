@@ -0,0 +1,100 @@
+import threading
+from datetime import date, datetime
+
+import pytest
+
+from conftest import FINANCE_SENDER, build_email
+from ingestion import async_fetch
+from ingestion.watch import watch_mailbox
+
+SINCE = date(2025, 3, 1)
+TIMEOUT = 10.0
+
+
+class _Watcher:
+    """Runs watch_mailbox in a thread and collects the subjects it hands over."""
+
+    def __init__(self, on_message=None, **kwargs):
+        self.subjects = []
+        self.arrived = threading.Condition()
+        self.handler = on_message
+        self.stop = threading.Event()
+        kwargs = dict({"senders": [FINANCE_SENDER], "folders": ["INBOX"], "since": SINCE, "poll_interval": 0.1},
+                      **kwargs)
+        self.thread = threading.Thread(target=watch_mailbox, args=(self._on_message, self.stop), kwargs=kwargs,
+                                       daemon=True)
+
+    def _on_message(self, msg):
+        if self.handler is not None:
+            self.handler(msg)
+        with self.arrived:
+            self.subjects.append(msg['Subject'])
+            self.arrived.notify_all()
+
+    def wait_for(self, count: int) -> list:
+        with self.arrived:
+            self.arrived.wait_for(lambda: len(self.subjects) >= count, timeout=TIMEOUT)
+            return list(self.subjects)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop.set()
+        self.thread.join(timeout=TIMEOUT)
+
+
+def _mail(month: int, day: int) -> bytes:
+    return build_email(datetime(2025, month, day), f'sheet_{month}_{day}.pdf')
+
+
+@pytest.mark.parametrize('use_idle', [True, False], ids=['idle', 'poll'])
+def test_catch_up_then_new_mail(imap_server, use_idle):
+    server = imap_server([_mail(2, 20), _mail(3, 5), _mail(3, 6)], idle=use_idle)
+    with _Watcher(use_idle=use_idle) as watcher:
+        # Everything since SINCE that is already there, nothing older
+        assert watcher.wait_for(2) == ['Timeliste 2025-03-05', 'Timeliste 2025-03-06']
+        server.deliver(_mail(3, 10))
+        assert watcher.wait_for(3)[2:] == ['Timeliste 2025-03-10']
+
+
+def test_restart_catches_up_only_on_mail_that_arrived_meanwhile(imap_server):
+    server = imap_server([_mail(3, 5)])
+    with _Watcher() as watcher:
+        assert watcher.wait_for(1) == ['Timeliste 2025-03-05']
+
+    server.deliver(_mail(3, 7))
+    server.deliver(_mail(3, 8))
+    with _Watcher() as watcher:
+        assert watcher.wait_for(2) == ['Timeliste 2025-03-07', 'Timeliste 2025-03-08']
+        server.deliver(_mail(3, 9))
+        assert watcher.wait_for(3) == ['Timeliste 2025-03-07', 'Timeliste 2025-03-08', 'Timeliste 2025-03-09']
+
+
+def test_failed_message_is_retried_on_next_catch_up(imap_server):
+    imap_server([_mail(3, 5), _mail(3, 6)])
+    failures = []
+
+    def fail_once(msg):
+        if msg['Subject'] == 'Timeliste 2025-03-06' and not failures:
+            failures.append(msg['Subject'])
+            raise RuntimeError("disk full")
+
+    # Polling: the failed message is fetched again on the next poll, not only when new mail arrives
+    with _Watcher(on_message=fail_once, use_idle=False) as watcher:
+        assert watcher.wait_for(2) == ['Timeliste 2025-03-05', 'Timeliste 2025-03-06']
+    assert failures == ['Timeliste 2025-03-06']
+
+
+def test_mail_announced_during_catch_up_is_not_missed(imap_server, monkeypatch):
+    monkeypatch.setattr(async_fetch, 'CHUNK_SIZE', 1)  # The catch-up fetches in two commands
+    server = imap_server([_mail(3, 5), _mail(3, 6)])
+
+    def deliver_during_catch_up(msg):
+        # Arrives after the SEARCH; the server announces it in the next FETCH response, not again in IDLE
+        if msg['Subject'] == 'Timeliste 2025-03-05':
+            server.deliver(_mail(3, 7))
+
+    with _Watcher(on_message=deliver_during_catch_up, use_idle=True) as watcher:
+        assert watcher.wait_for(3) == ['Timeliste 2025-03-05', 'Timeliste 2025-03-06', 'Timeliste 2025-03-07']